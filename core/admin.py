@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import User, Vessel, Port, VesselHistory, Voyage, Event, Notification
+from .models import User, Vessel, Port, VesselHistory, Voyage, Event, Notification, HistoryArchive, Job
 
 # Milestone 1: User & Role Management
 @admin.register(User)
@@ -26,6 +26,12 @@ class VesselHistoryAdmin(admin.ModelAdmin):
     list_filter = ('vessel', 'timestamp')
     date_hierarchy = 'timestamp' # Adds a time-based drill-down for historical audits
 
+# History Retention: archived & downsampled days
+@admin.register(HistoryArchive)
+class HistoryArchiveAdmin(admin.ModelAdmin):
+    list_display = ('day', 'raw_rows', 'kept_rows', 'path', 'created_at')
+    date_hierarchy = 'day'
+
 # Milestone 4: Historical Voyage Replay & Audit
 @admin.register(Voyage)
 class VoyageAdmin(admin.ModelAdmin):
@@ -43,5 +49,12 @@ class EventAdmin(admin.ModelAdmin):
 # Milestone 3: Real-time Notifications & Alerts
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
-    list_display = ('message', 'created_at', 'is_read')
-    list_filter = ('is_read', 'created_at')
\ No newline at end of file
+    list_display = ('message', 'created_at', 'recipients')
+    list_filter = ('created_at',)
+
+# Background Jobs: queue inspection
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'task', 'status', 'attempts', 'run_at', 'started_at', 'finished_at', 'locked_by')
+    list_filter = ('status', 'task', 'queue')
+    readonly_fields = ('locked_by', 'lease_expires', 'result', 'error', 'started_at', 'finished_at')
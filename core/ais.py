@@ -0,0 +1,126 @@
+import csv
+from datetime import datetime, timezone as dt_timezone
+
+# --- AIS Feed Parsing (NMEA 0183 AIVDM/AIVDO & CSV) ---
+# Only position reports are decoded: Class A (types 1, 2, 3) and Class B (type 18).
+# Everything else in the feed (static data, base stations, multi-part messages) is skipped.
+POSITION_REPORT_TYPES = (1, 2, 3, 18)
+
+# AIS encodes "not available" as 181 / 91 degrees
+LON_NOT_AVAILABLE = 181.0
+LAT_NOT_AVAILABLE = 91.0
+
+
+def _payload_bits(payload):
+    bits = []
+    for char in payload:
+        value = ord(char) - 48
+        if value > 40:
+            value -= 8
+        bits.append(format(value, '06b'))
+    return ''.join(bits)
+
+
+def _unsigned(bits, start, length):
+    return int(bits[start:start + length], 2)
+
+
+def _signed(bits, start, length):
+    value = _unsigned(bits, start, length)
+    if value & (1 << (length - 1)):
+        value -= 1 << length
+    return value
+
+
+def _checksum_ok(sentence):
+    if '*' not in sentence:
+        return True
+    body, _, checksum = sentence[1:].partition('*')
+    expected = 0
+    for char in body:
+        expected ^= ord(char)
+    try:
+        return expected == int(checksum[:2], 16)
+    except ValueError:
+        return False
+
+
+def _split_timestamp(line):
+    """Pulls a receive time off the line: NMEA 4.0 tag block (``\\c:<epoch>``) or a leading ISO prefix."""
+    timestamp = None
+    if line.startswith('\\'):
+        tag_block, _, line = line[1:].partition('\\')
+        for tag in tag_block.split('*')[0].split(','):
+            if tag.startswith('c:'):
+                try:
+                    epoch = int(tag[2:])
+                    # Some receivers write milliseconds
+                    if epoch > 10 ** 11:
+                        epoch //= 1000
+                    timestamp = datetime.fromtimestamp(epoch, tz=dt_timezone.utc)
+                except (ValueError, OverflowError, OSError):
+                    # A corrupt tag only costs the receive time; ingestion falls back to now
+                    timestamp = None
+    elif not line.startswith('!') and '!' in line:
+        prefix, _, rest = line.partition('!')
+        timestamp = prefix.strip().rstrip(',') or None
+        line = '!' + rest
+    return timestamp, line
+
+
+def decode_nmea(line):
+    """Decodes one AIVDM/AIVDO sentence into a fix dict, or returns None if it is not a usable position report."""
+    line = line.strip()
+    if not line:
+        return None
+    timestamp, sentence = _split_timestamp(line)
+    if not sentence.startswith(('!AIVDM', '!AIVDO')) or not _checksum_ok(sentence):
+        return None
+
+    fields = sentence.split('*')[0].split(',')
+    # Position reports always fit in a single fragment
+    if len(fields) < 7 or fields[1] != '1':
+        return None
+
+    bits = _payload_bits(fields[5])
+    if len(bits) < 6:
+        return None
+    msg_type = _unsigned(bits, 0, 6)
+    if msg_type not in POSITION_REPORT_TYPES:
+        return None
+
+    if msg_type == 18:
+        if len(bits) < 112:
+            return None
+        lon_start, lat_start = 57, 85
+    else:
+        if len(bits) < 116:
+            return None
+        lon_start, lat_start = 61, 89
+
+    longitude = _signed(bits, lon_start, 28) / 600000.0
+    latitude = _signed(bits, lat_start, 27) / 600000.0
+    if longitude == LON_NOT_AVAILABLE or latitude == LAT_NOT_AVAILABLE:
+        return None
+
+    fix = {
+        'mmsi': _unsigned(bits, 8, 30),
+        'latitude': round(latitude, 6),
+        'longitude': round(longitude, 6),
+    }
+    if timestamp is not None:
+        fix['timestamp'] = timestamp
+    return fix
+
+
+def read_nmea(stream):
+    for line in stream:
+        fix = decode_nmea(line)
+        if fix is not None:
+            yield fix
+
+
+def read_csv(stream):
+    # Expects a header row with mmsi, latitude/lat, longitude/lon and optionally timestamp
+    for row in csv.DictReader(stream):
+        yield {key.strip().lower(): value for key, value in row.items() if key}
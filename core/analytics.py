@@ -0,0 +1,168 @@
+from collections import defaultdict
+from datetime import timezone as dt_timezone
+
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDay
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import PortTraffic, RouteStats, VoyageStatusCount
+
+# --- Port & Voyage Analytics Rollups ---
+# Every voyage contributes fixed amounts to three small tables: a departure in its origin
+# port's hour, an arrival in its destination's hour, a transit sample for its port pair and
+# one count for its status. A Voyage write applies (new contribution - old contribution) as
+# F() increments in the same transaction, so dashboards read a handful of pre-summed rows
+# instead of aggregating Voyage. Writers that skip model signals (bulk_create, queryset
+# .update()) must call rebuild() afterwards, as core.synthetic does.
+MAX_WINDOW_DAYS = getattr(settings, 'ANALYTICS_MAX_WINDOW_DAYS', 92)
+MAX_LIMIT = getattr(settings, 'ANALYTICS_MAX_LIMIT', 200)
+DEFAULT_LIMIT = 20
+REBUILD_CHUNK = 5000
+
+
+def _moment(value):
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if value is not None and timezone.is_naive(value):
+        value = timezone.make_aware(value, dt_timezone.utc)
+    return value
+
+
+def _hour(moment):
+    return moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def contributions(state):
+    """(model name, key, {field: amount}) rows a voyage in ``state`` (Voyage.rollup_state()) adds."""
+    if state is None:
+        return []
+    port_from, port_to, departed, arrived, status = state
+    departed, arrived = _moment(departed), _moment(arrived)
+    rows = [('VoyageStatusCount', (('status', status),), {'voyages': 1})]
+    if departed is not None:
+        rows.append(('PortTraffic', (('port_id', port_from), ('hour', _hour(departed))), {'departures': 1}))
+    if arrived is not None:
+        rows.append(('PortTraffic', (('port_id', port_to), ('hour', _hour(arrived))), {'arrivals': 1}))
+        if departed is not None:
+            rows.append(('RouteStats', (('port_from_id', port_from), ('port_to_id', port_to)), {
+                'voyages': 1, 'transit_seconds': round((arrived - departed).total_seconds()),
+            }))
+    return rows
+
+
+def _accumulate(totals, state, sign):
+    for model, key, fields in contributions(state):
+        bucket = totals.setdefault((model, key), defaultdict(int))
+        for field, amount in fields.items():
+            bucket[field] += sign * amount
+
+
+def _increment(model, key, fields):
+    increments = {field: F(field) + amount for field, amount in fields.items()}
+    if model.objects.filter(**key).update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**key, **fields)
+    except IntegrityError:
+        # Another writer created the row first
+        model.objects.filter(**key).update(**increments)
+
+
+def record_change(old_state, new_state):
+    record_changes([(old_state, new_state)])
+
+
+def record_changes(changes):
+    """Applies many voyages' (old state, new state) pairs with one increment per touched rollup row."""
+    totals = {}
+    for old_state, new_state in changes:
+        if old_state != new_state:
+            _accumulate(totals, old_state, -1)
+            _accumulate(totals, new_state, 1)
+    # Fixed row order, so concurrent writers lock rollup rows in the same sequence
+    for (model, key), fields in sorted(totals.items(), key=lambda item: (item[0][0], item[0][1])):
+        fields = {field: amount for field, amount in fields.items() if amount}
+        if fields:
+            _increment(django_apps.get_model('core', model), dict(key), fields)
+
+
+def rebuild(apps=django_apps):
+    """Recomputes every rollup from Voyage; ``apps`` may be a migration's historical registry."""
+    Voyage = apps.get_model('core', 'Voyage')
+    totals = {}
+    fields = ('port_from_id', 'port_to_id', 'departure_time', 'arrival_time', 'status')
+    for state in Voyage.objects.values_list(*fields).iterator(chunk_size=REBUILD_CHUNK):
+        _accumulate(totals, state, 1)
+
+    rows = defaultdict(list)
+    for (model, key), amounts in totals.items():
+        rows[model].append(apps.get_model('core', model)(**dict(key), **amounts))
+    with transaction.atomic():
+        for model in ('PortTraffic', 'RouteStats', 'VoyageStatusCount'):
+            model = apps.get_model('core', model)
+            model.objects.all().delete()
+            model.objects.bulk_create(rows[model.__name__], batch_size=REBUILD_CHUNK)
+    return {model: len(objects) for model, objects in rows.items()}
+
+
+# --- Dashboard reads (rollup rows only) ---
+def port_traffic(port_ids, start, end, bucket='hour'):
+    rows = PortTraffic.objects.filter(port_id__in=port_ids, hour__gte=_hour(start), hour__lt=end)
+    if bucket == 'day':
+        rows = (
+            rows.annotate(bucket=TruncDay('hour', tzinfo=dt_timezone.utc)).values('port_id', 'bucket')
+            .annotate(arrivals=Sum('arrivals'), departures=Sum('departures')).order_by('port_id', 'bucket')
+        )
+        return [{'port': row['port_id'], 'time': row['bucket'], 'arrivals': row['arrivals'], 'departures': row['departures']}
+                for row in rows]
+    return [
+        {'port': port_id, 'time': hour, 'arrivals': arrivals, 'departures': departures}
+        for port_id, hour, arrivals, departures in rows.order_by('port_id', 'hour').values_list(
+            'port_id', 'hour', 'arrivals', 'departures')
+    ]
+
+
+def busiest_ports(start, end, limit):
+    rows = (
+        PortTraffic.objects.filter(hour__gte=_hour(start), hour__lt=end)
+        .values('port_id', 'port__name')
+        .annotate(arrivals=Sum('arrivals'), departures=Sum('departures'))
+        .order_by('-arrivals', '-departures', 'port_id')[:limit]
+    )
+    return [
+        {'port': row['port_id'], 'port_name': row['port__name'], 'arrivals': row['arrivals'], 'departures': row['departures']}
+        for row in rows
+    ]
+
+
+def route_stats(port_from=None, port_to=None, limit=50):
+    rows = RouteStats.objects.filter(voyages__gt=0)
+    if port_from:
+        rows = rows.filter(port_from_id__in=port_from)
+    if port_to:
+        rows = rows.filter(port_to_id__in=port_to)
+    rows = rows.select_related('port_from', 'port_to').order_by('-voyages', 'port_from_id', 'port_to_id')[:limit]
+    return [
+        {
+            'port_from': row.port_from_id, 'port_from_name': row.port_from.name,
+            'port_to': row.port_to_id, 'port_to_name': row.port_to.name,
+            'voyages': row.voyages,
+            'avg_transit_hours': round(row.transit_seconds / row.voyages / 3600.0, 2),
+        }
+        for row in rows
+    ]
+
+
+def status_counts():
+    counts = dict(VoyageStatusCount.objects.filter(voyages__gt=0).values_list('status', 'voyages'))
+    total = sum(counts.values())
+    return {
+        'total': total,
+        'by_status': counts,
+        'delayed_share': round(counts.get('Delayed', 0) / total, 4) if total else 0.0,
+    }
@@ -0,0 +1,128 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from .metrics import timed
+
+# --- Async Read Path (ASGI) ---
+# Dashboards poll the list endpoints continuously, several at a time per operator. Under the
+# ASGI server (Procfile) a DRF view is sync, so Django runs each one on the worker's single
+# thread-sensitive executor, and one request waiting on the database holds up every other
+# request in that process. async_list_routes() swaps the router's list route of each
+# AsyncListMixin viewset for an async view: authorized GETs negotiated to JSON run the
+# viewset's own get_queryset(), pagination and serializers on the event loop and await
+# authentication, cache lookups and the query, so other requests proceed meanwhile.
+# Everything else (writes, auth failures, the browsable API, columnar layers) goes to the
+# DRF view unchanged. Serializers must only read select_related() relations: a lazy query
+# on the event loop raises SynchronousOnlyOperation.
+# The awaited work runs on a small pool of ASYNC_READ_THREADS threads, each keeping its own
+# persistent connection, rather than through the async ORM: Django's async query methods
+# funnel every query in the process through one thread-sensitive thread, so concurrent
+# polls would queue there one round trip at a time. Requests that arrive through WSGI or the
+# test client already have a thread of their own, blocked on this view, and keep using it.
+ASYNC_READ_VIEWS = getattr(settings, 'ASYNC_READ_VIEWS', True)
+ASYNC_READ_THREADS = getattr(settings, 'ASYNC_READ_THREADS', 4)
+
+_executor = ThreadPoolExecutor(max_workers=ASYNC_READ_THREADS, thread_name_prefix='async-read')
+_pooled = contextvars.ContextVar('async_read_pooled', default=False)
+
+
+def in_read_pool(func):
+    """Awaitable ``func``: on the read pool for ASGI requests, else on the request's own thread."""
+    if not _pooled.get():
+        return sync_to_async(func)
+
+    def call(*args, **kwargs):
+        # Pool threads outlive requests; recycle their connections as Django does per request
+        close_old_connections()
+        return func(*args, **kwargs)
+    return sync_to_async(call, thread_sensitive=False, executor=_executor)
+
+
+async def fetch(queryset):
+    return await in_read_pool(list)(queryset)
+
+
+class AsyncListMixin:
+    """Async twin of ListModelMixin.list; opts a viewset's list route into the async read path."""
+
+    async def alist(self, request, *args, **kwargs):
+        # Off the loop: building the queryset may read too (?search= consults the name index)
+        queryset = await in_read_pool(lambda: self.filter_queryset(self.get_queryset()))()
+        if self.paginator is not None:
+            page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+            if page is not None:
+                return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(await fetch(queryset), many=True).data)
+
+
+def _authorize(view, request):
+    try:
+        view.perform_authentication(request)
+        view.check_permissions(request)
+        view.check_throttles(request)
+    except APIException:
+        return False
+    return True
+
+
+async def _serve(view, actions, request, args, kwargs):
+    """APIView.dispatch() for the list action, on the event loop; None hands the request to DRF."""
+    view.action_map = actions
+    for method, action in actions.items():
+        setattr(view, method, getattr(view, action))
+    view.args, view.kwargs = args, kwargs
+    view.request = request = view.initialize_request(request, *args, **kwargs)
+    view.headers = view.default_response_headers
+
+    with timed('serialize'):
+        try:
+            view.format_kwarg = view.get_format_suffix(**kwargs)
+            request.accepted_renderer, request.accepted_media_type = view.perform_content_negotiation(request)
+            request.version, request.versioning_scheme = view.determine_version(request, *args, **kwargs)
+        except APIException:
+            return None
+        if request.accepted_renderer.format != 'json':
+            return None
+        # Authentication may read the revocation list or the user row
+        with timed('auth'):
+            if not await in_read_pool(_authorize)(view, request):
+                return None
+        try:
+            response = await view.alist(request, *args, **kwargs)
+        except Exception as exc:
+            response = view.handle_exception(exc)
+        view.response = view.finalize_response(request, response, *args, **kwargs)
+        return view.response
+
+
+def async_list(fallback):
+    """Wraps a router list view so JSON GETs run async; every other request goes to ``fallback``."""
+    sync_fallback = sync_to_async(fallback)
+
+    @wraps(fallback)
+    async def view(request, *args, **kwargs):
+        if request.method == 'GET':
+            _pooled.set(isinstance(request, ASGIRequest))
+            response = await _serve(fallback.cls(**fallback.initkwargs), fallback.actions, request, args, kwargs)
+            if response is not None:
+                return response
+        return await sync_fallback(request, *args, **kwargs)
+
+    return view
+
+
+def async_list_routes(patterns):
+    """Routes the list action of every AsyncListMixin viewset in ``patterns`` (router.urls) through async_list()."""
+    for pattern in patterns:
+        cls = getattr(pattern.callback, 'cls', None)
+        if cls is not None and issubclass(cls, AsyncListMixin) and pattern.callback.actions.get('get') == 'list':
+            pattern.callback = async_list(pattern.callback)
+    return patterns
@@ -0,0 +1,147 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import TokenRevocation
+
+# --- Stateless, Role-aware JWT Authentication ---
+# Tokens are stamped at login with the claims the API authorizes on (role, region, username,
+# is_staff), so a request is authenticated from the signature alone: request.user is a
+# RoleTokenUser and no User row is loaded. What a signature cannot know is covered by
+# revocation: saving a change to any of those fields, the password or is_active (or deleting
+# the user) bumps the user's TokenRevocation generation, and tokens stamped with an older one
+# are refused. Each process holds the revocation list in memory and re-reads only newer rows
+# every JWT_REVOCATION_REFRESH_SECONDS; revocations made by the process itself apply on commit.
+# JWT_USER_MODE='cached' returns real User rows kept in-process for JWT_USER_CACHE_SECONDS
+# instead, and 'database' loads the row on every request as simplejwt does.
+USER_MODE = getattr(settings, 'JWT_USER_MODE', 'token')
+USER_CACHE_SECONDS = getattr(settings, 'JWT_USER_CACHE_SECONDS', 60)
+USER_CACHE_MAX = 10000
+REVOCATION_REFRESH_SECONDS = getattr(settings, 'JWT_REVOCATION_REFRESH_SECONDS', 30)
+# Re-read revocations stamped shortly before the newest one seen, for late commits and clock skew
+REVOCATION_OVERLAP = timedelta(seconds=5)
+CLAIMS = ('role', 'region', 'username', 'is_staff')
+GENERATION_CLAIM = 'gen'
+
+
+class RoleTokenUser(TokenUser):
+    """``request.user`` built from token claims; has the id and role the views check, no DB row."""
+
+    @cached_property
+    def id(self):
+        return int(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def role(self):
+        return self.token.get('role', '')
+
+    @cached_property
+    def region(self):
+        return self.token.get('region', '')
+
+
+class RevocationList:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self._generations = {}
+        self._since = None
+        self._checked = None
+
+    def generation(self, user_id):
+        if self._checked is None or time.monotonic() - self._checked >= REVOCATION_REFRESH_SECONDS:
+            self._refresh()
+        return self._generations.get(user_id, 0)
+
+    def _refresh(self):
+        with self._lock:
+            if self._checked is not None and time.monotonic() - self._checked < REVOCATION_REFRESH_SECONDS:
+                return
+            rows = TokenRevocation.objects.all()
+            if self._since is not None:
+                rows = rows.filter(revoked_at__gte=self._since - REVOCATION_OVERLAP)
+            for user_id, generation, revoked_at in rows.values_list('user_id', 'generation', 'revoked_at'):
+                self._note(user_id, generation)
+                self._since = revoked_at if self._since is None else max(self._since, revoked_at)
+            self._checked = time.monotonic()
+
+    def reload(self, user_ids):
+        rows = TokenRevocation.objects.filter(user_id__in=user_ids).values_list('user_id', 'generation')
+        with self._lock:
+            for user_id, generation in rows:
+                self._note(user_id, generation)
+
+    def _note(self, user_id, generation):
+        if generation > self._generations.get(user_id, 0):
+            self._generations[user_id] = generation
+            _users.pop(user_id, None)
+
+
+revocations = RevocationList()
+# user id -> (expires at, User) for JWT_USER_MODE='cached'
+_users = {}
+
+
+def current_generation(user_id):
+    return TokenRevocation.objects.filter(user_id=user_id).values_list('generation', flat=True).first() or 0
+
+
+def stamp(token, user):
+    """Adds ``user``'s authorization claims and current token generation to ``token``."""
+    for claim in CLAIMS:
+        token[claim] = getattr(user, claim)
+    token[GENERATION_CLAIM] = current_generation(user.pk)
+    return token
+
+
+def revoke(user_ids):
+    """Refuses every token issued so far to ``user_ids``; other processes follow within the refresh interval."""
+    user_ids = sorted(set(user_ids))
+    now = timezone.now()
+    bump = {'generation': F('generation') + 1, 'revoked_at': now}
+    for user_id in user_ids:
+        if TokenRevocation.objects.filter(user_id=user_id).update(**bump):
+            continue
+        try:
+            with transaction.atomic():
+                TokenRevocation.objects.create(user_id=user_id, revoked_at=now)
+        except IntegrityError:
+            # Revoked concurrently; count this one too
+            TokenRevocation.objects.filter(user_id=user_id).update(**bump)
+    transaction.on_commit(lambda: revocations.reload(user_ids))
+
+
+class RoleTokenAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, TypeError, ValueError) as exc:
+            raise InvalidToken('Token contained no recognizable user identification') from exc
+        if validated_token.get(GENERATION_CLAIM, 0) < revocations.generation(user_id):
+            raise AuthenticationFailed('Token has been revoked', code='token_revoked')
+
+        if USER_MODE == 'database':
+            return super().get_user(validated_token)
+        # Tokens issued before role claims existed fall back to the cached row
+        if USER_MODE == 'token' and 'role' in validated_token:
+            return RoleTokenUser(validated_token)
+        entry = _users.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        user = super().get_user(validated_token)
+        if len(_users) >= USER_CACHE_MAX:
+            _users.clear()
+        _users[user_id] = (time.monotonic() + USER_CACHE_SECONDS, user)
+        return user
@@ -0,0 +1,55 @@
+import json
+import math
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+# --- Benchmark Harness Helpers ---
+# Benchmarks run against a throwaway copy of the configured database (same engine as
+# DATABASE_URL) so they never touch operational data.
+
+
+@contextmanager
+def benchmark_database(keepdb=False):
+    old_name = connection.settings_dict['NAME']
+    if connection.vendor == 'sqlite' and not connection.settings_dict['TEST'].get('NAME'):
+        # The default in-memory SQLite test DB would hide real I/O cost and cap the data size
+        connection.settings_dict['TEST']['NAME'] = str(settings.BASE_DIR / 'benchmark.sqlite3')
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        yield connection.settings_dict['NAME']
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+
+
+def time_calls(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return samples
+
+
+def percentiles(samples_ms):
+    ordered = sorted(samples_ms)
+    if not ordered:
+        return {'p50': None, 'p95': None, 'p99': None}
+
+    # Nearest-rank percentile
+    def rank(pct):
+        return round(ordered[max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)], 3)
+
+    return {'p50': rank(50), 'p95': rank(95), 'p99': rank(99)}
+
+
+def write_report(report, path, stdout):
+    payload = json.dumps(report, indent=2, default=str)
+    if path:
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(payload)
+        stdout.write(f'Report written to {path}')
+    else:
+        stdout.write(payload)
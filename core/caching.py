@@ -0,0 +1,141 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import replicas
+from .asyncviews import in_read_pool
+
+# --- API Response Cache (read-mostly endpoints) ---
+# Every cached model has a version token in the cache. A response key hashes the endpoint,
+# the caller's scope (role, or user for per-user querysets), the negotiated format, the query string and the
+# versions of the models it reads, so any write simply bumps the version and old entries
+# are never read again (they age out on their own). The same hash is the response ETag:
+# a poll carrying a matching If-None-Match gets 304 without touching the database.
+# Responses built from a read replica are keyed apart from the primary's and kept only for
+# REPLICA_STICKY_SECONDS: one built just after a write may predate it, and a client pinned to
+# the primary to read that write back must not be served it.
+# Versions are only as shared as the cache: a write bumps them in its own process's cache, so
+# the job worker and the web workers must use one shared backend (settings section 15). With a
+# per-process (locmem) cache, which never sees the other processes' bumps, entries only live
+# LOCAL_CACHE_SECONDS, which bounds how stale a response can get.
+CACHE_ALIAS = getattr(settings, 'API_CACHE_ALIAS', 'default')
+CACHE_SECONDS = getattr(settings, 'API_CACHE_SECONDS', 300)
+LOCAL_CACHE_SECONDS = getattr(settings, 'API_LOCAL_CACHE_SECONDS', 5)
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _version_key(model):
+    # Models, or plain labels for derived data that changes less often than its table
+    label = model if isinstance(model, str) else model._meta.label_lower
+    return f'api-version:{label}'
+
+
+def is_process_local():
+    return isinstance(_cache(), LocMemCache)
+
+
+def _entry_seconds():
+    seconds = min(CACHE_SECONDS, LOCAL_CACHE_SECONDS) if is_process_local() else CACHE_SECONDS
+    return min(seconds, replicas.STICKY_SECONDS) if replicas.reading_replica() else seconds
+
+
+def model_versions(*models):
+    cache = _cache()
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # add() keeps a concurrently created token; re-read whichever one won
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*models):
+    # A fresh timestamp (not incr) so an evicted version can never come back with an old value
+    _cache().set_many({_version_key(model): time.time_ns() for model in models}, None)
+
+
+class CachedResponseMixin:
+    """Caches list/retrieve payloads for ViewSets; set ``cache_models`` to the models read."""
+    cache_models = ()
+
+    def cache_scope(self, request):
+        return getattr(request.user, 'role', '').lower()
+
+    def cache_digest(self, request):
+        params = sorted(request.query_params.lists())
+        parts = [
+            request.path,
+            self.action,
+            getattr(getattr(request, 'accepted_renderer', None), 'format', ''),
+            self.cache_scope(request),
+            repr(params),
+            repr(model_versions(*self.cache_models)),
+            'replica' if replicas.reading_replica() else 'primary',
+        ]
+        return hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+    def cached_response(self, request, build):
+        digest = self.cache_digest(request)
+        if self._revalidated(request, digest):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            cache = _cache()
+            data = cache.get(f'api-response:{digest}')
+            if data is None:
+                response = build()
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                cache.set(f'api-response:{digest}', response.data, _entry_seconds())
+            else:
+                response = Response(data)
+        return self._cache_headers(response, digest)
+
+    async def acached_response(self, request, build):
+        """cached_response() for the async read path; ``build`` is a coroutine function."""
+        digest, data = await in_read_pool(self._cached_data)(request)
+        if self._revalidated(request, digest):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        elif data is None:
+            response = await build()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            await in_read_pool(_cache().set)(f'api-response:{digest}', response.data, _entry_seconds())
+        else:
+            response = Response(data)
+        return self._cache_headers(response, digest)
+
+    def _cached_data(self, request):
+        digest = self.cache_digest(request)
+        if self._revalidated(request, digest):
+            return digest, None
+        return digest, _cache().get(f'api-response:{digest}')
+
+    def _revalidated(self, request, digest):
+        return f'"{digest}"' in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]
+
+    def _cache_headers(self, response, digest):
+        response['ETag'] = f'"{digest}"'
+        # Clients must revalidate every poll; shared caches must not mix users' views
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Authorization', 'Accept'])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: super(CachedResponseMixin, self).list(request, *args, **kwargs))
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.acached_response(request, lambda: super(CachedResponseMixin, self).alist(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: super(CachedResponseMixin, self).retrieve(request, *args, **kwargs))
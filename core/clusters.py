@@ -0,0 +1,161 @@
+import math
+from collections import Counter, defaultdict
+
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .geo import split_bbox
+from .models import ClusterCell
+
+# --- Map Clusters (/api/vessels/clusters/?bbox=&zoom=) ---
+# Clusters are the Web-Mercator tiles of zoom + CELL_SHIFT, i.e. 64px squares on screen, so a
+# world view is a few hundred markers instead of the whole fleet. ClusterCell counts vessels per
+# (tile, vessel_type, status) at every level a cluster request can read; a Vessel write moves
+# its count only at the levels where its tile changed, which for a ship under way is mostly the
+# finest one. A request reads the tiles CENTROID_SHIFT levels below its clusters and folds them
+# up: the count-weighted mean of those sub-tile centres is the cluster centroid, within an
+# eighth of a cluster's width. Writers that skip model signals (bulk_create, queryset.update())
+# must call rebuild() afterwards, as core.synthetic does; changing CLUSTER_MAX_ZOOM needs one too.
+MAX_ZOOM = getattr(settings, 'CLUSTER_MAX_ZOOM', 7)
+CELL_SHIFT = 2
+CENTROID_SHIFT = 2
+MIN_LEVEL = CELL_SHIFT + CENTROID_SHIFT
+MAX_LEVEL = MAX_ZOOM + MIN_LEVEL
+MAX_MERCATOR_LAT = 85.0511287798
+CHUNK = 500
+
+
+def tile(lat, lon, level):
+    """(x, y) of the Web-Mercator tile holding a point at ``level`` (slippy-map numbering, y down)."""
+    n = 1 << level
+    lat = min(max(lat, -MAX_MERCATOR_LAT), MAX_MERCATOR_LAT)
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_lon(x, level):
+    return x / (1 << level) * 360.0 - 180.0
+
+
+def tile_lat(y, level):
+    return math.degrees(math.atan(math.sinh(math.pi * (1.0 - 2.0 * y / (1 << level)))))
+
+
+def cell_key(level, x, y):
+    return (level << 56) | (y << 28) | x
+
+
+def contributions(state):
+    """(level, x, y, vessel_type, status) cells a vessel in ``state`` (Vessel.cluster_state()) is counted in."""
+    if state is None:
+        return []
+    lat, lon, vessel_type, status = state
+    if lat is None or lon is None:
+        return []
+    x, y = tile(lat, lon, MAX_LEVEL)
+    return [
+        (level, x >> (MAX_LEVEL - level), y >> (MAX_LEVEL - level), vessel_type, status)
+        for level in range(MIN_LEVEL, MAX_LEVEL + 1)
+    ]
+
+
+def record_change(old_state, new_state):
+    record_changes([(old_state, new_state)])
+
+
+def record_changes(changes):
+    """Applies many vessels' (old state, new state) pairs with one UPDATE per (type, status, amount) group."""
+    totals = Counter()
+    for old_state, new_state in changes:
+        if old_state != new_state:
+            totals.subtract(contributions(old_state))
+            totals.update(contributions(new_state))
+    totals = {row: amount for row, amount in totals.items() if amount}
+    if not totals:
+        return
+    groups = defaultdict(list)
+    for (level, x, y, vessel_type, status), amount in sorted(totals.items()):
+        groups[vessel_type, status, amount].append(cell_key(level, x, y))
+    with transaction.atomic():
+        # Cells a vessel enters may not exist yet: create them empty, so every change is an increment
+        ClusterCell.objects.bulk_create([
+            ClusterCell(cell=cell_key(level, x, y), level=level, x=x, y=y, vessel_type=vessel_type, status=status)
+            for (level, x, y, vessel_type, status), amount in totals.items() if amount > 0
+        ], batch_size=CHUNK, ignore_conflicts=True)
+        for (vessel_type, status, amount), cells in groups.items():
+            for start in range(0, len(cells), CHUNK):
+                ClusterCell.objects.filter(
+                    cell__in=cells[start:start + CHUNK], vessel_type=vessel_type, status=status,
+                ).update(vessels=F('vessels') + amount)
+        if min(totals.values()) < 0:
+            ClusterCell.objects.filter(vessels=0).delete()
+
+
+def rebuild(apps=django_apps):
+    """Recounts every cell from Vessel; ``apps`` may be a migration's historical registry."""
+    Vessel = apps.get_model('core', 'Vessel')
+    Cell = apps.get_model('core', 'ClusterCell')
+    totals = Counter()
+    fields = ('last_position_lat', 'last_position_lon', 'vessel_type', 'status')
+    for state in Vessel.objects.values_list(*fields).iterator(chunk_size=CHUNK * 10):
+        totals.update(contributions(state))
+    with transaction.atomic():
+        Cell.objects.all().delete()
+        Cell.objects.bulk_create([
+            Cell(cell=cell_key(level, x, y), level=level, x=x, y=y, vessel_type=vessel_type, status=status, vessels=vessels)
+            for (level, x, y, vessel_type, status), vessels in totals.items()
+        ], batch_size=CHUNK * 10)
+    return {'cells': len(totals)}
+
+
+# --- Map reads (cell rows only) ---
+def _dominant(counts):
+    # Most vessels; ties go to the first name alphabetically so the answer is stable
+    return min(counts.items(), key=lambda item: (-item[1], item[0]))[0]
+
+
+def clusters(bbox, zoom, statuses=None):
+    """Clusters covering ``bbox`` (west, south, east, north; None for the world) at map ``zoom`` <= MAX_ZOOM.
+
+    Every cluster touching the box is returned whole, so clusters stay put while the map pans.
+    """
+    level = zoom + CELL_SHIFT
+    sub_level = level + CENTROID_SHIFT
+    found = {}
+    for west, south, east, north in split_bbox(bbox) if bbox else [(-180.0, -90.0, 180.0, 90.0)]:
+        (x0, y0), (x1, y1) = tile(north, west, level), tile(south, east, level)
+        rows = ClusterCell.objects.filter(
+            level=sub_level,
+            x__gte=x0 << CENTROID_SHIFT, x__lt=(x1 + 1) << CENTROID_SHIFT,
+            y__gte=y0 << CENTROID_SHIFT, y__lt=(y1 + 1) << CENTROID_SHIFT,
+        )
+        if statuses is not None:
+            rows = rows.filter(status__in=statuses)
+        for x, y, vessel_type, status, vessels in rows.values_list('x', 'y', 'vessel_type', 'status', 'vessels'):
+            cluster = found.setdefault((x >> CENTROID_SHIFT, y >> CENTROID_SHIFT), [0, 0.0, 0.0, Counter(), Counter()])
+            cluster[0] += vessels
+            cluster[1] += vessels * tile_lat(y + 0.5, sub_level)
+            cluster[2] += vessels * tile_lon(x + 0.5, sub_level)
+            cluster[3][vessel_type] += vessels
+            cluster[4][status] += vessels
+
+    results = [
+        {
+            'lat': round(lat_sum / count, 5),
+            'lon': round(lon_sum / count, 5),
+            'count': count,
+            'vessel_type': _dominant(types),
+            'status': _dominant(statuses_seen),
+            # The cluster's tile, for zooming into it: [west, south, east, north]
+            'bbox': [
+                round(tile_lon(x, level), 5), round(tile_lat(y + 1, level), 5),
+                round(tile_lon(x + 1, level), 5), round(tile_lat(y, level), 5),
+            ],
+        }
+        for (x, y), (count, lat_sum, lon_sum, types, statuses_seen) in found.items() if count > 0
+    ]
+    results.sort(key=lambda cluster: (-cluster['count'], cluster['lat'], cluster['lon']))
+    return results
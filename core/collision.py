@@ -0,0 +1,267 @@
+import math
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import jobs
+from .geo import EARTH_RADIUS_KM
+from .geofence import publish_events, unit_vectors
+from .models import CloseEncounter, Event, Job, Vessel, VesselTrackState
+from .notifications import notify
+
+# --- Closest-Point-of-Approach (CPA / TCPA) Collision Screening ---
+# Each vessel's course and speed over ground come from its track state (core/tracking.py,
+# derived from consecutive VesselHistory fixes), and its position is dead-reckoned from the
+# last fix to the start of the pass. Positions are hashed into cubic cells in earth-centred
+# coordinates, which have no dateline or pole seams. Each vessel under way is paired only with
+# vessels in the 27 cells around its own, and CPA / TCPA for those pairs are computed as
+# float32 arrays, assuming straight-line motion. Pairs where both vessels are stopped are
+# skipped. A pass records pairs that newly come within CPA_KM: an Event for each vessel and a
+# single Notification. Open encounters are stored as CloseEncounter rows, so the next pass
+# neither repeats them nor misses when they clear.
+CPA_KM = getattr(settings, 'COLLISION_CPA_KM', 1.0)
+HORIZON_MINUTES = getattr(settings, 'COLLISION_HORIZON_MINUTES', 15.0)
+MIN_SPEED_KNOTS = getattr(settings, 'COLLISION_MIN_SPEED_KNOTS', 2.0)
+# Faster SOG readings are treated as AIS glitches and clipped; this also bounds the cell size
+MAX_SPEED_KNOTS = getattr(settings, 'COLLISION_MAX_SPEED_KNOTS', 30.0)
+MAX_FIX_AGE_MINUTES = getattr(settings, 'COLLISION_MAX_FIX_AGE_MINUTES', 30)
+INTERVAL_SECONDS = getattr(settings, 'COLLISION_INTERVAL_SECONDS', 30)
+# An encounter stays open (no repeat alert) until its CPA opens beyond this multiple of CPA_KM
+CLEAR_FACTOR = 1.5
+EVENT_TYPE = 'Collision Risk'
+KM_PER_DEGREE = math.radians(EARTH_RADIUS_KM)
+KM_PER_MINUTE_PER_KNOT = 1.852 / 60.0
+PAIR_BLOCK = 1 << 21
+MAX_SLICES = 16
+# One more slice (hashing every vessel again) costs about as much as this many CPA tests per
+# vessel; measured with `manage.py bench_collisions`
+SLICE_COST_PAIRS = 30
+ID_CHUNK = 5000
+
+_CELL_BITS = 21
+_CELL_BIAS = 1 << (_CELL_BITS - 1)
+# Key differences to the 27 cells around (and including) a cell; keys are packed (x, y, z)
+_NEIGHBOUR_DELTAS = [
+    (x << (2 * _CELL_BITS)) + (y << _CELL_BITS) + z for x in (-1, 0, 1) for y in (-1, 0, 1) for z in (-1, 0, 1)
+]
+
+
+def _cell_keys(points, cell_km):
+    cells = np.floor(points * (EARTH_RADIUS_KM / cell_km)).astype(np.int64) + _CELL_BIAS
+    return (cells[:, 0] << (2 * _CELL_BITS)) | (cells[:, 1] << _CELL_BITS) | cells[:, 2]
+
+
+def velocities(speed_knots, course):
+    """East / north velocity in km per minute; an unknown course counts as stopped."""
+    speed_knots = np.asarray(speed_knots, dtype=np.float64)
+    course = np.asarray(course, dtype=np.float64)
+    speed = np.clip(np.nan_to_num(speed_knots), 0.0, MAX_SPEED_KNOTS) * KM_PER_MINUTE_PER_KNOT
+    speed = np.where(np.isnan(course), 0.0, speed)
+    heading = np.radians(np.nan_to_num(course))
+    return speed * np.sin(heading), speed * np.cos(heading)
+
+
+def _motion(lat, lon, east, north):
+    """Earth-centred position (km) and velocity (km per minute) components, as float32 columns."""
+    rad_lat, rad_lon = np.radians(lat), np.radians(lon)
+    sin_lat, cos_lat, sin_lon, cos_lon = np.sin(rad_lat), np.cos(rad_lat), np.sin(rad_lon), np.cos(rad_lon)
+    position = unit_vectors(lat, lon).T * EARTH_RADIUS_KM
+    velocity = (-east * sin_lon - north * sin_lat * cos_lon, east * cos_lon - north * sin_lat * sin_lon, north * cos_lat)
+    # float32 keeps positions to ~0.5 m and halves the memory traffic of the pair gathers
+    return [column.astype(np.float32) for column in (*position, *velocity)]
+
+
+def _pair_cpa(first, second, horizon_minutes):
+    """CPA (km) and TCPA (minutes) for straight-line motion, from gathered (x, y, z, vx, vy, vz) columns."""
+    rx, ry, rz, vx, vy, vz = (b - a for a, b in zip(first, second))
+    closing = vx * vx + vy * vy + vz * vz
+    tcpa = -(rx * vx + ry * vy + rz * vz) / np.maximum(closing, 1e-12)
+    # Already opening (tcpa < 0): the closest point is now
+    np.clip(tcpa, 0.0, horizon_minutes, out=tcpa)
+    rx += vx * tcpa
+    ry += vy * tcpa
+    rz += vz * tcpa
+    return np.sqrt(rx * rx + ry * ry + rz * rz), tcpa
+
+
+def _slice_encounters(columns, points, moving, cell_km, cpa_km, horizon_minutes):
+    """Yields (first, second, cpa, tcpa) for pairs closer than ``cell_km`` at ``points`` that pass
+    within ``cpa_km``; ``first`` is under way and a pair of two moving vessels appears once."""
+    keys = _cell_keys(points, cell_km)
+    order = np.argsort(keys, kind='stable')
+    # Work in cell order: a neighbour cell is then a contiguous run of every column
+    columns = [column[order] for column in columns]
+    moving = moving[order]
+    cell_keys, cell_starts, cell_sizes = np.unique(keys[order], return_index=True, return_counts=True)
+    queries = np.flatnonzero(moving)
+    query_cells, query_cell = np.unique(keys[order][queries], return_inverse=True)
+    query_columns = [column[queries] for column in columns]
+    for delta in _NEIGHBOUR_DELTAS:
+        neighbour = query_cells + delta
+        slot = np.minimum(np.searchsorted(cell_keys, neighbour), len(cell_keys) - 1)
+        sizes = np.where(cell_keys[slot] == neighbour, cell_sizes[slot], 0)[query_cell]
+        starts = cell_starts[slot][query_cell]
+        ends = np.cumsum(sizes)
+        if not len(ends) or not ends[-1]:
+            continue
+        # Expand each query against every vessel in that cell, PAIR_BLOCK pairs at a time
+        low = 0
+        while low < len(queries):
+            done = ends[low - 1] if low else 0
+            high = max(int(np.searchsorted(ends, done + PAIR_BLOCK, side='right')), low + 1)
+            block = sizes[low:high]
+            total = int(block.sum())
+            if total:
+                first = np.repeat(np.arange(low, high), block)
+                second = np.repeat(starts[low:high], block) + (np.arange(total) - np.repeat(np.cumsum(block) - block, block))
+                cpa, tcpa = _pair_cpa(
+                    [column[low:high].repeat(block) for column in query_columns],
+                    [column[second] for column in columns],
+                    horizon_minutes,
+                )
+                close = np.flatnonzero(cpa < cpa_km)
+                first, second = queries[first[close]], second[close]
+                # Drop each vessel paired with itself, and the second copy of moving-moving pairs
+                keep = (first != second) & (~moving[second] | (first < second))
+                close = close[keep]
+                yield order[first[keep]], order[second[keep]], cpa[close], tcpa[close]
+            low = high
+
+
+def _slice_count(points, moving, cpa_km, drift_km):
+    """The slice count with the least estimated work: each slice re-hashes every vessel, and
+    shrinks the cells, so fewer candidate pairs reach the CPA test."""
+    _, cell, occupancy = np.unique(_cell_keys(points, cpa_km + drift_km), return_inverse=True, return_counts=True)
+    # The 27 cells around a vessel on the sphere's surface hold about ten times its own cell
+    pairs = 10.0 * occupancy[cell][moving].sum()
+
+    def work(slices):
+        shrink = (cpa_km + drift_km / slices) / (cpa_km + drift_km)
+        return slices * SLICE_COST_PAIRS * len(points) + pairs * slices * shrink * shrink
+
+    return min(range(1, MAX_SLICES + 1), key=work)
+
+
+def close_approaches(lat, lon, east, north, cpa_km=CPA_KM, horizon_minutes=HORIZON_MINUTES,
+                     min_speed_knots=MIN_SPEED_KNOTS, slices=None):
+    """(first, second, cpa_km, tcpa_minutes) arrays for vessel index pairs (first < second) that
+    pass within ``cpa_km`` of each other in the next ``horizon_minutes``."""
+    lat, lon = np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)
+    east, north = np.asarray(east, dtype=np.float64), np.asarray(north, dtype=np.float64)
+    speed = np.hypot(east, north)
+    moving = speed >= min_speed_knots * KM_PER_MINUTE_PER_KNOT
+    empty = (np.zeros(0, dtype=np.int64),) * 2 + (np.zeros(0),) * 2
+    if not moving.any() or len(lat) < 2:
+        return empty
+
+    # The horizon is cut into time slices. Within one, each vessel strays at most half a slice's
+    # run from its mid-slice position, so pairs closer than CPA + both strays there are enough
+    drift_km = (speed[moving].max() + speed.max()) * horizon_minutes / 2.0
+    columns = _motion(lat, lon, east, north)
+    position = np.column_stack(columns[:3]).astype(np.float64)
+    velocity = np.column_stack(columns[3:]).astype(np.float64)
+    if slices is None:
+        slices = _slice_count(position / EARTH_RADIUS_KM, moving, cpa_km, drift_km)
+    slice_minutes = horizon_minutes / slices
+    cell_km = cpa_km + drift_km / slices
+
+    found = []
+    for step in range(slices):
+        points = (position + velocity * ((step + 0.5) * slice_minutes)) / EARTH_RADIUS_KM
+        found.extend(_slice_encounters(columns, points, moving, cell_km, cpa_km, horizon_minutes))
+    if not found:
+        return empty
+    first, second, cpa, tcpa = (np.concatenate(parts) for parts in zip(*found))
+    low, high = np.minimum(first, second), np.maximum(first, second)
+    # A pair is usually found in several slices
+    _, unique = np.unique(low * len(lat) + high, return_index=True)
+    return low[unique], high[unique], cpa[unique], tcpa[unique]
+
+
+# --- Fleet pass ---
+def _chunks(values, size=ID_CHUNK):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _fleet(now):
+    """Active vessels with a recent fix: ids and dead-reckoned lat / lon / east / north arrays."""
+    rows = list(
+        VesselTrackState.objects.filter(
+            vessel__status='Active', last_fix_at__gte=now - timedelta(minutes=MAX_FIX_AGE_MINUTES),
+        ).values_list('vessel_id', 'last_fix_at', 'last_lat', 'last_lon', 'speed_knots', 'course')
+        .iterator(chunk_size=ID_CHUNK)
+    )
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    minutes = np.array([(now - row[1]).total_seconds() / 60.0 for row in rows], dtype=np.float64)
+    lat = np.array([row[2] for row in rows], dtype=np.float64)
+    lon = np.array([row[3] for row in rows], dtype=np.float64)
+    east, north = velocities(
+        np.array([row[4] for row in rows], dtype=np.float64), np.array([row[5] for row in rows], dtype=np.float64),
+    )
+    moved_lat = np.clip(lat + north * minutes / KM_PER_DEGREE, -90.0, 90.0)
+    moved_lon = lon + east * minutes / (KM_PER_DEGREE * np.maximum(np.cos(np.radians(lat)), 0.01))
+    return ids, moved_lat, (moved_lon + 180.0) % 360.0 - 180.0, east, north
+
+
+def schedule():
+    """Queues a pass INTERVAL_SECONDS out unless one is already waiting, so ingestion triggers at most one per interval."""
+    if not Job.objects.filter(task='collisions.screen', status=Job.QUEUED).exists():
+        jobs.enqueue('collisions.screen', delay=INTERVAL_SECONDS)
+
+
+def screen(now=None):
+    """Screens every active vessel with a recent fix and records new and cleared close encounters."""
+    now = now or timezone.now()
+    ids, lat, lon, east, north = _fleet(now)
+    # Encounters already open stay open until they clear the wider CLEAR_FACTOR margin
+    first, second, cpa, tcpa = close_approaches(lat, lon, east, north, CPA_KM * CLEAR_FACTOR)
+    near = {
+        (int(ids[i]), int(ids[j])) if ids[i] < ids[j] else (int(ids[j]), int(ids[i])): (i, j, c, t)
+        for i, j, c, t in zip(first.tolist(), second.tolist(), cpa.tolist(), tcpa.tolist())
+    }
+    previous = {(a, b): pk for a, b, pk in CloseEncounter.objects.values_list('vessel_a_id', 'vessel_b_id', 'id')}
+
+    opened = sorted(key for key, (_, _, c, _) in near.items() if c < CPA_KM and key not in previous)
+    cleared = [pk for key, pk in previous.items() if key not in near]
+    # Names only for the vessels being reported; joining them for the whole fleet costs a third of the load
+    vessel_names = {}
+    for chunk in _chunks({vessel_id for pair in opened for vessel_id in pair}):
+        vessel_names.update(Vessel.objects.filter(id__in=chunk).values_list('id', 'name'))
+    # A vessel deleted since the fleet was read has no encounter left to report
+    opened = [pair for pair in opened if pair[0] in vessel_names and pair[1] in vessel_names]
+    result = {'vessels': len(ids), 'open': len(previous) - len(cleared) + len(opened), 'new': len(opened),
+              'cleared': len(cleared)}
+    if not opened and not cleared:
+        return result
+
+    encounters, events = [], []
+    for vessel_a, vessel_b in opened:
+        i, j, c, t = near[(vessel_a, vessel_b)]
+        encounters.append(CloseEncounter(vessel_a_id=vessel_a, vessel_b_id=vessel_b, cpa_km=c, tcpa_minutes=t))
+        for own, other in ((i, j), (j, i)):
+            events.append(Event(
+                vessel_id=int(ids[own]),
+                event_type=EVENT_TYPE,
+                location=f'{lat[own]:.5f},{lon[own]:.5f}',
+                details=f'{vessel_names[int(ids[own])]} may pass within {c:.2f} km of {vessel_names[int(ids[other])]} in {t:.0f} min (CPA / TCPA).',
+            ))
+
+    with transaction.atomic():
+        CloseEncounter.objects.bulk_create(encounters, batch_size=ID_CHUNK, ignore_conflicts=True)
+        for chunk in _chunks(cleared):
+            CloseEncounter.objects.filter(id__in=chunk).delete()
+        Event.objects.bulk_create(events, batch_size=ID_CHUNK)
+        if encounters:
+            pairs = [
+                f'{vessel_names[e.vessel_a_id]} / {vessel_names[e.vessel_b_id]} ({e.cpa_km:.2f} km in {e.tcpa_minutes:.0f} min)'
+                for e in encounters[:5]
+            ]
+            notify(f'⚠️ {len(encounters)} close-approach risk(s): {", ".join(pairs)}{" ..." if len(encounters) > 5 else ""}')
+        # bulk_create skips post_save, so hand the events to live streams explicitly
+        transaction.on_commit(lambda: publish_events(events, vessel_names))
+    return result
@@ -0,0 +1,142 @@
+import json
+import struct
+
+import numpy as np
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+# --- Columnar Map Layers (Accept: application/vnd.maritime.columnar or ?format=columnar) ---
+# Layout, little-endian throughout:
+#   b'MCOL' | uint32 header length | UTF-8 JSON header | zero padding to 8 bytes | column data
+# The header lists {"name", "dtype", "offset", "categories"?} per column plus "rows" and any
+# extras (e.g. "next" for cursor pages). Offsets count from the start of the column data and
+# every column starts on an 8-byte boundary, so a browser wraps each one without copying:
+#   new Float32Array(buffer, dataStart + column.offset, header.rows)
+# Text columns are dictionary-encoded: uint8/uint16 codes into "categories".
+MEDIA_TYPE = 'application/vnd.maritime.columnar'
+MAGIC = b'MCOL'
+VERSION = 1
+
+
+def _pad(size):
+    return -size % 8
+
+
+class ColumnarPayload:
+    def __init__(self, rows, **extra):
+        self.rows = rows
+        self.extra = extra
+        self.columns = []  # (name, array, categories)
+
+    def add(self, name, values, dtype):
+        self.columns.append((name, np.asarray(values, dtype=dtype), None))
+        return self
+
+    def add_categories(self, name, values):
+        categories, codes = np.unique(np.asarray(values, dtype=object).astype(str), return_inverse=True)
+        dtype = np.uint8 if len(categories) <= 0xFF else np.uint16
+        self.columns.append((name, codes.astype(dtype), categories.tolist()))
+        return self
+
+
+def encode(payload):
+    described, chunks, offset = [], [], 0
+    for name, values, categories in payload.columns:
+        data = values.astype(values.dtype.newbyteorder('<'), copy=False).tobytes()
+        entry = {'name': name, 'dtype': values.dtype.name, 'offset': offset}
+        if categories is not None:
+            entry['categories'] = categories
+        described.append(entry)
+        chunks.append(data + b'\0' * _pad(len(data)))
+        offset += len(chunks[-1])
+
+    header = json.dumps(
+        {'version': VERSION, 'rows': payload.rows, 'columns': described, **payload.extra},
+        separators=(',', ':'), default=str,
+    ).encode()
+    prefix = MAGIC + struct.pack('<I', len(header)) + header
+    return b''.join([prefix, b'\0' * _pad(len(prefix))] + chunks)
+
+
+def decode(content):
+    """Inverse of encode(): (header, {name: array or list of category labels})."""
+    if content[:4] != MAGIC:
+        raise ValueError('Not a columnar payload')
+    (length,) = struct.unpack_from('<I', content, 4)
+    header = json.loads(content[8:8 + length])
+    start = 8 + length + _pad(8 + length)
+    columns = {}
+    for column in header['columns']:
+        values = np.frombuffer(content, dtype=np.dtype(column['dtype']).newbyteorder('<'),
+                               count=header['rows'], offset=start + column['offset'])
+        if 'categories' in column:
+            values = [column['categories'][code] for code in values.tolist()]
+        columns[column['name']] = values
+    return header, columns
+
+
+# --- Layers (straight from values_list: no model instances, no serializers) ---
+VESSEL_FIELDS = ('id', 'mmsi', 'last_position_lat', 'last_position_lon', 'vessel_type', 'status')
+HISTORY_FIELDS = ('vessel_id', 'latitude', 'longitude', 'timestamp')
+
+
+def _ids(values):
+    ids = np.asarray(values, dtype=np.int64)
+    # uint32 covers any realistic table; float64 stays exact (to 2**53) beyond that
+    return ids.astype(np.uint32 if not len(ids) or ids.max() < 2 ** 32 else np.float64)
+
+
+def vessel_columns(queryset):
+    rows = list(queryset.values_list(*VESSEL_FIELDS))
+    ids, mmsis, lats, lons, types, statuses = zip(*rows) if rows else ([],) * len(VESSEL_FIELDS)
+    payload = ColumnarPayload(len(rows))
+    payload.columns.append(('id', _ids(ids), None))
+    # 0 stands in for a missing MMSI (never a valid one)
+    payload.add('mmsi', [mmsi or 0 for mmsi in mmsis], np.uint32)
+    payload.add('lat', lats, np.float32).add('lon', lons, np.float32)
+    return payload.add_categories('type', types).add_categories('status', statuses)
+
+
+def history_columns(rows, **extra):
+    """``rows`` are dicts of HISTORY_FIELDS (CursorPagination needs mappings, not tuples)."""
+    payload = ColumnarPayload(len(rows), **extra)
+    payload.columns.append(('vessel', _ids([row['vessel_id'] for row in rows]), None))
+    payload.add('lat', [row['latitude'] for row in rows], np.float32)
+    payload.add('lon', [row['longitude'] for row in rows], np.float32)
+    # Whole epoch seconds; AIS fixes carry no sub-second precision worth a float64
+    return payload.add('timestamp', [row['timestamp'].timestamp() for row in rows], np.uint32)
+
+
+class ColumnarRenderer(BaseRenderer):
+    media_type = MEDIA_TYPE
+    format = 'columnar'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, ColumnarPayload):
+            return encode(data)
+        # Errors and other plain payloads stay JSON so clients can still read them
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = JSONRenderer.media_type
+        return JSONRenderer().render(data, renderer_context=renderer_context)
+
+
+class ColumnarListMixin:
+    """Offers ColumnarRenderer on ``list``; the view implements ``columnar_list(request)``."""
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if self.action == 'list':
+            renderers.append(ColumnarRenderer())
+        return renderers
+
+    def wants_columnar(self, request):
+        return getattr(request, 'accepted_renderer', None) is not None and request.accepted_renderer.format == ColumnarRenderer.format
+
+    def list(self, request, *args, **kwargs):
+        if self.wants_columnar(request):
+            return self.columnar_list(request)
+        return super().list(request, *args, **kwargs)
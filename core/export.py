@@ -0,0 +1,203 @@
+import csv
+import io
+import json
+import zlib
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import router
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional: pip install pyarrow
+    pa = pq = None
+
+# --- Streaming Bulk Export (/api/export/history/, /api/export/voyages/) ---
+# Rows come off a server-side cursor (.iterator) as plain tuples, are encoded CHUNK rows at
+# a time and leave the process as soon as they are encoded, so memory stays flat whatever
+# the export size. Under ASGI the chunks are produced in the request's DB thread and handed
+# to the event loop one by one; a sync iterator would make Django buffer the whole body.
+EXPORT_CHUNK = getattr(settings, 'EXPORT_CHUNK_ROWS', 5000)
+GZIP_LEVEL = 6
+
+# (output name, ORM lookup, kind)
+HISTORY_COLUMNS = [
+    ('id', 'id', 'int'),
+    ('vessel_id', 'vessel_id', 'int'),
+    ('mmsi', 'vessel__mmsi', 'int'),
+    ('vessel_name', 'vessel__name', 'str'),
+    ('latitude', 'latitude', 'float'),
+    ('longitude', 'longitude', 'float'),
+    ('timestamp', 'timestamp', 'datetime'),
+]
+VOYAGE_COLUMNS = [
+    ('id', 'id', 'int'),
+    ('vessel_id', 'vessel_id', 'int'),
+    ('mmsi', 'vessel__mmsi', 'int'),
+    ('vessel_name', 'vessel__name', 'str'),
+    ('port_from_id', 'port_from_id', 'int'),
+    ('port_from_name', 'port_from__name', 'str'),
+    ('port_to_id', 'port_to_id', 'int'),
+    ('port_to_name', 'port_to__name', 'str'),
+    ('departure_time', 'departure_time', 'datetime'),
+    ('arrival_time', 'arrival_time', 'datetime'),
+    ('status', 'status', 'str'),
+]
+
+
+# --- Formats (DRF renderers only negotiate Accept / ?format=; the body is streamed) ---
+class ExportRenderer(BaseRenderer):
+    charset = None
+    extension = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only error bodies get here; keep them readable JSON
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = JSONRenderer.media_type
+        return JSONRenderer().render(data, renderer_context=renderer_context)
+
+
+class CSVRenderer(ExportRenderer):
+    media_type = 'text/csv'
+    format = extension = 'csv'
+
+
+class NDJSONRenderer(ExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = extension = 'ndjson'
+
+
+class ParquetRenderer(ExportRenderer):
+    media_type = 'application/vnd.apache.parquet'
+    format = extension = 'parquet'
+
+
+def export_renderers():
+    renderers = [CSVRenderer, NDJSONRenderer]
+    return renderers + [ParquetRenderer] if pa is not None else renderers
+
+
+def _batches(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def _text_values(columns, batch):
+    datetimes = [i for i, (_, _, kind) in enumerate(columns) if kind == 'datetime']
+    for row in batch:
+        if datetimes:
+            row = list(row)
+            for i in datetimes:
+                if row[i] is not None:
+                    row[i] = row[i].isoformat()
+        yield row
+
+
+def csv_chunks(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow([name for name, _, _ in columns])
+    for batch in _batches(rows, EXPORT_CHUNK):
+        writer.writerows(_text_values(columns, batch))
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def ndjson_chunks(columns, rows):
+    names = [name for name, _, _ in columns]
+    for batch in _batches(rows, EXPORT_CHUNK):
+        yield ''.join(
+            json.dumps(dict(zip(names, row)), separators=(',', ':')) + '\n'
+            for row in _text_values(columns, batch)
+        ).encode()
+
+
+class _Drain:
+    """Write-only sink ParquetWriter fills; every flushed row group is taken out at once."""
+
+    def __init__(self):
+        self.parts = []
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        parts, self.parts = self.parts, []
+        return b''.join(parts)
+
+
+def parquet_chunks(columns, rows):
+    kinds = {'int': pa.int64(), 'float': pa.float64(), 'str': pa.string(), 'datetime': pa.timestamp('us', tz='UTC')}
+    schema = pa.schema([(name, kinds[kind]) for name, _, kind in columns])
+    sink = _Drain()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema, compression='zstd')
+    try:
+        for batch in _batches(rows, EXPORT_CHUNK):
+            # One row group per chunk: readers can start before the export ends
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(zip(*batch), schema)], schema=schema,
+            ))
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+WRITERS = {'csv': csv_chunks, 'ndjson': ndjson_chunks, 'parquet': parquet_chunks}
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+async def _async_chunks(chunks):
+    step = sync_to_async(next, thread_sensitive=True)
+    while (chunk := await step(chunks, None)) is not None:
+        yield chunk
+
+
+def streaming_export(request, queryset, columns, name, renderer):
+    """A StreamingHttpResponse writing ``queryset`` in ``renderer``'s format, gzipped when accepted."""
+    # Rows are read after the view has returned, outside the request's replica routing: pick the database now
+    queryset = queryset.using(router.db_for_read(queryset.model))
+    rows = queryset.values_list(*[lookup for _, lookup, _ in columns]).iterator(chunk_size=EXPORT_CHUNK)
+    chunks = WRITERS[renderer.format](columns, rows)
+    # Parquet pages are already compressed
+    gzipped = renderer.format != 'parquet' and 'gzip' in request.headers.get('Accept-Encoding', '')
+    if gzipped:
+        chunks = gzip_chunks(chunks)
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        chunks = _async_chunks(chunks)
+
+    response = StreamingHttpResponse(chunks, content_type=renderer.media_type)
+    stamp = timezone.now().strftime('%Y%m%dT%H%M%SZ')
+    response['Content-Disposition'] = f'attachment; filename="{name}-{stamp}.{renderer.extension}"'
+    response['Vary'] = 'Accept, Accept-Encoding, Authorization'
+    response['Cache-Control'] = 'no-store'
+    if gzipped:
+        response['Content-Encoding'] = 'gzip'
+    return response
@@ -0,0 +1,125 @@
+import math
+
+from django.conf import settings
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+
+# --- Spatial Grid Index ---
+# The globe is cut into fixed lat/lon cells; each Vessel / VesselHistory row stores its
+# cell number in an indexed ``grid_cell`` column so viewport queries become an IN() over a
+# handful of cells before the exact lat/lon range check.
+EARTH_RADIUS_KM = 6371.0
+GRID_CELL_DEGREES = getattr(settings, 'GRID_CELL_DEGREES', 1.0)
+GRID_COLUMNS = int(math.ceil(360.0 / GRID_CELL_DEGREES))
+GRID_ROWS = int(math.ceil(180.0 / GRID_CELL_DEGREES))
+
+# Past this many cells the IN() list costs more than it saves (e.g. world view)
+MAX_QUERY_CELLS = getattr(settings, 'GRID_MAX_QUERY_CELLS', 400)
+
+
+def grid_row(lat):
+    return min(max(int(math.floor((lat + 90.0) / GRID_CELL_DEGREES)), 0), GRID_ROWS - 1)
+
+
+def grid_col(lon):
+    return min(max(int(math.floor((lon + 180.0) / GRID_CELL_DEGREES)), 0), GRID_COLUMNS - 1)
+
+
+def grid_cell(lat, lon):
+    return grid_row(lat) * GRID_COLUMNS + grid_col(lon)
+
+
+def split_bbox(bbox):
+    """Splits a (west, south, east, north) box crossing the antimeridian into two plain boxes."""
+    west, south, east, north = bbox
+    if west <= east:
+        return [bbox]
+    return [(west, south, 180.0, north), (-180.0, south, east, north)]
+
+
+def cells_for_bbox(bbox):
+    """Returns the grid cells covering a plain box, or None when there are too many to be worth listing."""
+    west, south, east, north = bbox
+    rows = range(grid_row(south), grid_row(north) + 1)
+    cols = range(grid_col(west), grid_col(east) + 1)
+    if len(rows) * len(cols) > MAX_QUERY_CELLS:
+        return None
+    return [row * GRID_COLUMNS + col for row in rows for col in cols]
+
+
+def parse_bbox(value):
+    # Same ordering as Leaflet's LatLngBounds.toBBoxString(): "west,south,east,north"
+    try:
+        west, south, east, north = (float(part) for part in value.split(','))
+    except ValueError:
+        raise ValueError('bbox must be "west,south,east,north"')
+    if not (-90.0 <= south <= north <= 90.0 and -180.0 <= west <= 180.0 and -180.0 <= east <= 180.0):
+        raise ValueError('bbox out of range')
+    return west, south, east, north
+
+
+def parse_point(value):
+    try:
+        lat, lon = (float(part) for part in value.split(','))
+    except ValueError:
+        raise ValueError('point must be "lat,lon"')
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+        raise ValueError('point out of range')
+    return lat, lon
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def radius_bbox(lat, lon, radius_km):
+    """Smallest (west, south, east, north) box containing the circle; wraps across the antimeridian when needed."""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    south, north = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    if south <= -90.0 or north >= 90.0:
+        return -180.0, south, 180.0, north
+    dlon = math.degrees(radius_km / (EARTH_RADIUS_KM * math.cos(math.radians(max(abs(south), abs(north))))))
+    if dlon >= 180.0:
+        return -180.0, south, 180.0, north
+    west, east = lon - dlon, lon + dlon
+    if west < -180.0:
+        west += 360.0
+    if east > 180.0:
+        east -= 360.0
+    return west, south, east, north
+
+
+# --- Queryset Helpers ---
+def bbox_q(bbox, lat_field, lon_field, cell_field='grid_cell'):
+    condition = Q()
+    for west, south, east, north in split_bbox(bbox):
+        box = Q(**{
+            f'{lat_field}__gte': south, f'{lat_field}__lte': north,
+            f'{lon_field}__gte': west, f'{lon_field}__lte': east,
+        })
+        cells = cells_for_bbox((west, south, east, north))
+        if cells is not None:
+            box &= Q(**{f'{cell_field}__in': cells})
+        condition |= box
+    return condition
+
+
+def distance_expression(lat, lon, lat_field, lon_field):
+    # Haversine in SQL; Django provides these math functions on SQLite as well as Postgres
+    lat0 = math.radians(lat)
+    half_dlat = (Radians(F(lat_field)) - Value(lat0)) / 2
+    half_dlon = (Radians(F(lon_field)) - Value(math.radians(lon))) / 2
+    a = Power(Sin(half_dlat), 2) + Value(math.cos(lat0)) * Cos(Radians(F(lat_field))) * Power(Sin(half_dlon), 2)
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Least(Sqrt(a), Value(1.0)), output_field=FloatField())
+
+
+def filter_within_radius(queryset, lat, lon, radius_km, lat_field, lon_field, cell_field='grid_cell'):
+    """Grid/bbox prefilter on the index, then exact great-circle distance annotated as ``distance_km``."""
+    return (
+        queryset.filter(bbox_q(radius_bbox(lat, lon, radius_km), lat_field, lon_field, cell_field))
+        .annotate(distance_km=distance_expression(lat, lon, lat_field, lon_field))
+        .filter(distance_km__lte=radius_km)
+    )
@@ -0,0 +1,209 @@
+import time
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from . import jobs
+from .geo import EARTH_RADIUS_KM
+from .models import Vessel, Port, Event, Notification, ZoneOccupancy
+from .notifications import deliver
+from .realtime import publish_record
+
+# --- Geofence & Risk-Zone Proximity Engine ---
+# Zones are risk Events (storm, piracy, ...) and Ports, whose free-text "lat,lon" locations
+# are parsed once into cached arrays. Positions and zone centres become unit vectors, so a dot
+# product gives cos(great-circle angle); a vessel is "inside" when that cosine clears the
+# zone's precomputed cos(radius / R). Vessels are sorted by latitude once per pass, so each
+# zone only tests the slice of vessels inside its latitude band.
+RISK_ZONE_EVENT_TYPES = getattr(settings, 'RISK_ZONE_EVENT_TYPES', ['Storm', 'Piracy', 'Accident'])
+RISK_ZONE_RADIUS_KM = getattr(settings, 'RISK_ZONE_RADIUS_KM', 200.0)
+PORT_APPROACH_RADIUS_KM = getattr(settings, 'PORT_APPROACH_RADIUS_KM', 100.0)
+ZONE_CACHE_SECONDS = 60
+ID_CHUNK = 5000
+
+# Events this engine writes (never treated as zones themselves)
+TRANSITION_EVENT_TYPES = {
+    ('event', True): 'Zone Entry',
+    ('event', False): 'Zone Exit',
+    ('port', True): 'Port Approach',
+    ('port', False): 'Port Departure',
+}
+
+
+def parse_location(value):
+    try:
+        lat, lon = (float(part) for part in value.split(','))
+    except (AttributeError, ValueError):
+        return None
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+        return None
+    return lat, lon
+
+
+def unit_vectors(lat, lon):
+    lat, lon = np.radians(lat), np.radians(lon)
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+class ZoneSet:
+    def __init__(self, rows):
+        # rows: (kind, zone_id, label, lat, lon, radius_km)
+        self.kinds = [row[0] for row in rows]
+        self.ids = [row[1] for row in rows]
+        self.labels = [row[2] for row in rows]
+        self.lat = np.array([row[3] for row in rows], dtype=np.float64)
+        self.lon = np.array([row[4] for row in rows], dtype=np.float64)
+        self.vectors = unit_vectors(self.lat, self.lon).T if rows else np.zeros((3, 0))
+        radius_km = np.array([row[5] for row in rows], dtype=np.float64)
+        self.cos_radius = np.cos(radius_km / EARTH_RADIUS_KM)
+        self.band_deg = np.degrees(radius_km / EARTH_RADIUS_KM)
+        self.built_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def hits(self, lat, lon):
+        """Yields (vessel_index, zone_index) for every vessel inside a zone."""
+        if not len(self) or not len(lat):
+            return
+        order = np.argsort(lat, kind='stable')
+        sorted_lat = lat[order]
+        vectors = unit_vectors(sorted_lat, lon[order])
+        lows = np.searchsorted(sorted_lat, self.lat - self.band_deg, side='left')
+        highs = np.searchsorted(sorted_lat, self.lat + self.band_deg, side='right')
+        for zone_index in np.flatnonzero(highs > lows).tolist():
+            low, high = lows[zone_index], highs[zone_index]
+            inside = vectors[low:high] @ self.vectors[:, zone_index] >= self.cos_radius[zone_index]
+            for vessel_index in order[low:high][inside].tolist():
+                yield vessel_index, zone_index
+
+
+_zones = None
+
+
+def invalidate_zones():
+    global _zones
+    _zones = None
+
+
+def reevaluate_all():
+    """Queues a full pass on fresh zones (folded into any pass already waiting).
+
+    A vessel only gets re-checked when it moves, so an added (or removed) zone needs this pass
+    to record the entries (or exits) of vessels that were already there.
+    """
+    jobs.enqueue('geofence.evaluate', {'vessel_ids': None, 'refresh_zones': True})
+
+
+def get_zones():
+    global _zones
+    if _zones is None or time.monotonic() - _zones.built_at > ZONE_CACHE_SECONDS:
+        rows = []
+        for event in Event.objects.filter(event_type__in=RISK_ZONE_EVENT_TYPES).values('id', 'event_type', 'location'):
+            point = parse_location(event['location'])
+            if point:
+                rows.append(('event', event['id'], event['event_type'], *point, RISK_ZONE_RADIUS_KM))
+        for port in Port.objects.values('id', 'name', 'location'):
+            point = parse_location(port['location'])
+            if point:
+                rows.append(('port', port['id'], port['name'], *point, PORT_APPROACH_RADIUS_KM))
+        _zones = ZoneSet(rows)
+    return _zones
+
+
+def _chunks(values, size=ID_CHUNK):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _active_positions(vessel_ids):
+    queryset = Vessel.objects.filter(status='Active').values_list('id', 'name', 'last_position_lat', 'last_position_lon')
+    if vessel_ids is None:
+        yield from queryset.iterator(chunk_size=ID_CHUNK)
+        return
+    for chunk in _chunks(vessel_ids):
+        yield from queryset.filter(id__in=chunk)
+
+
+def _previous_occupancy(vessel_ids):
+    # {(vessel_id, zone_kind, zone_id): occupancy row id}
+    queryset = ZoneOccupancy.objects.values_list('vessel_id', 'zone_kind', 'zone_id', 'id')
+    if vessel_ids is None:
+        rows = queryset.iterator(chunk_size=ID_CHUNK)
+    else:
+        rows = (row for chunk in _chunks(vessel_ids) for row in queryset.filter(vessel_id__in=chunk))
+    return {row[:3]: row[3] for row in rows}
+
+
+def publish_events(events, names):
+    for event in events:
+        publish_record('event', {
+            'id': event.id, 'vessel': event.vessel_id, 'vessel_name': names.get(event.vessel_id),
+            'event_type': event.event_type, 'location': event.location,
+            'timestamp': event.timestamp, 'details': event.details,
+        })
+
+
+def evaluate(vessel_ids=None):
+    """Diffs zone membership for the given vessels (all vessels when None) and records transitions."""
+    zones = get_zones()
+    positions = list(_active_positions(vessel_ids))
+    lat = np.array([row[2] for row in positions], dtype=np.float64)
+    lon = np.array([row[3] for row in positions], dtype=np.float64)
+
+    current = {
+        (positions[vessel_index][0], zones.kinds[zone_index], zones.ids[zone_index])
+        for vessel_index, zone_index in zones.hits(lat, lon)
+    }
+    previous = _previous_occupancy(vessel_ids)
+
+    entered = [key for key in current if key not in previous]
+    exited = [key for key in previous if key not in current]
+    if not entered and not exited:
+        return {'vessels': len(positions), 'zones': len(zones), 'entered': 0, 'exited': 0}
+
+    names = {row[0]: row[1] for row in positions}
+    locations = {row[0]: f'{row[2]:.5f},{row[3]:.5f}' for row in positions}
+    labels = {(zones.kinds[i], zones.ids[i]): zones.labels[i] for i in range(len(zones))}
+
+    events = []
+    alerts = defaultdict(list)
+    for (vessel_id, kind, zone_id), inside in [(key, True) for key in entered] + [(key, False) for key in exited]:
+        label = labels.get((kind, zone_id), 'removed zone')
+        verb = 'entered' if inside else 'left'
+        events.append(Event(
+            vessel_id=vessel_id,
+            event_type=TRANSITION_EVENT_TYPES[(kind, inside)],
+            location=locations.get(vessel_id, ''),
+            details=f'{names.get(vessel_id, "Vessel")} {verb} {label} ({kind} #{zone_id}).',
+        ))
+        if kind == 'event':
+            alerts[(label, zone_id, verb)].append(names.get(vessel_id, f'#{vessel_id}'))
+
+    notifications = [
+        Notification(message=(
+            f'⚠️ {len(vessels)} vessel(s) {verb} {label} zone #{zone_id}: '
+            f'{", ".join(vessels[:5])}{" ..." if len(vessels) > 5 else ""}'
+        ))
+        for (label, zone_id, verb), vessels in alerts.items()
+    ]
+
+    with transaction.atomic():
+        ZoneOccupancy.objects.bulk_create(
+            [ZoneOccupancy(vessel_id=v, zone_kind=k, zone_id=z) for v, k, z in entered],
+            batch_size=ID_CHUNK, ignore_conflicts=True,
+        )
+        for chunk in _chunks(previous[key] for key in exited):
+            ZoneOccupancy.objects.filter(id__in=chunk).delete()
+        Event.objects.bulk_create(events, batch_size=ID_CHUNK)
+        Notification.objects.bulk_create(notifications)
+        # bulk_create skips post_save, so deliver the alerts and hand the events to live streams explicitly
+        for notification in notifications:
+            deliver(notification)
+        transaction.on_commit(lambda: publish_events(events, names))
+
+    return {'vessels': len(positions), 'zones': len(zones), 'entered': len(entered), 'exited': len(exited)}
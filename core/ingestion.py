@@ -0,0 +1,143 @@
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .geo import grid_cell
+from .models import Vessel, VesselHistory
+
+# --- Bulk AIS Ingestion (Feed Gateway Write Path) ---
+# Fixes are grouped into batches; each batch costs one vessel lookup, one bulk INSERT
+# into VesselHistory and one bulk UPDATE of Vessel.last_position_* with the newest fix.
+# Every fix lands in history, but a vessel only moves to a fix newer than its
+# last_position_time, so a late or replayed batch cannot put it back at an older position.
+BATCH_SIZE = getattr(settings, 'INGEST_BATCH_SIZE', 5000)
+
+# Sent once per batch, inside its transaction, with ``vessels`` (the moved Vessel objects) and
+# ``history`` (the VesselHistory rows written). bulk_create/bulk_update skip model signals, so
+# downstream consumers (live push, geofencing, ...) hook in here instead; like post_save
+# receivers, anything that must not run before the commit defers itself with on_commit.
+positions_ingested = Signal()
+
+
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_timestamp(value):
+    if value in (None, ''):
+        return timezone.now()
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, bool):
+        raise ValueError('invalid timestamp')
+    elif isinstance(value, (int, float)):
+        try:
+            parsed = datetime.fromtimestamp(value, tz=dt_timezone.utc)
+        except (OverflowError, OSError):
+            raise ValueError('invalid timestamp')
+    else:
+        parsed = parse_datetime(str(value).strip().replace(' ', 'T', 1))
+        if parsed is None:
+            raise ValueError('invalid timestamp')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
+def parse_fix(raw):
+    """Normalises one incoming fix to ``(mmsi, lat, lon, timestamp)``; raises ValueError with the rejection reason."""
+    if not isinstance(raw, dict):
+        raise ValueError('malformed fix')
+    try:
+        mmsi = int(raw['mmsi'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('invalid mmsi')
+    try:
+        lat = float(raw['latitude'] if 'latitude' in raw else raw['lat'])
+        lon = float(raw['longitude'] if 'longitude' in raw else raw['lon'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('invalid position')
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+        raise ValueError('position out of range')
+    return mmsi, lat, lon, parse_timestamp(raw.get('timestamp'))
+
+
+def ingest_batch(fixes):
+    errors = Counter()
+    parsed = []
+    for raw in fixes:
+        try:
+            parsed.append(parse_fix(raw))
+        except ValueError as exc:
+            errors[str(exc)] += 1
+
+    vessels = {v.mmsi: v for v in Vessel.objects.filter(mmsi__in={fix[0] for fix in parsed})}
+
+    rows = []
+    newest = {}
+    for mmsi, lat, lon, ts in parsed:
+        vessel = vessels.get(mmsi)
+        if vessel is None:
+            errors['unknown mmsi'] += 1
+            continue
+        rows.append(VesselHistory(
+            vessel_id=vessel.id, latitude=lat, longitude=lon, timestamp=ts, grid_cell=grid_cell(lat, lon),
+        ))
+        if mmsi not in newest or ts >= newest[mmsi][2]:
+            newest[mmsi] = (lat, lon, ts)
+
+    moved = []
+    now = timezone.now()
+    for mmsi, (lat, lon, ts) in newest.items():
+        vessel = vessels[mmsi]
+        if vessel.last_position_time is not None and ts < vessel.last_position_time:
+            continue
+        vessel.last_position_lat = lat
+        vessel.last_position_lon = lon
+        vessel.last_position_time = ts
+        vessel.grid_cell = grid_cell(lat, lon)
+        # bulk_update bypasses auto_now; delta-sync clients rely on updated_at moving
+        vessel.updated_at = now
+        moved.append(vessel)
+
+    if rows:
+        with transaction.atomic():
+            VesselHistory.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+            Vessel.objects.bulk_update(
+                moved, ['last_position_lat', 'last_position_lon', 'last_position_time', 'grid_cell', 'updated_at'],
+                batch_size=BATCH_SIZE,
+            )
+            positions_ingested.send(sender=Vessel, vessels=moved, history=rows)
+
+    return {
+        'accepted': len(rows),
+        'rejected': sum(errors.values()),
+        'vessels_updated': len(moved),
+        'errors': dict(errors),
+    }
+
+
+def ingest_batches(fixes, batch_size=None):
+    """Lazily ingests any iterable of fixes, yielding one report per written batch."""
+    for number, chunk in enumerate(_chunked(fixes, batch_size or BATCH_SIZE), start=1):
+        yield {'batch': number, **ingest_batch(chunk)}
+
+
+def ingest_fixes(fixes, batch_size=None):
+    batches = list(ingest_batches(fixes, batch_size))
+    return {
+        'accepted': sum(b['accepted'] for b in batches),
+        'rejected': sum(b['rejected'] for b in batches),
+        'batches': batches,
+    }
@@ -0,0 +1,202 @@
+import logging
+import os
+import socket
+import threading
+import traceback
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger('core.jobs')
+
+# --- Background Jobs (database-backed queue, `python manage.py worker`) ---
+# enqueue() inserts a Job row inside the caller's transaction, so a job only becomes
+# visible once the writes it depends on are committed, and vanishes if they roll back.
+# Workers claim a job with a compare-and-set UPDATE (status queued -> running), which is
+# atomic on every backend; exclusive tasks also hit a partial unique index on running
+# rows, so a second copy can never start. A claim is a lease for the task's timeout: if the
+# worker dies, the job is retried once the lease runs out. Failures retry with exponential backoff.
+# Tasks enqueued on every write (geofencing) declare ``coalesce``: a new job is folded into
+# the one still waiting instead of adding a row, so the queue stays small without a worker.
+# ``ordered`` tasks run strictly in enqueue order: a job waits while an older one of the same
+# task is queued (e.g. backing off before a retry) or running.
+EAGER = getattr(settings, 'JOBS_EAGER', False)
+POLL_SECONDS = getattr(settings, 'JOBS_POLL_SECONDS', 1.0)
+LEASE_SECONDS = getattr(settings, 'JOBS_LEASE_SECONDS', 600)
+RETRY_BACKOFF_SECONDS = getattr(settings, 'JOBS_RETRY_BACKOFF_SECONDS', 30)
+KEEP_DAYS = getattr(settings, 'JOBS_KEEP_DAYS', 7)
+CLAIM_BATCH = 10
+
+
+@dataclass(frozen=True)
+class Task:
+    name: str
+    func: Callable
+    queue: str = 'default'
+    max_attempts: int = 3
+    exclusive: bool = False
+    timeout: int = LEASE_SECONDS
+    # coalesce(waiting payload, new payload) -> merged payload
+    coalesce: Callable | None = None
+    ordered: bool = False
+
+
+registry = {}
+
+
+def task(name, **options):
+    """Registers ``func(**payload)`` as a job type; the return value (JSON) becomes Job.result."""
+    def register(func):
+        registry[name] = Task(name=name, func=func, **options)
+        return func
+    return register
+
+
+def enqueue(name, payload=None, *, delay=0, priority=0, created_by=None):
+    if name not in registry:
+        raise LookupError(f'Unknown task: {name}')
+    spec = registry[name]
+    if spec.coalesce is not None and delay == 0:
+        job = _coalesce(spec, payload or {})
+        if job is not None:
+            return job
+    job = Job.objects.create(
+        task=name,
+        queue=spec.queue,
+        payload=payload or {},
+        priority=priority,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=spec.max_attempts,
+        exclusive_key=name if spec.exclusive else None,
+        created_by_id=getattr(created_by, 'pk', None),
+    )
+    if EAGER:
+        # Development / tests without a worker: run right after the enqueuing transaction commits
+        transaction.on_commit(lambda: _run_eagerly(job))
+    return job
+
+
+def _coalesce(spec, payload):
+    # Only a job no worker has tried yet: a retrying one may be failing on its own payload
+    with transaction.atomic():
+        waiting = (
+            Job.objects.select_for_update()
+            .filter(task=spec.name, status=Job.QUEUED, attempts=0, run_at__lte=timezone.now())
+            .order_by('id').first()
+        )
+        if waiting is None:
+            return None
+        merged = spec.coalesce(waiting.payload, payload)
+        if not Job.objects.filter(pk=waiting.pk, status=Job.QUEUED).update(payload=merged):
+            return None  # claimed in the meantime
+    waiting.payload = merged
+    return waiting
+
+
+def _run_eagerly(job):
+    worker = f'eager:{os.getpid()}'
+    run_next(worker, job_id=job.id)
+    if registry[job.task].exclusive:
+        # Copies that lost the exclusivity race to this one were left queued: nothing else will run them
+        while run_next(worker, tasks=[job.task]) is not None:
+            pass
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+# --- Claiming & running ---
+def claim(worker, queues=None, job_id=None, tasks=None):
+    now = timezone.now()
+    candidates = Job.objects.filter(status=Job.QUEUED, run_at__lte=now)
+    if queues:
+        candidates = candidates.filter(queue__in=queues)
+    if tasks:
+        candidates = candidates.filter(task__in=tasks)
+    if job_id is not None:
+        candidates = candidates.filter(pk=job_id)
+    for pk, name in candidates.order_by('-priority', 'run_at', 'id').values_list('id', 'task')[:CLAIM_BATCH]:
+        spec = registry.get(name)
+        if spec is not None and spec.ordered and Job.objects.filter(
+            task=name, status__in=[Job.QUEUED, Job.RUNNING], id__lt=pk,
+        ).exists():
+            continue  # an older job of this task goes first
+        timeout = spec.timeout if spec is not None else LEASE_SECONDS
+        try:
+            with transaction.atomic():
+                claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+                    status=Job.RUNNING, locked_by=worker, started_at=now,
+                    lease_expires=now + timedelta(seconds=timeout), attempts=F('attempts') + 1,
+                )
+        except IntegrityError:
+            continue  # another copy of this exclusive task is running
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def _finish(job, **fields):
+    # Only the lease holder may finish a job; a worker that lost its lease finds 0 rows
+    return Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by).update(
+        finished_at=timezone.now(), lease_expires=None, **fields,
+    )
+
+
+def execute(job):
+    spec = registry.get(job.task)
+    try:
+        if spec is None:
+            raise LookupError(f'Unknown task: {job.task}')
+        result = spec.func(**job.payload)
+    except Exception as exc:
+        error = ''.join(traceback.format_exception(exc))
+        if spec is not None and job.attempts < job.max_attempts:
+            backoff = RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1)
+            logger.warning('Job %s (%s) failed, attempt %d/%d; retrying in %ds: %s',
+                           job.pk, job.task, job.attempts, job.max_attempts, backoff, exc)
+            _finish(job, status=Job.QUEUED, error=error, locked_by='',
+                    run_at=timezone.now() + timedelta(seconds=backoff))
+        else:
+            logger.error('Job %s (%s) failed for good after %d attempt(s): %s', job.pk, job.task, job.attempts, exc)
+            _finish(job, status=Job.FAILED, error=error)
+        return False
+    _finish(job, status=Job.SUCCEEDED, result=result, error='')
+    return True
+
+
+def run_next(worker, queues=None, job_id=None, tasks=None):
+    """Claims and runs one due job; None when there was nothing to do."""
+    job = claim(worker, queues, job_id, tasks)
+    return None if job is None else execute(job)
+
+
+def recover_expired():
+    """Requeue (or fail, when out of attempts) running jobs past their lease: the task timeout."""
+    now = timezone.now()
+    expired = Job.objects.filter(status=Job.RUNNING, lease_expires__lt=now)
+    message = 'Lease expired: the worker running this job stopped or timed out.'
+    failed = expired.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished_at=now, lease_expires=None, error=message,
+    )
+    requeued = expired.update(status=Job.QUEUED, run_at=now, locked_by='', lease_expires=None, error=message)
+    return requeued, failed
+
+
+def purge_finished():
+    # Failed jobs stay KEEP_DAYS for inspection and retry(), then go the same way
+    cutoff = timezone.now() - timedelta(days=KEEP_DAYS)
+    return Job.objects.filter(status__in=[Job.SUCCEEDED, Job.FAILED], finished_at__lt=cutoff).delete()[0]
+
+
+def retry(job):
+    return Job.objects.filter(pk=job.pk, status=Job.FAILED).update(
+        status=Job.QUEUED, run_at=timezone.now(), attempts=0, locked_by='', error='', finished_at=None,
+    )
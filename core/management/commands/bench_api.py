@@ -0,0 +1,206 @@
+import itertools
+import re
+import subprocess
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core import synthetic
+from core.benchmarking import benchmark_database, percentiles, write_report
+from core.caching import bump_versions
+from core.models import User, Vessel, Port
+
+BENCH_PASSWORD = 'Bench-Password-1!'
+# Extra query strings per URL name, on top of the bare request
+VARIANTS = {
+    'vessel-list': ['bbox=100,-5,110,5', 'near=1.3,103.8&radius_km=300', 'search=maer', 'fields=id,mmsi,last_position_lat,last_position_lon', 'format=columnar'],
+    'vessel-search': ['q=maer', 'q=2000'],
+    'vessel-clusters': ['zoom=2', 'zoom=6&bbox=100,-5,110,5'],
+    'vessel-track': ['zoom=8'],
+    'history-list': ['bbox=100,-5,110,5', 'page_size=1000', 'format=columnar&page_size=1000'],
+    'event-list': ['page_size=1000'],
+    'voyage-list': ['page_size=1000'],
+}
+SKIP = {
+    'live_stream': 'long-lived SSE stream; needs an ASGI client',
+    'export_history': 'streams the whole table; throughput, not latency (see core/export.py)',
+    'export_voyages': 'streams the whole table; throughput, not latency (see core/export.py)',
+}
+
+
+def api_routes():
+    """(path template, URL name, view callback) for every route under api/, format suffixes excluded."""
+    def walk(patterns, prefix):
+        for entry in patterns:
+            route = prefix + str(entry.pattern)
+            if isinstance(entry, URLResolver):
+                yield from walk(entry.url_patterns, route)
+            else:
+                yield route, entry
+
+    for route, entry in walk(get_resolver().url_patterns, ''):
+        route = route.replace('^', '').replace('$', '')
+        if not route.startswith('api/') or '(?P<format>' in route or ':format>' in route:
+            continue
+        yield re.sub(r'\(\?P<(\w+)>[^)]*\)', r'{\1}', route), entry.name, entry.callback
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every REST endpoint under /api/ on a throwaway database filled with a synthetic '
+        'fleet: p50/p95/p99 latency, SQL queries and peak Python memory per request, as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vessels', type=int, default=5000)
+        parser.add_argument('--ports', type=int, default=200)
+        parser.add_argument('--days', type=int, default=7, help='Days of VesselHistory per vessel')
+        parser.add_argument('--fixes-per-day', type=int, default=24)
+        parser.add_argument('--events', type=int)
+        parser.add_argument('--notifications', type=int)
+        parser.add_argument('--requests', type=int, default=20, help='Timed samples per endpoint and role')
+        parser.add_argument('--roles', default='admin,operator')
+        parser.add_argument('--warm-cache', action='store_true',
+                            help='Keep cached responses between samples (default: every sample misses the API cache)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--keepdb', action='store_true', help='Reuse a previously populated benchmark DB')
+        parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+
+    def handle(self, *args, **options):
+        with benchmark_database(keepdb=options['keepdb']):
+            if not Vessel.objects.exists():
+                synthetic.generate(
+                    vessels=options['vessels'], ports=options['ports'], history_days=options['days'],
+                    fixes_per_day=options['fixes_per_day'], events=options['events'],
+                    notifications=options['notifications'], seed=options['seed'], progress=self._progress,
+                )
+            report = {
+                'generated_at': timezone.now(),
+                'git_revision': self._git_revision(),
+                'vendor': connection.vendor,
+                'dataset': {model.__name__: model.objects.count() for model in synthetic.MODELS},
+                'options': {key: options[key] for key in ('requests', 'roles', 'warm_cache', 'seed')},
+                'results': {},
+                'skipped': {},
+            }
+            for role in options['roles'].split(','):
+                report['results'][role] = self._run_role(role, options, report['skipped'])
+        write_report(report, options['output'], self.stdout)
+
+    def _progress(self, label, done, total):
+        self.stdout.write(f'{label}: {done}/{total}')
+
+    def _git_revision(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    # --- Requests ---
+    def _user(self, role):
+        user, _ = User.objects.get_or_create(
+            username=f'bench_{role}', defaults={'role': role, 'password': make_password(BENCH_PASSWORD), 'email': f'{role}@bench.local'},
+        )
+        return user
+
+    def _post_bodies(self, user):
+        registrations = itertools.count()
+        mmsis = list(Vessel.objects.order_by('id').values_list('mmsi', flat=True)[:500])
+        return {
+            'token_obtain_pair': lambda: {'username': user.username, 'password': BENCH_PASSWORD},
+            'token_refresh': lambda: {'refresh': str(RefreshToken.for_user(user))},
+            'register': lambda: {'username': f'bench_reg_{user.role}_{time.time_ns()}_{next(registrations)}', 'password': BENCH_PASSWORD},
+            'password_reset': lambda: {'email': user.email},
+            'ingest_positions': lambda: {'fixes': [
+                {'mmsi': mmsi, 'lat': 1.3 + i * 0.001, 'lon': 103.8, 'timestamp': timezone.now().isoformat()}
+                for i, mmsi in enumerate(mmsis)
+            ]},
+        }
+
+    def _cases(self, client, user, skipped):
+        bodies = self._post_bodies(user)
+        sample_ids = {}
+        for template, name, callback in api_routes():
+            if name in SKIP:
+                skipped[template] = SKIP[name]
+                continue
+            actions = getattr(callback, 'actions', None)
+            view_class = getattr(callback, 'view_class', None) or getattr(callback, 'cls', None)
+            if name in bodies:
+                yield name, 'post', template, None, bodies[name]
+            elif (actions and 'get' in actions) or (view_class and hasattr(view_class, 'get')):
+                path = template
+                if '{pk}' in template:
+                    basename = name.rsplit('-', 1)[0]
+                    if basename not in sample_ids:
+                        listing = client.get(f'/api/{template.split("/")[1]}/')
+                        data = listing.json() if listing.status_code == 200 else []
+                        rows = data.get('results', []) if isinstance(data, dict) else data
+                        sample_ids[basename] = rows[0]['id'] if rows else None
+                    if sample_ids[basename] is None:
+                        skipped[template] = f'no {basename} visible to {user.role}'
+                        continue
+                    path = template.replace('{pk}', str(sample_ids[basename]))
+                for query in [''] + VARIANTS.get(name, []):
+                    yield name, 'get', path, query, None
+            else:
+                skipped[template] = 'no GET handler and no benchmark body'
+
+    def _run_role(self, role, options, skipped):
+        user = self._user(role)
+        client = APIClient(SERVER_NAME='localhost')
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        results = {}
+        for name, method, path, query, body in list(self._cases(client, user, skipped)):
+            url = f'/{path}' + (f'?{query}' if query else '')
+
+            def call():
+                if not options['warm_cache']:
+                    bump_versions(User, Vessel, Port)
+                if method == 'get':
+                    return client.get(url)
+                return client.post(url, body(), format='json')
+
+            call()
+            timings, queries, sizes, status_codes = [], [], [], set()
+            for _ in range(options['requests']):
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = call()
+                    timings.append((time.perf_counter() - started) * 1000.0)
+                queries.append(len(captured))
+                sizes.append(len(response.content))
+                status_codes.add(response.status_code)
+
+            # Memory in a separate pass: tracing slows every allocation down
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+            call()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            key = f'{method.upper()} {url}'
+            results[key] = {
+                'url_name': name,
+                'status': sorted(status_codes),
+                **percentiles(timings),
+                'queries': max(queries),
+                'response_bytes': max(sizes),
+                'peak_memory_kb': round(peak / 1024, 1),
+            }
+            self.stdout.write(
+                f"[{role}] {key:<70} p50={results[key]['p50']}ms p95={results[key]['p95']}ms "
+                f"queries={results[key]['queries']} peak={results[key]['peak_memory_kb']}KB"
+            )
+        return results
@@ -0,0 +1,72 @@
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from core.benchmarking import percentiles, time_calls, write_report
+from core.collision import CPA_KM, HORIZON_MINUTES, close_approaches, velocities
+
+# name -> (share of the fleet in hotspots, hotspot count, hotspot spread in degrees, bounding box)
+DENSITIES = {
+    # Evenly spread over the navigable latitudes
+    'ocean': (0.0, 0, 0.0, (-70, 70, -180, 180)),
+    # Most traffic bunched around ports and straits, the rest in open water
+    'coastal': (0.7, 200, 0.5, (-70, 70, -180, 180)),
+    # The whole fleet in a North Sea sized box; far denser than any real sea area
+    'regional': (0.0, 0, 0.0, (50, 60, -5, 10)),
+    # Stress case: the whole fleet inside a 2 x 4 degree strait
+    'strait': (0.0, 0, 0.0, (0.5, 2.5, 102, 106)),
+}
+
+
+def synthetic_fleet(rng, vessels, density):
+    share, hotspots, spread, (lat_min, lat_max, lon_min, lon_max) = DENSITIES[density]
+    lat = rng.uniform(lat_min, lat_max, vessels)
+    lon = rng.uniform(lon_min, lon_max, vessels)
+    clustered = rng.random(vessels) < share
+    if hotspots:
+        centre = rng.integers(hotspots, size=int(clustered.sum()))
+        centres_lat = rng.uniform(lat_min, lat_max, hotspots)
+        centres_lon = rng.uniform(lon_min, lon_max, hotspots)
+        lat[clustered] = np.clip(centres_lat[centre] + rng.normal(0, spread, len(centre)), -85, 85)
+        lon[clustered] = (centres_lon[centre] + rng.normal(0, spread, len(centre)) + 180) % 360 - 180
+    # About a third at anchor or berthed, the rest under way at typical service speeds
+    speed = np.where(rng.random(vessels) < 0.3, rng.uniform(0, 0.5, vessels), rng.uniform(5, 22, vessels))
+    east, north = velocities(speed, rng.uniform(0, 360, vessels))
+    return lat, lon, east, north
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the CPA / TCPA collision screening kernel across fleet densities (no database needed).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vessels', type=int, default=100000)
+        parser.add_argument('--densities', nargs='+', choices=sorted(DENSITIES), default=list(DENSITIES))
+        parser.add_argument('--cpa-km', type=float, default=CPA_KM)
+        parser.add_argument('--horizon-minutes', type=float, default=HORIZON_MINUTES)
+        parser.add_argument('--slices', type=int, help='Force the time-slice count instead of choosing it')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+
+    def handle(self, *args, **options):
+        report = {
+            'vessels': options['vessels'], 'cpa_km': options['cpa_km'],
+            'horizon_minutes': options['horizon_minutes'], 'densities': {},
+        }
+        for density in options['densities']:
+            rng = np.random.default_rng(options['seed'])
+            fleet = synthetic_fleet(rng, options['vessels'], density)
+
+            def run():
+                return close_approaches(
+                    *fleet, cpa_km=options['cpa_km'], horizon_minutes=options['horizon_minutes'], slices=options['slices'],
+                )
+
+            encounters = len(run()[0])
+            timings = time_calls(run, options['repeat'])
+            report['densities'][density] = {
+                'encounters': encounters,
+                'vessels_per_second': round(options['vessels'] / (min(timings) / 1000.0)),
+                **percentiles(timings),
+            }
+            self.stdout.write(f"{density}: {encounters} encounters, p50={report['densities'][density]['p50']}ms")
+        write_report(report, options['output'], self.stdout)
@@ -0,0 +1,269 @@
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from core import synthetic
+from core.benchmarking import benchmark_database, percentiles, write_report
+from core.models import User, Vessel
+from core.serializers import CustomTokenObtainPairSerializer
+
+# The dashboard's polls: each operator keeps one request to each of these in flight
+POLLS = [
+    '/api/vessels/?bbox=100,-5,110,5',
+    '/api/history/',
+    '/api/events/',
+    '/api/voyages/',
+    '/api/notifications/',
+]
+# name -> (server command line after "gunicorn", environment overrides)
+DEPLOYMENTS = {
+    # The deployment this replaces: sync gunicorn workers over wsgi.py
+    'wsgi': (['maritime_backend.wsgi:application'], {'ASYNC_READ_VIEWS': 'False'}),
+    # ASGI workers with every view sync, i.e. run through Django's thread-sensitive adapter
+    'asgi-sync': (['maritime_backend.asgi:application', '-k', 'uvicorn_worker.UvicornWorker'], {'ASYNC_READ_VIEWS': 'False'}),
+    # ASGI workers with the async read path (core/asyncviews.py)
+    'asgi': (['maritime_backend.asgi:application', '-k', 'uvicorn_worker.UvicornWorker'], {'ASYNC_READ_VIEWS': 'True'}),
+}
+HOST = '127.0.0.1'
+READY_TIMEOUT_SECONDS = 60
+# gunicorn config for --query-delay-ms: every statement in the server waits as on a remote database
+QUERY_DELAY_CONFIG = '''
+import time
+from django.db.backends.signals import connection_created
+
+def post_worker_init(worker):
+    def delay(execute, sql, params, many, context):
+        time.sleep({seconds})
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        if delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(delay)
+
+    connection_created.connect(install, weak=False)
+'''
+
+
+def database_url(settings_dict):
+    """DATABASE_URL for a server process reading the benchmark database."""
+    if connection.vendor == 'sqlite':
+        return f"sqlite:///{settings_dict['NAME']}"
+    scheme = {'postgresql': 'postgres', 'mysql': 'mysql'}.get(connection.vendor)
+    if scheme is None:
+        raise CommandError(f'No DATABASE_URL scheme for the {connection.vendor} backend')
+    auth = ''
+    if settings_dict.get('USER'):
+        auth = quote(settings_dict['USER'], safe='')
+        if settings_dict.get('PASSWORD'):
+            auth += ':' + quote(settings_dict['PASSWORD'], safe='')
+        auth += '@'
+    host = settings_dict.get('HOST') or 'localhost'
+    port = f":{settings_dict['PORT']}" if settings_dict.get('PORT') else ''
+    return f"{scheme}://{auth}{host}{port}/{quote(settings_dict['NAME'], safe='')}"
+
+
+# --- Minimal HTTP/1.1 client: keep-alive when the server allows it, reconnect when it doesn't ---
+async def _exchange(reader, writer, request):
+    writer.write(request)
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError('Server closed the connection')
+    version, status = status_line.split(b' ', 2)[:2]
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.partition(b':')
+        headers[name.strip().lower()] = value.strip().lower()
+
+    keep_alive = version == b'HTTP/1.1' and headers.get(b'connection') != b'close'
+    if b'content-length' in headers:
+        await reader.readexactly(int(headers[b'content-length']))
+    elif headers.get(b'transfer-encoding') == b'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                break
+    else:
+        await reader.read()
+        keep_alive = False
+    return int(status), keep_alive
+
+
+async def _poll(port, path, token, stop_at, record_from, samples, errors):
+    request = (
+        f'GET {path} HTTP/1.1\r\nHost: {HOST}:{port}\r\nAuthorization: Bearer {token}\r\n'
+        'Accept: application/json\r\n\r\n'
+    ).encode()
+    stream = None
+    while time.perf_counter() < stop_at:
+        # Connecting is part of the latency: sync workers close every connection
+        started = time.perf_counter()
+        try:
+            if stream is None:
+                stream = await asyncio.open_connection(HOST, port)
+            status, keep_alive = await _exchange(*stream, request)
+        except (OSError, ValueError, asyncio.IncompleteReadError):
+            status, keep_alive = 'connection', False
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        if started >= record_from:
+            if status == 200:
+                samples[path].append(elapsed_ms)
+            else:
+                errors[str(status)] += 1
+        if not keep_alive and stream is not None:
+            stream[1].close()
+            stream = None
+        if status == 'connection':
+            await asyncio.sleep(0.05)
+    if stream is not None:
+        stream[1].close()
+
+
+async def run_load(port, token, operators, seconds, warmup):
+    """``operators`` x len(POLLS) closed-loop clients for ``seconds`` after ``warmup``."""
+    samples, errors = defaultdict(list), Counter()
+    record_from = time.perf_counter() + warmup
+    stop_at = record_from + seconds
+    await asyncio.gather(*(
+        _poll(port, path, token, stop_at, record_from, samples, errors)
+        for _ in range(operators) for path in POLLS
+    ))
+    return samples, errors
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark concurrent dashboard polling against real gunicorn servers: sync WSGI workers, '
+        'ASGI workers running the DRF views, and ASGI workers with the async read path. Reports '
+        'throughput and p50/p95/p99 latency per concurrency level as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--deployments', nargs='+', choices=list(DEPLOYMENTS), default=list(DEPLOYMENTS))
+        parser.add_argument('--operators', type=int, nargs='+', default=[1, 5, 20],
+                            help=f'Concurrent operators; each keeps {len(POLLS)} polls in flight')
+        parser.add_argument('--workers', type=int, default=2, help='Server processes, the same for every deployment')
+        parser.add_argument('--wsgi-threads', type=int, default=1,
+                            help='Threads per WSGI worker; above 1 gunicorn switches from sync to gthread workers')
+        parser.add_argument('--query-delay-ms', type=float, default=0.0,
+                            help='Round trip added to every SQL statement in the servers, as for a database over the network')
+        parser.add_argument('--seconds', type=float, default=10.0, help='Measured seconds per level')
+        parser.add_argument('--warmup', type=float, default=2.0, help='Unmeasured seconds before each level')
+        parser.add_argument('--vessels', type=int, default=2000)
+        parser.add_argument('--ports', type=int, default=100)
+        parser.add_argument('--days', type=int, default=3, help='Days of VesselHistory per vessel')
+        parser.add_argument('--fixes-per-day', type=int, default=24)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--keepdb', action='store_true', help='Reuse a previously populated benchmark DB')
+        parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+
+    def handle(self, *args, **options):
+        with benchmark_database(keepdb=options['keepdb']):
+            if not Vessel.objects.exists():
+                synthetic.generate(
+                    vessels=options['vessels'], ports=options['ports'], history_days=options['days'],
+                    fixes_per_day=options['fixes_per_day'], seed=options['seed'],
+                    progress=lambda label, done, total: self.stdout.write(f'{label}: {done}/{total}'),
+                )
+            user = User.objects.filter(role='operator').order_by('id').first() or User.objects.create(
+                username='bench_operator', role='operator',
+            )
+            token = str(CustomTokenObtainPairSerializer.get_token(user).access_token)
+            report = {
+                'generated_at': timezone.now(),
+                'vendor': connection.vendor,
+                'dataset': {model.__name__: model.objects.count() for model in synthetic.MODELS},
+                'options': {
+                    key: options[key] for key in ('workers', 'wsgi_threads', 'query_delay_ms', 'seconds', 'warmup', 'operators')
+                },
+                'polls': POLLS,
+                'results': {},
+            }
+            url = database_url(connection.settings_dict)
+            for deployment in options['deployments']:
+                report['results'][deployment] = self._run_deployment(deployment, url, token, options)
+        write_report(report, options['output'], self.stdout)
+
+    def _run_deployment(self, deployment, url, token, options):
+        command, overrides = DEPLOYMENTS[deployment]
+        command = [sys.executable, '-m', 'gunicorn', *command, '--workers', str(options['workers'])]
+        if deployment == 'wsgi' and options['wsgi_threads'] > 1:
+            command += ['--threads', str(options['wsgi_threads'])]
+        with socket.socket() as probe:
+            probe.bind((HOST, 0))
+            port = probe.getsockname()[1]
+        command += ['--bind', f'{HOST}:{port}', '--log-level', 'warning', '--timeout', '120']
+        env = {**os.environ, **overrides, 'DATABASE_URL': url, 'DEBUG': 'False'}
+
+        results = {}
+        with tempfile.TemporaryFile() as log, tempfile.NamedTemporaryFile('w', suffix='.py') as config:
+            if options['query_delay_ms']:
+                config.write(QUERY_DELAY_CONFIG.format(seconds=options['query_delay_ms'] / 1000.0))
+                config.flush()
+                command += ['--config', config.name]
+            server = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+            try:
+                self._wait_until_ready(server, port, token, log)
+                for operators in options['operators']:
+                    samples, errors = asyncio.run(run_load(port, token, operators, options['seconds'], options['warmup']))
+                    timings = [ms for path in POLLS for ms in samples[path]]
+                    results[str(operators)] = {
+                        'clients': operators * len(POLLS),
+                        'requests': len(timings),
+                        'throughput_rps': round(len(timings) / options['seconds'], 1),
+                        'errors': dict(errors),
+                        **percentiles(timings),
+                        'p99_by_poll': {path: percentiles(samples[path])['p99'] for path in POLLS},
+                    }
+                    row = results[str(operators)]
+                    self.stdout.write(
+                        f"{deployment:<10} operators={operators:<4} clients={row['clients']:<5} "
+                        f"{row['throughput_rps']:>8} req/s  p50={row['p50']}ms p95={row['p95']}ms "
+                        f"p99={row['p99']}ms errors={sum(errors.values())}"
+                    )
+            finally:
+                server.send_signal(signal.SIGTERM)
+                try:
+                    server.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    server.kill()
+        return results
+
+    def _wait_until_ready(self, server, port, token, log):
+        deadline = time.monotonic() + READY_TIMEOUT_SECONDS
+        request = f'GET /api/ports/ HTTP/1.1\r\nHost: {HOST}:{port}\r\nAuthorization: Bearer {token}\r\n\r\n'.encode()
+
+        async def probe():
+            reader, writer = await asyncio.open_connection(HOST, port)
+            try:
+                return (await _exchange(reader, writer, request))[0]
+            finally:
+                writer.close()
+
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                break
+            try:
+                if asyncio.run(probe()) == 200:
+                    return
+            except (OSError, ValueError, asyncio.IncompleteReadError):
+                pass
+            time.sleep(0.2)
+        log.seek(0)
+        raise CommandError(f'Server did not become ready:\n{log.read().decode(errors="replace")[-4000:]}')
@@ -0,0 +1,36 @@
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from core.benchmarking import percentiles, time_calls, write_report
+from core.geofence import ZoneSet
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the vectorized vessel-vs-zone proximity kernel on synthetic positions (no database needed).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vessels', type=int, default=100000)
+        parser.add_argument('--zones', type=int, default=1000)
+        parser.add_argument('--radius-km', type=float, default=200.0)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        lat = rng.uniform(-70, 70, options['vessels'])
+        lon = rng.uniform(-180, 180, options['vessels'])
+        zones = ZoneSet([
+            ('event', i, 'Storm', rng.uniform(-70, 70), rng.uniform(-180, 180), options['radius_km'])
+            for i in range(options['zones'])
+        ])
+
+        hits = sum(1 for _ in zones.hits(lat, lon))
+        timings = time_calls(lambda: sum(1 for _ in zones.hits(lat, lon)), options['repeat'])
+        report = {
+            'vessels': options['vessels'], 'zones': options['zones'], 'hits': hits,
+            'pairs_per_second': round(options['vessels'] * options['zones'] / (min(timings) / 1000.0)),
+            **percentiles(timings),
+        }
+        self.stdout.write(f"{options['vessels']} x {options['zones']}: {hits} hits, p50={report['p50']}ms")
+        write_report(report, options['output'], self.stdout)
@@ -0,0 +1,87 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+
+from core import search
+from core.benchmarking import benchmark_database, percentiles, time_calls, write_report
+from core.geo import grid_cell
+from core.models import Vessel, normalize_name
+
+CHUNK = 20000
+PREFIXES = ['MV', 'MT', 'MSC', 'CMA CGM', 'Maersk', 'Ever', 'Cosco', 'ONE', 'Hapag', 'Nordic', 'Ocean', 'Pacific']
+WORDS = [
+    'Alabama', 'Aurora', 'Baltic', 'Horizon', 'Atlas', 'Triton', 'Neptune', 'Voyager', 'Meridian', 'Falcon',
+    'Harmony', 'Pioneer', 'Sirius', 'Orion', 'Vega', 'Polaris', 'Endeavour', 'Liberty', 'Zephyr', 'Coral',
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark vessel MMSI / name search against the legacy icontains filter on a throwaway database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vessels', type=int, default=500000)
+        parser.add_argument('--queries', type=int, default=50, help='Samples per query shape')
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--keepdb', action='store_true', help='Reuse a previously populated benchmark DB')
+        parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with benchmark_database(keepdb=options['keepdb']):
+            if not Vessel.objects.exists():
+                self._populate(rng, options['vessels'])
+            search.names_changed()
+            started = time.perf_counter()
+            if connection.vendor != 'postgresql':
+                search.get_name_index()
+            report = {
+                'vendor': connection.vendor,
+                'vessels': Vessel.objects.count(),
+                'index_build_ms': round((time.perf_counter() - started) * 1000.0, 3),
+                'results': self._run_queries(rng, options),
+            }
+        write_report(report, options['output'], self.stdout)
+
+    def _populate(self, rng, vessel_count):
+        for start in range(0, vessel_count, CHUNK):
+            batch = []
+            for i in range(start, min(start + CHUNK, vessel_count)):
+                name = f'{rng.choice(PREFIXES)} {rng.choice(WORDS)} {rng.choice(WORDS)} {i}'
+                lat, lon = rng.uniform(-60, 60), rng.uniform(-180, 180)
+                batch.append(Vessel(
+                    name=name, name_normalized=normalize_name(name), mmsi=200000000 + i * 7,
+                    vessel_type='Cargo', last_position_lat=lat, last_position_lon=lon, grid_cell=grid_cell(lat, lon),
+                ))
+            Vessel.objects.bulk_create(batch)
+            self.stdout.write(f'Vessels: {min(start + CHUNK, vessel_count)}/{vessel_count}')
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    def _run_queries(self, rng, options):
+        samples, limit = options['queries'], options['limit']
+        sample = list(Vessel.objects.values_list('mmsi', 'name').order_by('?')[:samples])
+        shapes = {
+            'mmsi_exact': [str(mmsi) for mmsi, _ in sample],
+            'mmsi_prefix': [str(mmsi)[:rng.randint(4, 7)] for mmsi, _ in sample],
+            'name_prefix': [name.split()[0][:4] for _, name in sample],
+            'name_word_prefix': [name.split()[-2][:rng.randint(3, 6)] for _, name in sample],
+            'name_two_words': [' '.join(name.split()[-3:-1]) for _, name in sample],
+        }
+
+        results = {}
+        for shape, queries in shapes.items():
+            for label, run in (
+                ('indexed', lambda q: search.search_vessels(Vessel.objects.all(), q, limit)),
+                ('icontains', lambda q: list(
+                    Vessel.objects.filter(Q(name__icontains=q) | Q(mmsi__icontains=q))[:limit])),
+            ):
+                terms = iter(queries)
+                name = f'{shape}_{label}'
+                results[name] = percentiles(time_calls(lambda: run(next(terms)), len(queries)))
+                self.stdout.write(f"{name:<28} p50={results[name]['p50']}ms p95={results[name]['p95']}ms")
+        return results
@@ -0,0 +1,36 @@
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from core.benchmarking import percentiles, time_calls, write_report
+from core.simplify import douglas_peucker, zoom_tolerance
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the Douglas-Peucker track simplifier on a synthetic AIS-like track (no database needed).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--points', type=int, default=1000000)
+        parser.add_argument('--zooms', default='3,6,9,12,15', help='Comma-separated map zoom levels')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+
+    def synthetic_track(self, count, seed):
+        # ~10s fixes: slowly wandering course, speed noise and occasional sharp turns
+        rng = np.random.default_rng(seed)
+        course = np.cumsum(rng.normal(0, 0.5, count) + np.where(rng.random(count) < 0.0005, rng.normal(0, 60, count), 0))
+        step = 0.0008 * (1 + rng.normal(0, 0.1, count))
+        lat = np.clip(10.0 + np.cumsum(step * np.cos(np.radians(course))), -85, 85)
+        lon = 60.0 + np.cumsum(step * np.sin(np.radians(course)))
+        return lat, (lon + 180.0) % 360.0 - 180.0
+
+    def handle(self, *args, **options):
+        lat, lon = self.synthetic_track(options['points'], options['seed'])
+        results = {}
+        for zoom in (int(z) for z in options['zooms'].split(',')):
+            tolerance = zoom_tolerance(zoom)
+            kept = douglas_peucker(lat, lon, tolerance)
+            timings = time_calls(lambda: douglas_peucker(lat, lon, tolerance), options['repeat'])
+            results[f'zoom_{zoom}'] = {'tolerance_deg': tolerance, 'points_out': int(len(kept)), **percentiles(timings)}
+            self.stdout.write(f"zoom {zoom:>2}: {len(kept):>8} of {len(lat)} points, p50={results[f'zoom_{zoom}']['p50']}ms")
+        write_report({'points_in': len(lat), 'results': results}, options['output'], self.stdout)
@@ -0,0 +1,124 @@
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from core.benchmarking import benchmark_database, percentiles, time_calls, write_report
+from core.geo import bbox_q, filter_within_radius, grid_cell
+from core.models import Vessel, VesselHistory
+
+CHUNK = 20000
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark viewport (bbox) and proximity queries with and without the grid_cell index '
+        'on a throwaway copy of the configured database. Run once with a SQLite DATABASE_URL '
+        'and once with Postgres to compare engines.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vessels', type=int, default=100000)
+        parser.add_argument('--history', type=int, default=1000000, help='VesselHistory rows (e.g. 50000000)')
+        parser.add_argument('--queries', type=int, default=50, help='Samples per query shape')
+        parser.add_argument('--viewport-deg', type=float, default=5.0, help='Edge of the zoomed-in viewport box')
+        parser.add_argument('--radius-km', type=float, default=50.0)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--keepdb', action='store_true', help='Reuse a previously populated benchmark DB')
+        parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with benchmark_database(keepdb=options['keepdb']):
+            if not Vessel.objects.exists():
+                self._populate(rng, options['vessels'], options['history'])
+            report = {
+                'vendor': connection.vendor,
+                'vessels': Vessel.objects.count(),
+                'history_rows': VesselHistory.objects.count(),
+                'results': self._run_queries(rng, options),
+            }
+        write_report(report, options['output'], self.stdout)
+
+    # --- Synthetic data: vessels clustered around a few busy sea areas ---
+    def _populate(self, rng, vessel_count, history_count):
+        hubs = [(rng.uniform(-60, 60), rng.uniform(-180, 180)) for _ in range(40)]
+
+        def position():
+            lat, lon = rng.choice(hubs)
+            lat = max(-89.9, min(89.9, lat + rng.gauss(0, 6)))
+            lon = (lon + rng.gauss(0, 8) + 180.0) % 360.0 - 180.0
+            return lat, lon
+
+        for start in range(0, vessel_count, CHUNK):
+            batch = []
+            for i in range(start, min(start + CHUNK, vessel_count)):
+                lat, lon = position()
+                batch.append(Vessel(
+                    name=f'Bench Vessel {i}', mmsi=200000000 + i, vessel_type='Cargo',
+                    last_position_lat=lat, last_position_lon=lon, grid_cell=grid_cell(lat, lon),
+                ))
+            Vessel.objects.bulk_create(batch)
+            self.stdout.write(f'Vessels: {min(start + CHUNK, vessel_count)}/{vessel_count}')
+
+        vessel_ids = list(Vessel.objects.values_list('id', flat=True))
+        now = timezone.now()
+        for start in range(0, history_count, CHUNK):
+            batch = []
+            for _ in range(min(CHUNK, history_count - start)):
+                lat, lon = position()
+                batch.append(VesselHistory(
+                    vessel_id=rng.choice(vessel_ids), latitude=lat, longitude=lon,
+                    timestamp=now - timedelta(seconds=rng.randint(0, 30 * 86400)), grid_cell=grid_cell(lat, lon),
+                ))
+            VesselHistory.objects.bulk_create(batch)
+            if (start // CHUNK) % 25 == 0:
+                self.stdout.write(f'History: {start + len(batch)}/{history_count}')
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    def _run_queries(self, rng, options):
+        samples = options['queries']
+        edge = options['viewport_deg']
+        positions = list(Vessel.objects.values_list('last_position_lat', 'last_position_lon'))
+        viewports = []
+        for lat, lon in (rng.choice(positions) for _ in range(samples)):
+            south, north = max(-90.0, lat - edge / 2), min(90.0, lat + edge / 2)
+            west, east = max(-180.0, lon - edge / 2), min(180.0, lon + edge / 2)
+            viewports.append((west, south, east, north))
+
+        def naive_q(bbox, lat_field, lon_field):
+            west, south, east, north = bbox
+            return Q(**{
+                f'{lat_field}__gte': south, f'{lat_field}__lte': north,
+                f'{lon_field}__gte': west, f'{lon_field}__lte': east,
+            })
+
+        shapes = {
+            'vessels_bbox_grid': lambda b: list(
+                Vessel.objects.filter(bbox_q(b, 'last_position_lat', 'last_position_lon')).values_list('id', flat=True)),
+            'vessels_bbox_naive': lambda b: list(
+                Vessel.objects.filter(naive_q(b, 'last_position_lat', 'last_position_lon')).values_list('id', flat=True)),
+            'vessels_radius_grid': lambda b: list(filter_within_radius(
+                Vessel.objects.all(), (b[1] + b[3]) / 2, (b[0] + b[2]) / 2, options['radius_km'],
+                'last_position_lat', 'last_position_lon').values_list('id', flat=True)),
+            'history_bbox_grid_page': lambda b: list(
+                VesselHistory.objects.filter(bbox_q(b, 'latitude', 'longitude'))
+                .order_by('-timestamp').values_list('id', flat=True)[:500]),
+            'history_bbox_naive_page': lambda b: list(
+                VesselHistory.objects.filter(naive_q(b, 'latitude', 'longitude'))
+                .order_by('-timestamp').values_list('id', flat=True)[:500]),
+        }
+
+        results = {}
+        for name, query in shapes.items():
+            boxes = iter(viewports)
+            timings = time_calls(lambda: query(next(boxes)), samples)
+            results[name] = percentiles(timings)
+            self.stdout.write(f"{name:<26} p50={results[name]['p50']}ms p95={results[name]['p95']}ms")
+        return results
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core import geofence, jobs
+
+
+class Command(BaseCommand):
+    help = 'Run a full geofence pass: every active vessel against every risk zone and port radius.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--background', action='store_true', help='Queue the pass for a worker instead')
+
+    def handle(self, *args, **options):
+        if options['background']:
+            job = jobs.enqueue('geofence.evaluate')
+            self.stdout.write(self.style.SUCCESS(f'Queued job #{job.pk}.'))
+            return
+        result = geofence.evaluate()
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['vessels']} vessels x {result['zones']} zones: "
+            f"{result['entered']} entries, {result['exited']} exits recorded."
+        ))
@@ -0,0 +1,40 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.ais import read_csv, read_nmea
+from core.ingestion import ingest_batches
+
+READERS = {'csv': read_csv, 'nmea': read_nmea}
+
+
+class Command(BaseCommand):
+    help = 'Bulk-load AIS position fixes from an NMEA (AIVDM) or CSV file into VesselHistory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Feed file to load, or '-' for stdin")
+        parser.add_argument('--format', choices=sorted(READERS), help='Defaults to the file extension (.csv / .nmea)')
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError('--batch-size must be a positive integer')
+        path = options['path']
+        feed_format = options['format'] or ('csv' if path.lower().endswith('.csv') else 'nmea')
+
+        try:
+            stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8', errors='replace')
+        except OSError as exc:
+            raise CommandError(f'Cannot open {path}: {exc}')
+
+        accepted = rejected = 0
+        with stream:
+            for report in ingest_batches(READERS[feed_format](stream), batch_size=options['batch_size']):
+                accepted += report['accepted']
+                rejected += report['rejected']
+                self.stdout.write(
+                    f"Batch {report['batch']}: {report['accepted']} accepted, "
+                    f"{report['rejected']} rejected {report['errors'] or ''}".rstrip()
+                )
+
+        self.stdout.write(self.style.SUCCESS(f'Ingestion complete: {accepted} accepted, {rejected} rejected.'))
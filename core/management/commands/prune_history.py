@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from core import jobs
+from core.retention import apply_retention
+
+
+class Command(BaseCommand):
+    help = (
+        'Archive VesselHistory days older than the retention window to gzipped CSV and keep only a '
+        'downsampled track (one fix per vessel per interval plus turn points) in the database. '
+        'Safe to run repeatedly, e.g. nightly from cron: 15 3 * * * python manage.py prune_history'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Retention window in days (HISTORY_RETENTION_DAYS)')
+        parser.add_argument('--interval', type=int, default=None, help='Minutes between kept fixes (HISTORY_DOWNSAMPLE_MINUTES)')
+        parser.add_argument('--turn-degrees', type=float, default=None, help='Heading change kept as a turn point')
+        parser.add_argument('--archive-dir', default=None, help='Where daily archives are written (HISTORY_ARCHIVE_DIR)')
+        parser.add_argument('--background', action='store_true', help='Queue the run for a worker instead')
+
+    def handle(self, *args, **options):
+        if options['background']:
+            job = jobs.enqueue('history.prune', {
+                'retention_days': options['days'],
+                'interval_minutes': options['interval'],
+                'turn_degrees': options['turn_degrees'],
+                'archive_dir': options['archive_dir'],
+            })
+            self.stdout.write(self.style.SUCCESS(f'Queued job #{job.pk}.'))
+            return
+        processed = 0
+        for result in apply_retention(
+            retention_days=options['days'],
+            interval_minutes=options['interval'],
+            turn_degrees=options['turn_degrees'],
+            archive_dir=options['archive_dir'],
+        ):
+            processed += 1
+            self.stdout.write(
+                f"{result['day']}: {result['raw_rows']} raw fixes archived, {result['kept_rows']} kept"
+            )
+        self.stdout.write(self.style.SUCCESS(f'Retention complete: {processed} day(s) processed.'))
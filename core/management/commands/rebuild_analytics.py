@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from core import analytics, jobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the port traffic, route and voyage status rollups from Voyage. Voyage saves keep '
+        'them current; run this after bulk loads or queryset.update() calls, which skip model signals.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--background', action='store_true', help='Queue the run for a worker instead')
+
+    def handle(self, *args, **options):
+        if options['background']:
+            job = jobs.enqueue('analytics.rebuild')
+            self.stdout.write(self.style.SUCCESS(f'Queued job #{job.pk}.'))
+            return
+        rows = analytics.rebuild()
+        summary = ', '.join(f'{count} {model}' for model, count in sorted(rows.items())) or 'no voyages'
+        self.stdout.write(self.style.SUCCESS(f'Analytics rebuilt: {summary}.'))
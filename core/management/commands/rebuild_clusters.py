@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core import clusters, jobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Recount the map cluster cells from Vessel. Vessel saves and ingestion keep them current; run '
+        'this after bulk loads, queryset.update() calls (which skip model signals) or a CLUSTER_MAX_ZOOM change.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--background', action='store_true', help='Queue the run for a worker instead')
+
+    def handle(self, *args, **options):
+        if options['background']:
+            job = jobs.enqueue('clusters.rebuild')
+            self.stdout.write(self.style.SUCCESS(f'Queued job #{job.pk}.'))
+            return
+        rows = clusters.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Map clusters rebuilt: {rows['cells']} cells."))
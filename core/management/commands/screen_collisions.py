@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core import collision, jobs
+
+
+class Command(BaseCommand):
+    help = 'Run a fleet-wide collision screening pass: CPA / TCPA for every pair of nearby active vessels.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--background', action='store_true', help='Queue the pass for a worker instead')
+
+    def handle(self, *args, **options):
+        if options['background']:
+            job = jobs.enqueue('collisions.screen')
+            self.stdout.write(self.style.SUCCESS(f'Queued job #{job.pk}.'))
+            return
+        result = collision.screen()
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['vessels']} vessels screened: {result['new']} new and {result['cleared']} cleared "
+            f"close encounters, {result['open']} open."
+        ))
@@ -0,0 +1,89 @@
+import signal
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+
+from core import jobs
+from core.caching import LOCAL_CACHE_SECONDS, is_process_local
+
+MAINTENANCE_SECONDS = 60
+
+
+class Command(BaseCommand):
+    help = (
+        'Run background jobs from the database queue (core.jobs). Start as many workers as you '
+        'like; each job is claimed by exactly one. Stops cleanly on SIGTERM / Ctrl-C after the '
+        'jobs in hand finish.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queues', default='', help='Comma-separated queues to serve (default: all)')
+        parser.add_argument('--concurrency', type=int, default=1, help='Jobs run in parallel threads')
+        parser.add_argument('--poll', type=float, default=None, help='Seconds between polls when idle (JOBS_POLL_SECONDS)')
+        parser.add_argument('--burst', action='store_true', help='Exit once no job is due')
+        parser.add_argument('--allow-local-cache', action='store_true',
+                            help='Run with a per-process (locmem) API cache, e.g. next to a single runserver')
+
+    def handle(self, *args, **options):
+        queues = [name for name in options['queues'].split(',') if name] or None
+        poll = options['poll'] if options['poll'] is not None else jobs.POLL_SECONDS
+        concurrency = max(1, options['concurrency'])
+        if connection.vendor == 'sqlite' and concurrency > 1:
+            # SQLite allows one writer at a time; extra threads would only wait on its lock
+            self.stdout.write('sqlite supports a single writer; using --concurrency 1.')
+            concurrency = 1
+        if is_process_local():
+            # Jobs bump response-cache versions; in a per-process cache the web workers never see them
+            if not options['allow_local_cache']:
+                raise CommandError(
+                    'The API cache is per-process (locmem), so the web workers would not see this worker\'s '
+                    'writes. Set CACHE_URL to a cache shared with them, or pass --allow-local-cache.'
+                )
+            self.stderr.write(self.style.WARNING(
+                f'The API cache is per-process (locmem): web responses may lag this worker\'s writes '
+                f'by up to {LOCAL_CACHE_SECONDS}s.'
+            ))
+
+        self.stopping = threading.Event()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda *_: self.stopping.set())
+
+        self.stdout.write(f"Worker up: {concurrency} thread(s), queues={','.join(queues or ['*'])}, "
+                          f"tasks={', '.join(sorted(jobs.registry))}")
+        threads = [
+            threading.Thread(target=self._loop, args=(queues, poll, options['burst']), daemon=True)
+            for _ in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=0.5)
+        self.stdout.write('Worker stopped.')
+
+    def _loop(self, queues, poll, burst):
+        worker = jobs.worker_name()
+        last_maintenance = 0.0
+        try:
+            while not self.stopping.is_set():
+                close_old_connections()
+                if time.monotonic() - last_maintenance >= MAINTENANCE_SECONDS:
+                    last_maintenance = time.monotonic()
+                    requeued, failed = jobs.recover_expired()
+                    if requeued or failed:
+                        self.stdout.write(f'Expired leases: {requeued} requeued, {failed} failed.')
+                    jobs.purge_finished()
+
+                job = jobs.claim(worker, queues)
+                if job is None:
+                    if burst:
+                        return
+                    self.stopping.wait(poll)
+                    continue
+                started = time.monotonic()
+                state = 'done' if jobs.execute(job) else 'failed'
+                self.stdout.write(f'{job.task} #{job.pk} {state} in {time.monotonic() - started:.2f}s')
+        finally:
+            connection.close()
@@ -0,0 +1,201 @@
+import bisect
+import contextvars
+import heapq
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+# --- Request Instrumentation (Server-Timing, /metrics, slow logs) ---
+# RequestTimer splits a request's wall time into exclusive phases that add up to the total:
+# db (every SQL statement, wherever it ran), auth (authentication, permissions, throttles),
+# serialize (view code, serializers), render (JSON encoding) and other (middleware, WhiteNoise).
+# Phases nest; a phase never counts time spent in SQL or in a phase opened inside it.
+# db is time inside cursor.execute(); drivers that fetch rows lazily (SQLite) bill the
+# fetching to the phase that iterates the queryset.
+SLOW_REQUEST_MS = getattr(settings, 'SLOW_REQUEST_MS', 500.0)
+SLOW_QUERY_MS = getattr(settings, 'SLOW_QUERY_MS', 100.0)
+SLOWEST_QUERIES_LOGGED = 5
+SQL_LOG_CHARS = 4000
+PHASES = ('auth', 'db', 'serialize', 'render', 'other')
+DURATION_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_current = contextvars.ContextVar('request_timer', default=None)
+
+
+class RequestTimer:
+    def __init__(self, request=None):
+        self.request = request
+        self.started = time.perf_counter()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.queries = 0
+        self.db_ms = 0.0
+        self.total_ms = 0.0
+        self.slowest = []  # min-heap of (ms, sql) holding the SLOWEST_QUERIES_LOGGED slowest
+        self._stack = []
+
+    def record_query(self, sql, elapsed_ms):
+        self.queries += 1
+        self.db_ms += elapsed_ms
+        entry = (elapsed_ms, sql[:SQL_LOG_CHARS])
+        if len(self.slowest) < SLOWEST_QUERIES_LOGGED:
+            heapq.heappush(self.slowest, entry)
+        elif entry > self.slowest[0]:
+            heapq.heapreplace(self.slowest, entry)
+
+    @contextmanager
+    def phase(self, name):
+        frame = [0.0]  # time already claimed by nested phases
+        self._stack.append(frame)
+        started, db_before = time.perf_counter(), self.db_ms
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            own = (time.perf_counter() - started) * 1000.0 - (self.db_ms - db_before)
+            self.phases[name] += own - frame[0]
+            if self._stack:
+                self._stack[-1][0] += own
+
+    def finish(self):
+        self.total_ms = (time.perf_counter() - self.started) * 1000.0
+        self.phases['db'] = self.db_ms
+        self.phases['other'] = max(self.total_ms - sum(self.phases[name] for name in PHASES if name != 'other'), 0.0)
+        return self.total_ms
+
+    def server_timing(self):
+        entries = [
+            f'{name};dur={ms:.1f}' + (f';desc="{self.queries} queries"' if name == 'db' else '')
+            for name, ms in self.phases.items() if ms or name == 'db'
+        ]
+        return ', '.join(entries + [f'total;dur={self.total_ms:.1f}'])
+
+
+@contextmanager
+def activate(timer):
+    token = _current.set(timer)
+    try:
+        yield timer
+    finally:
+        _current.reset(token)
+
+
+def current_timer():
+    return _current.get()
+
+
+@contextmanager
+def timed(name):
+    timer = _current.get()
+    if timer is None:
+        yield
+    else:
+        with timer.phase(name):
+            yield
+
+
+class TimedViewMixin:
+    """Attributes DRF view time to the auth / serialize / render phases of the current request."""
+
+    def dispatch(self, request, *args, **kwargs):
+        with timed('serialize'):
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        with timed('auth'):
+            super().initial(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        # Render here rather than in the handler so the encoding cost gets its own phase
+        if callable(getattr(response, 'render', None)) and not getattr(response, 'is_rendered', True):
+            with timed('render'):
+                response.render()
+        return response
+
+
+# --- Process-local registry, exposed in Prometheus text format ---
+# Each worker process keeps its own counters; scrape every worker (or run one) and let
+# Prometheus sum them. process_start_time_seconds lets rate() see restarts.
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.requests = defaultdict(int)                 # (view, method, status)
+        self.duration_buckets = defaultdict(lambda: [0] * (len(DURATION_BUCKETS_MS) + 1))
+        self.duration_sum = defaultdict(float)           # (view, method), seconds
+        self.phase_seconds = defaultdict(float)          # (view, phase)
+        self.queries = defaultdict(int)                  # view
+        self.slow_requests = defaultdict(int)            # view
+        self.slow_queries = defaultdict(int)             # view
+
+    def observe(self, view, method, status, timer):
+        with self._lock:
+            self.requests[(view, method, str(status))] += 1
+            self.duration_buckets[(view, method)][bisect.bisect_left(DURATION_BUCKETS_MS, timer.total_ms)] += 1
+            self.duration_sum[(view, method)] += timer.total_ms / 1000.0
+            for name, ms in timer.phases.items():
+                self.phase_seconds[(view, name)] += ms / 1000.0
+            self.queries[view] += timer.queries
+
+    def count_slow(self, counter, view):
+        with self._lock:
+            counter[view] += 1
+
+    def exposition(self):
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(f'{metric}{_labels(labels)} {value}' for metric, labels, value in samples)
+
+        with self._lock:
+            family('maritime_http_requests_total', 'counter', 'Requests by view, method and status.', [
+                ('maritime_http_requests_total', {'view': v, 'method': m, 'status': s}, n)
+                for (v, m, s), n in sorted(self.requests.items())
+            ])
+            histogram = []
+            for (view, method), counts in sorted(self.duration_buckets.items()):
+                cumulative = 0
+                for bound, count in zip(DURATION_BUCKETS_MS + (None,), counts):
+                    cumulative += count
+                    le = '+Inf' if bound is None else repr(bound / 1000.0)
+                    histogram.append(('maritime_http_request_duration_seconds_bucket',
+                                      {'view': view, 'method': method, 'le': le}, cumulative))
+                labels = {'view': view, 'method': method}
+                histogram.append(('maritime_http_request_duration_seconds_sum', labels, repr(self.duration_sum[(view, method)])))
+                histogram.append(('maritime_http_request_duration_seconds_count', labels, cumulative))
+            family('maritime_http_request_duration_seconds', 'histogram', 'Request wall time.', histogram)
+            family('maritime_http_phase_seconds_total', 'counter', 'Exclusive request time by phase (auth, db, serialize, render, other).', [
+                ('maritime_http_phase_seconds_total', {'view': v, 'phase': p}, repr(s))
+                for (v, p), s in sorted(self.phase_seconds.items())
+            ])
+            family('maritime_db_queries_total', 'counter', 'SQL statements executed while serving requests.', [
+                ('maritime_db_queries_total', {'view': v}, n) for v, n in sorted(self.queries.items())
+            ])
+            family('maritime_slow_requests_total', 'counter', f'Requests slower than SLOW_REQUEST_MS ({SLOW_REQUEST_MS:g} ms).', [
+                ('maritime_slow_requests_total', {'view': v}, n) for v, n in sorted(self.slow_requests.items())
+            ])
+            family('maritime_slow_queries_total', 'counter', f'SQL statements slower than SLOW_QUERY_MS ({SLOW_QUERY_MS:g} ms).', [
+                ('maritime_slow_queries_total', {'view': v}, n) for v, n in sorted(self.slow_queries.items())
+            ])
+        family('process_start_time_seconds', 'gauge', 'Start time of this worker process.', [
+            ('process_start_time_seconds', {}, repr(self.started)),
+        ])
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+registry = Registry()
@@ -0,0 +1,153 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import metrics, replicas
+
+logger = logging.getLogger('core.performance')
+
+
+def view_label(request):
+    """Low-cardinality endpoint name: the URL name, the view path, 'static' or 'unmatched'."""
+    match = getattr(request, 'resolver_match', None)
+    if match is not None:
+        return match.view_name
+    if request.path_info.startswith(settings.STATIC_URL):
+        return 'static'
+    return 'unmatched'
+
+
+# --- Request Metrics (outermost, so WhiteNoise and every other middleware are inside it) ---
+# Every middleware in the chain runs natively under both WSGI and ASGI: a single sync-only
+# one would make Django hop each ASGI request onto its one thread-sensitive executor and
+# block that thread for the whole request, async views included.
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer = metrics.RequestTimer(request)
+        with metrics.activate(timer):
+            response = self.get_response(request)
+        return self._finish(request, response, timer)
+
+    async def __acall__(self, request):
+        timer = metrics.RequestTimer(request)
+        with metrics.activate(timer):
+            response = await self.get_response(request)
+        return self._finish(request, response, timer)
+
+    def _finish(self, request, response, timer):
+        timer.finish()
+        view = view_label(request)
+        metrics.registry.observe(view, request.method, response.status_code, timer)
+        timing = timer.server_timing()
+        response['Server-Timing'] = f"{response['Server-Timing']}, {timing}" if response.has_header('Server-Timing') else timing
+        if timer.total_ms >= metrics.SLOW_REQUEST_MS:
+            metrics.registry.count_slow(metrics.registry.slow_requests, view)
+            self._log_slow_request(request, response, view, timer)
+        return response
+
+    def _log_slow_request(self, request, response, view, timer):
+        phases = ', '.join(f'{name} {ms:.1f}' for name, ms in timer.phases.items())
+        slowest = ''.join(f'\n  {ms:8.1f} ms  {sql}' for ms, sql in sorted(timer.slowest, reverse=True))
+        logger.warning(
+            'Slow request (%.1f ms) %s %s [%s] -> %s; %d queries; phases ms: %s%s',
+            timer.total_ms, request.method, request.get_full_path(), view, response.status_code,
+            timer.queries, phases, slowest,
+        )
+
+
+# Installed on every connection as it opens (core/signals.py) rather than per request: async
+# views query on the executor thread's own connection, shared by every request in flight.
+# The statement is billed to whichever request's context issued it.
+def record_query(execute, sql, params, many, context):
+    timer = metrics.current_timer()
+    if timer is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        timer.record_query(sql, elapsed_ms)
+        if elapsed_ms >= metrics.SLOW_QUERY_MS:
+            request = timer.request
+            view = view_label(request)
+            metrics.registry.count_slow(metrics.registry.slow_queries, view)
+            # The SQL only: bound values include password hashes, emails and tokens
+            logger.warning(
+                'Slow query (%.1f ms) in %s %s [%s]:\n%s',
+                elapsed_ms, request.method, request.path, view, sql[:metrics.SQL_LOG_CHARS],
+            )
+
+
+def time_queries(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+# --- Replica Routing (read-only requests may read a replica; see core/replicas.py) ---
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replicas.REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with replicas.routing(self._pinned(request)) as state:
+            response = self.get_response(request)
+        return self._finish(response, state)
+
+    async def __acall__(self, request):
+        with replicas.routing(self._pinned(request)) as state:
+            response = await self.get_response(request)
+        return self._finish(response, state)
+
+    def _pinned(self, request):
+        return request.method not in ('GET', 'HEAD', 'OPTIONS') or replicas.PIN_COOKIE in request.COOKIES
+
+    def _finish(self, response, state):
+        if state.wrote:
+            response.set_cookie(replicas.PIN_COOKIE, '1', max_age=replicas.STICKY_SECONDS, httponly=True, samesite='Lax')
+        return response
+
+
+# --- Static Files (WhiteNoise, without forcing ASGI requests through a sync adapter) ---
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings=settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        static_file = self.find_file(request.path_info) if self.autorefresh else self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
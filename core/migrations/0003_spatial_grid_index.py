@@ -0,0 +1,67 @@
+# Generated by Django 5.2.10 on 2026-10-18 10:21
+
+import math
+
+from django.conf import settings
+from django.db import migrations, models
+
+# A frozen copy of core.geo.grid_cell as of this migration, so later changes to the app
+# code cannot change what the backfill writes. The cell size is still the setting the
+# queries use.
+GRID_CELL_DEGREES = getattr(settings, 'GRID_CELL_DEGREES', 1.0)
+GRID_COLUMNS = int(math.ceil(360.0 / GRID_CELL_DEGREES))
+GRID_ROWS = int(math.ceil(180.0 / GRID_CELL_DEGREES))
+
+
+def grid_cell(lat, lon):
+    row = min(max(int(math.floor((lat + 90.0) / GRID_CELL_DEGREES)), 0), GRID_ROWS - 1)
+    col = min(max(int(math.floor((lon + 180.0) / GRID_CELL_DEGREES)), 0), GRID_COLUMNS - 1)
+    return row * GRID_COLUMNS + col
+
+
+def backfill_grid_cells(apps, schema_editor):
+    Vessel = apps.get_model('core', 'Vessel')
+    VesselHistory = apps.get_model('core', 'VesselHistory')
+
+    for model, lat_field, lon_field in (
+        (Vessel, 'last_position_lat', 'last_position_lon'),
+        (VesselHistory, 'latitude', 'longitude'),
+    ):
+        batch = []
+        for obj in model.objects.only('id', lat_field, lon_field).iterator(chunk_size=5000):
+            obj.grid_cell = grid_cell(getattr(obj, lat_field), getattr(obj, lon_field))
+            batch.append(obj)
+            if len(batch) >= 5000:
+                model.objects.bulk_update(batch, ['grid_cell'])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ['grid_cell'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_vesselhistory_fix_timestamp'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vessel',
+            name='grid_cell',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='vesselhistory',
+            name='grid_cell',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='vessel',
+            index=models.Index(fields=['grid_cell', 'last_position_lat', 'last_position_lon'], name='vessel_grid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vesselhistory',
+            index=models.Index(fields=['grid_cell', 'timestamp'], name='history_grid_time_idx'),
+        ),
+        migrations.RunPython(backfill_grid_cells, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.10 on 2026-10-18 10:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_sync_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['timestamp', 'id'], name='event_time_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['created_at', 'id'], name='notification_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vesselhistory',
+            index=models.Index(fields=['timestamp', 'id'], name='history_time_id_idx'),
+        ),
+    ]
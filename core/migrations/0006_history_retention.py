@@ -0,0 +1,28 @@
+# Generated by Django 5.2.10 on 2026-10-18 10:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoryArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('path', models.CharField(max_length=500)),
+                ('raw_rows', models.BigIntegerField()),
+                ('kept_rows', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='vesselhistory',
+            index=models.Index(fields=['vessel', 'timestamp'], name='history_vessel_time_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.10 on 2026-10-18 10:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_history_retention'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ZoneOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zone_kind', models.CharField(choices=[('event', 'Risk Event'), ('port', 'Port')], max_length=10)),
+                ('zone_id', models.BigIntegerField()),
+                ('entered_at', models.DateTimeField(auto_now_add=True)),
+                ('vessel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='zone_occupancy', to='core.vessel')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('vessel', 'zone_kind', 'zone_id'), name='unique_zone_occupancy')],
+            },
+        ),
+    ]
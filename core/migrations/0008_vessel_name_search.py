@@ -0,0 +1,57 @@
+# Generated by Django 5.2.10 on 2026-10-18 10:37
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normalize_name(value):
+    # A frozen copy of core.models.normalize_name as of this migration
+    value = unicodedata.normalize('NFKD', value or '').encode('ascii', 'ignore').decode()
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', value.lower()).split())
+
+
+def backfill_normalized_names(apps, schema_editor):
+    Vessel = apps.get_model('core', 'Vessel')
+    batch = []
+    for vessel in Vessel.objects.only('id', 'name').iterator(chunk_size=5000):
+        vessel.name_normalized = normalize_name(vessel.name)[:100]
+        batch.append(vessel)
+        if len(batch) >= 5000:
+            Vessel.objects.bulk_update(batch, ['name_normalized'])
+            batch = []
+    if batch:
+        Vessel.objects.bulk_update(batch, ['name_normalized'])
+
+
+def create_trigram_index(apps, schema_editor):
+    # Word-prefix / substring name matches on PostgreSQL; other engines use core.search.NameIndex
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS vessel_name_trgm_idx ON core_vessel USING gin (name_normalized gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS vessel_name_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_zone_occupancy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vessel',
+            name='name_normalized',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(backfill_normalized_names, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
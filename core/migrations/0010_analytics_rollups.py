@@ -0,0 +1,83 @@
+# Generated by Django 5.2.10 on 2026-10-18 11:13
+
+from collections import defaultdict
+from datetime import timezone as dt_timezone
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_rollups(apps, schema_editor):
+    # A frozen copy of core.analytics.rebuild as of this migration: the new tables start empty
+    Voyage = apps.get_model('core', 'Voyage')
+    totals = defaultdict(lambda: defaultdict(int))
+
+    def hour(moment):
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment, dt_timezone.utc)
+        return moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+    fields = ('port_from_id', 'port_to_id', 'departure_time', 'arrival_time', 'status')
+    for port_from, port_to, departed, arrived, status in Voyage.objects.values_list(*fields).iterator(chunk_size=5000):
+        totals['VoyageStatusCount', (('status', status),)]['voyages'] += 1
+        if departed is not None:
+            totals['PortTraffic', (('port_id', port_from), ('hour', hour(departed)))]['departures'] += 1
+        if arrived is not None:
+            totals['PortTraffic', (('port_id', port_to), ('hour', hour(arrived)))]['arrivals'] += 1
+            if departed is not None:
+                route = totals['RouteStats', (('port_from_id', port_from), ('port_to_id', port_to))]
+                route['voyages'] += 1
+                route['transit_seconds'] += round((arrived - departed).total_seconds())
+
+    rows = defaultdict(list)
+    for (model, key), amounts in totals.items():
+        rows[model].append(apps.get_model('core', model)(**dict(key), **amounts))
+    for model, objects in rows.items():
+        apps.get_model('core', model).objects.bulk_create(objects, batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_background_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoyageStatusCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=50, unique=True)),
+                ('voyages', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PortTraffic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('arrivals', models.IntegerField(default=0)),
+                ('departures', models.IntegerField(default=0)),
+                ('port', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='traffic', to='core.port')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hour'], name='port_traffic_hour_idx')],
+                'constraints': [models.UniqueConstraint(fields=('port', 'hour'), name='unique_port_traffic_hour')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RouteStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('voyages', models.IntegerField(default=0)),
+                ('transit_seconds', models.BigIntegerField(default=0)),
+                ('port_from', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='routes_out', to='core.port')),
+                ('port_to', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='routes_in', to='core.port')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('port_from', 'port_to'), name='unique_route_stats')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
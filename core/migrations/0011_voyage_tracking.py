@@ -0,0 +1,56 @@
+# Generated by Django 5.2.10 on 2026-10-18 11:23
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_analytics_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VesselTrackState',
+            fields=[
+                ('vessel', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='track_state', serialize=False, to='core.vessel')),
+                ('last_fix_at', models.DateTimeField()),
+                ('last_lat', models.FloatField()),
+                ('last_lon', models.FloatField()),
+                ('speed_knots', models.FloatField(default=0.0)),
+                ('course', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='voyage',
+            name='detected',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='voyage',
+            name='eta',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='voyage',
+            name='planned_arrival',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='voyage',
+            name='departure_time',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='voyage',
+            index=models.Index(fields=['vessel', 'arrival_time'], name='voyage_vessel_arrival_idx'),
+        ),
+        migrations.AddField(
+            model_name='vesseltrackstate',
+            name='port',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.port'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.10 on 2026-10-18 11:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_deliveries(apps, schema_editor):
+    # Existing notifications were broadcast with one shared read flag; give every active user a copy
+    Notification = apps.get_model('core', 'Notification')
+    NotificationDelivery = apps.get_model('core', 'NotificationDelivery')
+    User = apps.get_model('core', 'User')
+    user_ids = list(User.objects.filter(is_active=True).values_list('id', flat=True))
+    if not user_ids:
+        return
+    notifications = Notification.objects.values_list('id', 'created_at', 'is_read').iterator(chunk_size=1000)
+    for notification_id, created_at, is_read in notifications:
+        NotificationDelivery.objects.bulk_create([
+            NotificationDelivery(notification_id=notification_id, user_id=user_id, created_at=created_at,
+                                 read_at=created_at if is_read else None)
+            for user_id in user_ids
+        ], batch_size=5000)
+    Notification.objects.update(recipients=len(user_ids))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_voyage_tracking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='audience',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='recipients',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='region',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=50),
+        ),
+        migrations.CreateModel(
+            name='NotificationDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('read_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('notification', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='core.notification')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_deliveries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'created_at', 'id'], name='delivery_inbox_idx'), models.Index(condition=models.Q(('read_at__isnull', True)), fields=['user'], name='delivery_unread_idx'), models.Index(fields=['user', 'updated_at'], name='delivery_user_updated_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'notification'), name='unique_notification_delivery')],
+            },
+        ),
+        migrations.RunPython(backfill_deliveries, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='notification',
+            name='is_read',
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.10 on 2026-10-18 11:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_notification_deliveries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenRevocation',
+            fields=[
+                ('user_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('generation', models.PositiveIntegerField(default=1)),
+                ('revoked_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.10 on 2026-10-18 11:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_token_revocation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CloseEncounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cpa_km', models.FloatField()),
+                ('tcpa_minutes', models.FloatField()),
+                ('detected_at', models.DateTimeField(auto_now_add=True)),
+                ('vessel_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.vessel')),
+                ('vessel_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.vessel')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('vessel_a', 'vessel_b'), name='unique_close_encounter')],
+            },
+        ),
+    ]
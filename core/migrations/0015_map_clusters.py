@@ -0,0 +1,67 @@
+# Generated by Django 5.2.10 on 2026-10-18 12:16
+
+import math
+from collections import Counter
+
+from django.conf import settings
+from django.db import migrations, models
+
+# A frozen copy of core.clusters' tiling as of this migration; the zoom range is still the
+# setting the map reads use
+MIN_LEVEL = 4
+MAX_LEVEL = getattr(settings, 'CLUSTER_MAX_ZOOM', 7) + MIN_LEVEL
+MAX_MERCATOR_LAT = 85.0511287798
+
+
+def tile(lat, lon, level):
+    n = 1 << level
+    lat = min(max(lat, -MAX_MERCATOR_LAT), MAX_MERCATOR_LAT)
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def backfill_clusters(apps, schema_editor):
+    Vessel = apps.get_model('core', 'Vessel')
+    ClusterCell = apps.get_model('core', 'ClusterCell')
+    totals = Counter()
+    fields = ('last_position_lat', 'last_position_lon', 'vessel_type', 'status')
+    for lat, lon, vessel_type, status in Vessel.objects.values_list(*fields).iterator(chunk_size=5000):
+        if lat is None or lon is None:
+            continue
+        x, y = tile(lat, lon, MAX_LEVEL)
+        for level in range(MIN_LEVEL, MAX_LEVEL + 1):
+            totals[level, x >> (MAX_LEVEL - level), y >> (MAX_LEVEL - level), vessel_type, status] += 1
+    ClusterCell.objects.bulk_create([
+        ClusterCell(cell=(level << 56) | (y << 28) | x, level=level, x=x, y=y, vessel_type=vessel_type, status=status,
+                    vessels=vessels)
+        for (level, x, y, vessel_type, status), vessels in totals.items()
+    ], batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_close_encounters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClusterCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cell', models.BigIntegerField()),
+                ('level', models.PositiveSmallIntegerField()),
+                ('x', models.IntegerField()),
+                ('y', models.IntegerField()),
+                ('vessel_type', models.CharField(max_length=50)),
+                ('status', models.CharField(max_length=20)),
+                ('vessels', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['level', 'x', 'y'], name='cluster_cell_tile_idx'), models.Index(condition=models.Q(('vessels', 0)), fields=['vessels'], name='cluster_cell_empty_idx')],
+                'constraints': [models.UniqueConstraint(fields=('cell', 'vessel_type', 'status'), name='unique_cluster_cell')],
+            },
+        ),
+        migrations.RunPython(backfill_clusters, migrations.RunPython.noop),
+    ]
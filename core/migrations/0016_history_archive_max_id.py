@@ -0,0 +1,33 @@
+# Generated by Django 5.2.10 on 2026-10-18 12:25
+
+from datetime import datetime, time, timedelta, timezone
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def backfill_max_ids(apps, schema_editor):
+    # Rows left on an archived day were all archived then (they are the kept track)
+    HistoryArchive = apps.get_model('core', 'HistoryArchive')
+    VesselHistory = apps.get_model('core', 'VesselHistory')
+    for archive in HistoryArchive.objects.all():
+        start = datetime.combine(archive.day, time.min, tzinfo=timezone.utc)
+        day_rows = VesselHistory.objects.filter(timestamp__gte=start, timestamp__lt=start + timedelta(days=1))
+        archive.max_id = day_rows.aggregate(max_id=Max('id'))['max_id'] or 0
+        archive.save(update_fields=['max_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_map_clusters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historyarchive',
+            name='max_id',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_max_ids, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.10 on 2026-10-18 14:05
+
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+
+
+def backfill_position_times(apps, schema_editor):
+    # The newest recorded fix is the best estimate of where last_position_* came from
+    Vessel = apps.get_model('core', 'Vessel')
+    VesselHistory = apps.get_model('core', 'VesselHistory')
+    newest = (
+        VesselHistory.objects.filter(vessel=OuterRef('pk'))
+        .values('vessel').annotate(newest=Max('timestamp')).values('newest')
+    )
+    Vessel.objects.update(last_position_time=Subquery(newest))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_history_archive_max_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vessel',
+            name='last_position_time',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_position_times, migrations.RunPython.noop),
+    ]
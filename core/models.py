@@ -1,5 +1,17 @@
+import re
+import unicodedata
+
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
+from .geo import grid_cell
+
+
+def normalize_name(value):
+    # "MV Maersk-Alabama " -> "mv maersk alabama": ASCII, lower case, single spaces
+    value = unicodedata.normalize('NFKD', value or '').encode('ascii', 'ignore').decode()
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', value.lower()).split())
 
 # --- Milestone 1: Custom User & Role-Based Access ---
 class User(AbstractUser):
@@ -9,6 +21,20 @@ class User(AbstractUser):
         ('operator', 'Operator'),
     )
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='operator')
+    # Area of responsibility (e.g. "North Sea"); notifications can target it
+    region = models.CharField(max_length=50, blank=True, default='', db_index=True)
+    # Fields copied into access tokens, plus those that must end a session when they change
+    TOKEN_FIELDS = ('role', 'region', 'username', 'is_staff', 'is_active', 'password')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Saves that change these revoke the user's outstanding tokens (see core/authentication.py)
+        instance._token_state = instance.token_state()
+        return instance
+
+    def token_state(self):
+        return tuple(self.__dict__.get(field) for field in self.TOKEN_FIELDS)
 
 # --- Milestone 2: Vessel Metadata ---
 class Vessel(models.Model):
@@ -17,7 +43,42 @@ class Vessel(models.Model):
     vessel_type = models.CharField(max_length=50)
     last_position_lat = models.FloatField()
     last_position_lon = models.FloatField()
+    # Receive time of the feed fix behind last_position_*, so a late batch cannot move it back
+    last_position_time = models.DateTimeField(null=True, blank=True, editable=False)
     status = models.CharField(max_length=20, default='Active') 
+    # Spatial grid index for viewport / proximity queries (see core/geo.py)
+    grid_cell = models.IntegerField(default=0, editable=False)
+    # Delta-sync cursor column (see core/sync.py)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Search key for name lookups (see core/search.py)
+    name_normalized = models.CharField(max_length=100, default='', editable=False, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['grid_cell', 'last_position_lat', 'last_position_lon'], name='vessel_grid_idx'),
+        ]
+
+    CLUSTER_FIELDS = ('last_position_lat', 'last_position_lon', 'vessel_type', 'status')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets search invalidation skip saves that leave the name alone
+        instance._loaded_name = instance.__dict__.get('name')
+        # Where this row is counted in the map cluster cells (see core/clusters.py)
+        instance._cluster_state = instance.cluster_state()
+        return instance
+
+    def cluster_state(self):
+        return tuple(self.__dict__.get(field) for field in self.CLUSTER_FIELDS)
+
+    def save(self, *args, **kwargs):
+        self.grid_cell = grid_cell(self.last_position_lat, self.last_position_lon)
+        self.name_normalized = normalize_name(self.name)[:100]
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'name_normalized'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -26,6 +87,7 @@ class Vessel(models.Model):
 class Port(models.Model):
     name = models.CharField(max_length=100)
     location = models.CharField(max_length=100) # format: "lat, lon"
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.name
@@ -36,16 +98,55 @@ class VesselHistory(models.Model):
     vessel = models.ForeignKey('Vessel', on_delete=models.CASCADE, related_name='history')
     latitude = models.FloatField()
     longitude = models.FloatField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # AIS fixes carry their own receive time; defaults to now for manual entries
+    timestamp = models.DateTimeField(default=timezone.now)
+    grid_cell = models.IntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['grid_cell', 'timestamp'], name='history_grid_time_idx'),
+            # Keyset pagination: ORDER BY -timestamp, -id
+            models.Index(fields=['timestamp', 'id'], name='history_time_id_idx'),
+            # Per-vessel track lookups (replay, retention)
+            models.Index(fields=['vessel', 'timestamp'], name='history_vessel_time_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.grid_cell = grid_cell(self.latitude, self.longitude)
+        super().save(*args, **kwargs)
 
 # --- Milestone 4: Voyages ---
 class Voyage(models.Model):
     vessel = models.ForeignKey('Vessel', on_delete=models.CASCADE, related_name='voyages')
     port_from = models.ForeignKey('Port', related_name='departures', on_delete=models.CASCADE)
     port_to = models.ForeignKey('Port', related_name='arrivals', on_delete=models.CASCADE)
-    departure_time = models.DateTimeField(auto_now_add=True)
+    departure_time = models.DateTimeField(default=timezone.now)
     arrival_time = models.DateTimeField(null=True, blank=True)
     status = models.CharField(max_length=50, default='On Schedule')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Kept current from the position stream while under way (see core/tracking.py)
+    eta = models.DateTimeField(null=True, blank=True)
+    planned_arrival = models.DateTimeField(null=True, blank=True)
+    # Opened by the tracker on departure; port_to is a prediction until the vessel arrives
+    detected = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # Open voyage per vessel
+            models.Index(fields=['vessel', 'arrival_time'], name='voyage_vessel_arrival_idx'),
+        ]
+
+    ROLLUP_FIELDS = ('port_from_id', 'port_to_id', 'departure_time', 'arrival_time', 'status')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # What this row last contributed to the analytics rollups (see core/analytics.py)
+        instance._rollup_state = instance.rollup_state()
+        return instance
+
+    def rollup_state(self):
+        return tuple(self.__dict__.get(field) for field in self.ROLLUP_FIELDS)
 
 # --- Milestone 3: Safety Events ---
 class Event(models.Model):
@@ -54,9 +155,207 @@ class Event(models.Model):
     location = models.CharField(max_length=100)
     timestamp = models.DateTimeField(auto_now_add=True) # Re-added for Admin visibility
     details = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['timestamp', 'id'], name='event_time_id_idx'),
+        ]
 
 # --- Milestone 3: Notifications ---
 class Notification(models.Model):
     message = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
-    is_read = models.BooleanField(default=False)
\ No newline at end of file
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Who it is for: {"roles": [...], "regions": [...], "users": [...]}; {} is everyone
+    audience = models.JSONField(default=dict, blank=True)
+    recipients = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='notification_created_id_idx'),
+        ]
+
+# --- Notifications: one row per recipient, carrying that user's read state (see core/notifications.py) ---
+class NotificationDelivery(models.Model):
+    notification = models.ForeignKey('Notification', on_delete=models.CASCADE, related_name='deliveries')
+    user = models.ForeignKey('User', on_delete=models.CASCADE, related_name='notification_deliveries')
+    # Copied from the notification, so an inbox pages on one index
+    created_at = models.DateTimeField()
+    read_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'notification'], name='unique_notification_delivery'),
+        ]
+        indexes = [
+            # Inbox: WHERE user = ? ORDER BY -created_at, -id
+            models.Index(fields=['user', 'created_at', 'id'], name='delivery_inbox_idx'),
+            # Badge recount: only the user's unread rows
+            models.Index(fields=['user'], condition=models.Q(read_at__isnull=True), name='delivery_unread_idx'),
+            # Delta sync
+            models.Index(fields=['user', 'updated_at'], name='delivery_user_updated_idx'),
+        ]
+
+# --- Geofencing: which vessels are currently inside which risk zone / port radius ---
+class ZoneOccupancy(models.Model):
+    ZONE_KINDS = (
+        ('event', 'Risk Event'),
+        ('port', 'Port'),
+    )
+    vessel = models.ForeignKey('Vessel', on_delete=models.CASCADE, related_name='zone_occupancy')
+    zone_kind = models.CharField(max_length=10, choices=ZONE_KINDS)
+    zone_id = models.BigIntegerField()
+    entered_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['vessel', 'zone_kind', 'zone_id'], name='unique_zone_occupancy'),
+        ]
+
+# --- History Retention: one row per archived (downsampled) UTC day ---
+class HistoryArchive(models.Model):
+    day = models.DateField(unique=True)
+    # Newest archive part; every part of the day is history-YYYY-MM-DD*.csv.gz next to it
+    path = models.CharField(max_length=500)
+    # Highest VesselHistory id archived for the day: rows above it arrived later and are still raw
+    max_id = models.BigIntegerField(default=0)
+    raw_rows = models.BigIntegerField()
+    kept_rows = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+# --- Delta Sync: Deletion Markers ---
+class SyncTombstone(models.Model):
+    # Rows removed from synced tables, kept long enough for polling clients to catch up
+    model = models.CharField(max_length=30)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+# --- Background Jobs: the database is the queue (see core/jobs.py) ---
+class Job(models.Model):
+    QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    )
+    task = models.CharField(max_length=100)
+    queue = models.CharField(max_length=50, default='default')
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    priority = models.SmallIntegerField(default=0)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    # Set to the task name for tasks that must never run twice at once
+    exclusive_key = models.CharField(max_length=100, null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    lease_expires = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True, default='')
+    created_by = models.ForeignKey('User', null=True, blank=True, on_delete=models.SET_NULL, related_name='jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Claim: WHERE status = 'queued' AND run_at <= now
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['exclusive_key'], condition=models.Q(status='running'), name='unique_running_exclusive_job',
+            ),
+        ]
+
+# --- Analytics Rollups: maintained on every Voyage write (see core/analytics.py) ---
+class PortTraffic(models.Model):
+    port = models.ForeignKey('Port', on_delete=models.CASCADE, related_name='traffic')
+    hour = models.DateTimeField()
+    arrivals = models.IntegerField(default=0)
+    departures = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['port', 'hour'], name='unique_port_traffic_hour'),
+        ]
+        indexes = [
+            # Busiest-ports board: every port inside a time window
+            models.Index(fields=['hour'], name='port_traffic_hour_idx'),
+        ]
+
+class RouteStats(models.Model):
+    port_from = models.ForeignKey('Port', on_delete=models.CASCADE, related_name='routes_out')
+    port_to = models.ForeignKey('Port', on_delete=models.CASCADE, related_name='routes_in')
+    # Voyages that arrived, and their summed departure -> arrival time
+    voyages = models.IntegerField(default=0)
+    transit_seconds = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['port_from', 'port_to'], name='unique_route_stats'),
+        ]
+
+class VoyageStatusCount(models.Model):
+    status = models.CharField(max_length=50, unique=True)
+    voyages = models.IntegerField(default=0)
+
+# --- Voyage Tracking: where each vessel's position stream left off (see core/tracking.py) ---
+class VesselTrackState(models.Model):
+    vessel = models.OneToOneField('Vessel', on_delete=models.CASCADE, primary_key=True, related_name='track_state')
+    last_fix_at = models.DateTimeField()
+    last_lat = models.FloatField()
+    last_lon = models.FloatField()
+    # Smoothed speed over ground and last course made good, from consecutive fixes
+    speed_knots = models.FloatField(default=0.0)
+    course = models.FloatField(null=True, blank=True)
+    # Port the vessel is berthed at; None while at sea (its open voyage has arrival_time NULL)
+    port = models.ForeignKey('Port', null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    updated_at = models.DateTimeField(auto_now=True)
+
+# --- Access Token Revocation ---
+# Tokens carry the generation current when they were issued; bumping it refuses them all.
+# Keyed by plain user id so a deleted user's tokens stay revoked.
+class TokenRevocation(models.Model):
+    user_id = models.BigIntegerField(primary_key=True)
+    generation = models.PositiveIntegerField(default=1)
+    revoked_at = models.DateTimeField(db_index=True)
+
+# --- Collision Screening: vessel pairs currently on a close-approach course (see core/collision.py) ---
+class CloseEncounter(models.Model):
+    # vessel_a has the lower id
+    vessel_a = models.ForeignKey('Vessel', on_delete=models.CASCADE, related_name='+')
+    vessel_b = models.ForeignKey('Vessel', on_delete=models.CASCADE, related_name='+')
+    cpa_km = models.FloatField()
+    tcpa_minutes = models.FloatField()
+    detected_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['vessel_a', 'vessel_b'], name='unique_close_encounter'),
+        ]
+
+# --- Map Clusters: vessels per Web-Mercator tile, maintained on every Vessel write (see core/clusters.py) ---
+class ClusterCell(models.Model):
+    # level, x and y packed into one integer, so increments can match many cells with IN()
+    cell = models.BigIntegerField()
+    level = models.PositiveSmallIntegerField()
+    x = models.IntegerField()
+    y = models.IntegerField()
+    vessel_type = models.CharField(max_length=50)
+    status = models.CharField(max_length=20)
+    vessels = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cell', 'vessel_type', 'status'], name='unique_cluster_cell'),
+        ]
+        indexes = [
+            # Viewport reads: one level, a range of columns and rows
+            models.Index(fields=['level', 'x', 'y'], name='cluster_cell_tile_idx'),
+            # Cells emptied by a move are deleted right after it
+            models.Index(fields=['vessels'], condition=models.Q(vessels=0), name='cluster_cell_empty_idx'),
+        ]
@@ -0,0 +1,94 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Notification, NotificationDelivery, User
+from .realtime import publish_record
+
+# --- Notification Fan-out & Per-user Read State ---
+# A notification is stored once and delivered to its audience with one bulk INSERT of
+# NotificationDelivery rows (recipient + read_at). Inboxes page on (user, created_at, id),
+# mark-as-read is one UPDATE, and the badge count is served from the cache. The count is
+# dropped after each commit that changes it, and recounted on a partial index of that
+# user's unread rows.
+CACHE_ALIAS = getattr(settings, 'API_CACHE_ALIAS', 'default')
+UNREAD_CACHE_SECONDS = getattr(settings, 'NOTIFICATION_UNREAD_CACHE_SECONDS', 300)
+FANOUT_CHUNK = 5000
+
+
+def _unread_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def _forget_unread(user_ids):
+    keys = [_unread_key(user_id) for user_id in user_ids]
+    for start in range(0, len(keys), FANOUT_CHUNK):
+        caches[CACHE_ALIAS].delete_many(keys[start:start + FANOUT_CHUNK])
+
+
+def audience(roles=None, regions=None, users=None):
+    """The ``Notification.audience`` for the given targets; no targets means every active user."""
+    targets = {'roles': roles, 'regions': regions, 'users': users}
+    return {key: sorted(set(values)) for key, values in targets.items() if values}
+
+
+def recipients(audience):
+    queryset = User.objects.filter(is_active=True)
+    if audience.get('roles'):
+        queryset = queryset.filter(role__in=audience['roles'])
+    if audience.get('regions'):
+        queryset = queryset.filter(region__in=audience['regions'])
+    if audience.get('users'):
+        queryset = queryset.filter(id__in=audience['users'])
+    return queryset
+
+
+def notify(message, roles=None, regions=None, users=None):
+    # Delivery happens in the Notification post_save handler
+    return Notification.objects.create(message=message, audience=audience(roles, regions, users))
+
+
+def deliver(notification):
+    """Fans ``notification`` out to its audience; live streams and badge counts follow on commit."""
+    user_ids = list(recipients(notification.audience).values_list('id', flat=True))
+    NotificationDelivery.objects.bulk_create(
+        [NotificationDelivery(notification=notification, user_id=user_id, created_at=notification.created_at)
+         for user_id in user_ids],
+        batch_size=FANOUT_CHUNK,
+    )
+    notification.recipients = len(user_ids)
+    Notification.objects.filter(pk=notification.pk).update(recipients=len(user_ids))
+    payload = {'id': notification.id, 'message': notification.message, 'created_at': notification.created_at, 'is_read': False}
+    recipient_set = frozenset(user_ids)
+
+    def committed():
+        _forget_unread(user_ids)
+        publish_record('notification', payload, recipients=recipient_set)
+
+    transaction.on_commit(committed)
+    return len(user_ids)
+
+
+def unread_count(user):
+    cache = caches[CACHE_ALIAS]
+    count = cache.get(_unread_key(user.id))
+    if count is None:
+        count = NotificationDelivery.objects.filter(user_id=user.id, read_at__isnull=True).count()
+        cache.set(_unread_key(user.id), count, UNREAD_CACHE_SECONDS)
+    return count
+
+
+def mark_read(user, notification_ids=None, before=None):
+    """Marks the user's unread deliveries read (all, the given notifications, or those up to ``before``)."""
+    unread = NotificationDelivery.objects.filter(user_id=user.id, read_at__isnull=True)
+    if notification_ids is not None:
+        unread = unread.filter(notification_id__in=notification_ids)
+    if before is not None:
+        unread = unread.filter(created_at__lte=before)
+    now = timezone.now()
+    # update() bypasses auto_now; delta-sync clients rely on updated_at moving
+    marked = unread.update(read_at=now, updated_at=now)
+    if marked:
+        transaction.on_commit(lambda: _forget_unread([user.id]))
+    return marked
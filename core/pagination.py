@@ -0,0 +1,96 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+from .asyncviews import fetch
+
+# --- Keyset (Cursor) Pagination for the append-heavy tables ---
+# Each page is a "WHERE ordering_field < last_seen ORDER BY ... LIMIT n" on an indexed
+# column, so page cost and memory stay flat no matter how large the table grows.
+# DRF's paginate_queryset is split around its one query so the async read path
+# (core/asyncviews.py) can await the page with the same cursors and links.
+class KeysetPagination(CursorPagination):
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        window = self._page_window(queryset, request, view)
+        if window is None:
+            return None
+        return self._page_from(list(window[0]), *window[1:])
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        window = self._page_window(queryset, request, view)
+        if window is None:
+            return None
+        return self._page_from(await fetch(window[0]), *window[1:])
+
+    def _page_window(self, queryset, request, view):
+        """The unevaluated slice holding the page plus one row, and the cursor it was cut at."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, current_position = self.cursor or (0, False, None)
+
+        queryset = queryset.order_by(*(_reverse_ordering(self.ordering) if reverse else self.ordering))
+        if current_position is not None:
+            order = self.ordering[0]
+            # (cursor reversed) XOR (queryset reversed)
+            lookup = 'lt' if self.cursor.reverse != order.startswith('-') else 'gt'
+            queryset = queryset.filter(**{f"{order.lstrip('-')}__{lookup}": current_position})
+        # One extra row tells whether a following page exists
+        return queryset[offset:offset + self.page_size + 1], offset, reverse, current_position
+
+    def _page_from(self, results, offset, reverse, current_position):
+        self.page = results[:self.page_size]
+        has_following_position = len(results) > len(self.page)
+        following_position = self._get_position_from_instance(results[-1], self.ordering) if has_following_position else None
+
+        if reverse:
+            # The query ran in reverse order; flip the page back
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None or offset > 0
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+
+class TimestampCursorPagination(KeysetPagination):
+    # Used by VesselHistory and Event
+    ordering = ('-timestamp', '-id')
+
+
+class ColumnarHistoryPagination(TimestampCursorPagination):
+    # Binary map-layer pages are ~16 bytes a fix, so they can be far larger than JSON ones
+    page_size = getattr(settings, 'COLUMNAR_PAGE_SIZE', 10000)
+    max_page_size = getattr(settings, 'COLUMNAR_MAX_PAGE_SIZE', 50000)
+
+
+class VoyageCursorPagination(KeysetPagination):
+    ordering = ('-id',)
+
+
+class NotificationCursorPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+
+
+class JobCursorPagination(KeysetPagination):
+    ordering = ('-id',)
@@ -0,0 +1,14 @@
+from rest_framework.permissions import BasePermission
+
+
+# --- Role-Based Access (User.ROLE_CHOICES) ---
+class HasRole(BasePermission):
+    roles = ()
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(user and user.is_authenticated and getattr(user, 'role', '').lower() in self.roles)
+
+
+class IsAnalystOrAdmin(HasRole):
+    roles = ('admin', 'analyst')
@@ -0,0 +1,108 @@
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# --- Real-time Push (Server-Sent Events over the ASGI app) ---
+# Writers publish position / event / notification changes to a broker; every open stream
+# holds a Subscription that keeps at most ONE pending message per (kind, id), so a burst
+# of fixes for the same vessel inside a tick collapses into its latest position.
+TICK_SECONDS = getattr(settings, 'REALTIME_TICK_SECONDS', 1.0)
+HEARTBEAT_SECONDS = getattr(settings, 'REALTIME_HEARTBEAT_SECONDS', 15.0)
+
+
+def _inside(bbox, lat, lon):
+    west, south, east, north = bbox
+    if not south <= lat <= north:
+        return False
+    # Viewports crossing the antimeridian have west > east
+    return west <= lon <= east if west <= east else (lon >= west or lon <= east)
+
+
+class Subscription:
+    def __init__(self, bbox=None, active_only=False, user_id=None):
+        self.bbox = bbox
+        self.active_only = active_only
+        self.user_id = user_id
+        self._pending = {}
+        self._visible = set()
+        self._lock = threading.Lock()
+
+    def wants_position(self, payload):
+        if self.active_only and payload.get('status', 'Active') != 'Active':
+            return False
+        return self.bbox is None or _inside(self.bbox, payload['lat'], payload['lon'])
+
+    def offer(self, kind, key, payload, recipients=None):
+        # Per-user records (notifications) only reach the streams of their recipients
+        if recipients is not None and self.user_id not in recipients:
+            return
+        with self._lock:
+            if kind == 'position':
+                if self.wants_position(payload):
+                    self._visible.add(key)
+                elif key in self._visible:
+                    # Tell the client to drop a vessel that just left its viewport
+                    self._visible.discard(key)
+                    payload = {'id': key, 'in_view': False}
+                else:
+                    return
+            self._pending[(kind, key)] = payload
+
+    def drain(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return [(kind, payload) for (kind, _), payload in pending.items()]
+
+
+class InMemoryBroker:
+    # Process-local: each ASGI worker fans out the writes made in its own process
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, bbox=None, active_only=False, user_id=None):
+        subscription = Subscription(bbox=bbox, active_only=active_only, user_id=user_id)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, kind, key, payload, recipients=None):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.offer(kind, key, payload, recipients)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(getattr(settings, 'REALTIME_BROKER', 'core.realtime.InMemoryBroker'))()
+
+
+# --- Publishers ---
+def position_payload(vessel):
+    return {
+        'id': vessel.id,
+        'mmsi': vessel.mmsi,
+        'name': vessel.name,
+        'vessel_type': vessel.vessel_type,
+        'status': vessel.status,
+        'lat': vessel.last_position_lat,
+        'lon': vessel.last_position_lon,
+        'in_view': True,
+    }
+
+
+def publish_positions(vessels):
+    broker = get_broker()
+    for vessel in vessels:
+        broker.publish('position', vessel.id, position_payload(vessel))
+
+
+def publish_record(kind, data, recipients=None):
+    get_broker().publish(kind, data['id'], dict(data), recipients)
@@ -0,0 +1,72 @@
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# --- Read Replicas (DATABASE_REPLICA_URLS; settings section 4) ---
+# Analyst reads of history, voyages and exports should not queue behind ingestion on the
+# primary. ReplicaRouter sends a read to a replica only inside routing(), which
+# ReplicaRoutingMiddleware opens for GET/HEAD/OPTIONS requests. Everything else reads the
+# primary: writes, jobs, ingestion, management commands and open transactions. A request
+# picks one replica at random on its first read and keeps it, so its queries see one
+# consistent snapshot rather than each replica's own replay lag.
+# Read-your-writes: the first write in a request pins the rest of it to the primary, and the
+# response sets a short-lived cookie that pins the client's next requests as well, so a
+# dashboard never reads back a replica that has not yet replayed its own change.
+REPLICAS = getattr(settings, 'DATABASE_REPLICAS', [])
+STICKY_SECONDS = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+PIN_COOKIE = 'primary_pin'
+
+_routing = contextvars.ContextVar('replica_routing', default=None)
+
+
+class Routing:
+    """Per-request state. Mutated in place so writes made on another thread still pin the request."""
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+        self.replica = None
+
+
+@contextmanager
+def routing(pinned=False):
+    state = Routing(pinned)
+    token = _routing.set(state)
+    try:
+        yield state
+    finally:
+        _routing.reset(token)
+
+
+def reading_replica():
+    """True when this request reads a replica, so its results may trail the primary by the replica lag."""
+    state = _routing.get()
+    return bool(REPLICAS) and state is not None and not state.pinned
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        # Reads inside a transaction must see its uncommitted writes
+        if not reading_replica() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        state = _routing.get()
+        if state.replica is None:
+            state.replica = random.choice(REPLICAS)
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state.pinned = state.wrote = True
+        # Explicit: Django would otherwise save an instance to the replica it was read from
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the primary's rows, so objects from any of them may be related
+        aliases = {DEFAULT_DB_ALIAS, *REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
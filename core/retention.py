@@ -0,0 +1,158 @@
+from array import array
+import csv
+import gzip
+import math
+import os
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from itertools import groupby
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import VesselHistory, HistoryArchive
+
+# --- VesselHistory Retention: archive raw fixes per day, keep a downsampled track ---
+# Every UTC day older than the retention window that still holds raw fixes is processed:
+#   1. its raw fixes are written to <archive_dir>/history-YYYY-MM-DD.csv.gz
+#   2. the hot table keeps one fix per vessel per interval plus turn points
+#   3. HistoryArchive records the highest id archived for the day
+# Fixes that reach an archived day later (late AIS batches, backfills) have higher ids, so a
+# later run finds them, archives them as an extra part (history-YYYY-MM-DD+<first id>.csv.gz)
+# and thins the day again. A day without such rows is left alone.
+RETENTION_DAYS = getattr(settings, 'HISTORY_RETENTION_DAYS', 30)
+DOWNSAMPLE_MINUTES = getattr(settings, 'HISTORY_DOWNSAMPLE_MINUTES', 10)
+TURN_DEGREES = getattr(settings, 'HISTORY_TURN_DEGREES', 30.0)
+DELETE_BATCH = 5000
+ARCHIVE_COLUMNS = ['id', 'vessel_id', 'latitude', 'longitude', 'timestamp']
+
+
+def bearing(lat1, lon1, lat2, lon2):
+    lat1, lat2 = math.radians(lat1), math.radians(lat2)
+    dlon = math.radians(lon2 - lon1)
+    x = math.sin(dlon) * math.cos(lat2)
+    y = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(dlon)
+    return math.degrees(math.atan2(x, y)) % 360.0
+
+
+def heading_change(before, after):
+    return abs((after - before + 180.0) % 360.0 - 180.0)
+
+
+def downsample_track(points, interval, turn_degrees):
+    """Returns the ids to keep from one vessel's ``(id, lat, lon, timestamp)`` points, sorted by time."""
+    if len(points) <= 2:
+        return {point[0] for point in points}
+
+    keep = {points[0][0], points[-1][0]}
+    last_kept_at = points[0][3]
+    for previous, current, following in zip(points, points[1:], points[2:]):
+        moved_in = previous[1:3] != current[1:3]
+        moved_out = current[1:3] != following[1:3]
+        is_turn = moved_in and moved_out and heading_change(
+            bearing(*previous[1:3], *current[1:3]), bearing(*current[1:3], *following[1:3])
+        ) >= turn_degrees
+        if is_turn or current[3] - last_kept_at >= interval:
+            keep.add(current[0])
+            last_kept_at = current[3]
+    return keep
+
+
+def _day_rows(day):
+    start = datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+    return (
+        VesselHistory.objects.filter(timestamp__gte=start, timestamp__lt=start + timedelta(days=1))
+        .order_by('vessel_id', 'timestamp', 'id')
+        .values_list('id', 'vessel_id', 'latitude', 'longitude', 'timestamp')
+    )
+
+
+def _tracks(day):
+    rows = _day_rows(day).iterator(chunk_size=DELETE_BATCH)
+    for vessel_id, group in groupby(rows, key=lambda row: row[1]):
+        yield vessel_id, [(row[0], row[2], row[3], row[4]) for row in group]
+
+
+def archive_day(day, archive_dir, interval, turn_degrees):
+    archive = HistoryArchive.objects.filter(day=day).first()
+    archived_up_to = archive.max_id if archive is not None else 0
+    raw = _day_rows(day).filter(id__gt=archived_up_to)
+    first_id = raw.order_by('id').values_list('id', flat=True).first()
+    if first_id is None:
+        return None
+
+    archive_dir = Path(archive_dir)
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    suffix = '' if archive is None else f'+{first_id}'
+    path = archive_dir / f'history-{day:%Y-%m-%d}{suffix}.csv.gz'
+
+    # Pass 1: write the day's raw fixes to disk before anything is deleted
+    raw_rows = 0
+    max_id = archived_up_to
+    partial = path.with_suffix('.partial')
+    with gzip.open(partial, 'wt', newline='', encoding='utf-8') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(ARCHIVE_COLUMNS)
+        for row in raw.iterator(chunk_size=DELETE_BATCH):
+            writer.writerow([row[0], row[1], row[2], row[3], row[4].isoformat()])
+            raw_rows += 1
+            max_id = max(max_id, row[0])
+    os.replace(partial, path)
+
+    # Pass 2: thin each vessel's whole track for the day (fixes kept by an earlier run are
+    # archived too, so a late fix may replace them). Ids are collected first (compactly) so
+    # no DELETE runs while the read cursor is still open.
+    kept_rows = 0
+    doomed = array('q')
+    for _, points in _tracks(day):
+        keep = downsample_track(points, interval, turn_degrees)
+        kept_rows += len(keep)
+        doomed.extend(point[0] for point in points if point[0] not in keep)
+
+    with transaction.atomic():
+        for start in range(0, len(doomed), DELETE_BATCH):
+            VesselHistory.objects.filter(id__in=doomed[start:start + DELETE_BATCH].tolist()).delete()
+        HistoryArchive.objects.update_or_create(day=day, defaults={
+            'path': str(path), 'max_id': max_id, 'kept_rows': kept_rows,
+            'raw_rows': raw_rows + (archive.raw_rows if archive is not None else 0),
+        })
+
+    return {'day': day, 'path': str(path), 'raw_rows': raw_rows, 'kept_rows': kept_rows}
+
+
+def pending_days(retention_days):
+    """UTC days older than the window holding fixes above their archived max id, oldest first."""
+    cutoff = datetime.combine(timezone.now().date() - timedelta(days=retention_days), time.min, tzinfo=dt_timezone.utc)
+    archived = dict(HistoryArchive.objects.values_list('day', 'max_id'))
+    days = (
+        VesselHistory.objects.filter(timestamp__lt=cutoff)
+        .annotate(day=TruncDate('timestamp', tzinfo=dt_timezone.utc))
+        .values('day').annotate(max_id=Max('id')).order_by('day').values_list('day', 'max_id')
+    )
+    for day, max_id in days:
+        if max_id > archived.get(day, 0):
+            yield day
+
+
+def archive_path(archive_dir=None):
+    """``archive_dir`` inside HISTORY_ARCHIVE_DIR (relative paths start there); ValueError if it leads outside."""
+    base = Path(settings.HISTORY_ARCHIVE_DIR).resolve()
+    path = (base / archive_dir).resolve() if archive_dir else base
+    if not path.is_relative_to(base):
+        raise ValueError(f'archive_dir must be inside {base}')
+    return path
+
+
+def apply_retention(retention_days=None, interval_minutes=None, turn_degrees=None, archive_dir=None):
+    """Archives and downsamples every unprocessed day older than the retention window."""
+    interval = timedelta(minutes=interval_minutes or DOWNSAMPLE_MINUTES)
+    turn_degrees = TURN_DEGREES if turn_degrees is None else turn_degrees
+    archive_dir = archive_dir or settings.HISTORY_ARCHIVE_DIR
+    days = RETENTION_DAYS if retention_days is None else retention_days
+    for day in list(pending_days(days)):
+        result = archive_day(day, archive_dir, interval, turn_degrees)
+        if result is not None:
+            yield result
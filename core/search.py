@@ -0,0 +1,183 @@
+import json
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Length
+
+from .caching import bump_versions, model_versions
+from .models import Vessel, normalize_name
+
+# --- Vessel Search (/api/vessels/search/?q=&limit=) ---
+# MMSI digits become a few integer ranges on the unique mmsi index instead of a text cast.
+# Names are matched on Vessel.name_normalized: whole-name prefixes use its btree index;
+# word prefixes ("alab" -> "Maersk Alabama") use the pg_trgm GIN index on PostgreSQL and,
+# on other engines, NameIndex, an in-process sorted array of every name word.
+SEARCH_DEFAULT_LIMIT = getattr(settings, 'VESSEL_SEARCH_DEFAULT_LIMIT', 20)
+SEARCH_MAX_LIMIT = getattr(settings, 'VESSEL_SEARCH_MAX_LIMIT', 100)
+MMSI_DIGITS = 9
+WORD_BYTES = 24
+LOAD_CHUNK = 20000
+FETCH_CHUNK = 500
+# NameIndex sort key layout: tier | name length | vessel id (ids below 2**40)
+TIER_SHIFT, LENGTH_SHIFT = 58, 40
+ID_MASK = (1 << LENGTH_SHIFT) - 1
+# Bumped only when a name changes, so position updates never force an index rebuild
+NAMES_VERSION = 'vessel-names'
+
+
+def mmsi_prefix_q(digits):
+    """Integer ranges covering every MMSI (up to 9 digits) that starts with ``digits``."""
+    if len(digits) > MMSI_DIGITS:
+        return Q(pk__in=[])
+    prefix, q = int(digits), Q()
+    # A leading zero only exists in the 9-digit form ("0036" is 003600000-003699999), not in 36 or 3600
+    lengths = [MMSI_DIGITS] if digits.startswith('0') else range(len(digits), MMSI_DIGITS + 1)
+    for length in lengths:
+        scale = 10 ** (length - len(digits))
+        q |= Q(mmsi__gte=prefix * scale, mmsi__lt=(prefix + 1) * scale)
+    return q
+
+
+def name_prefix_q(name):
+    if connection.vendor == 'postgresql':
+        # Served by the varchar_pattern_ops index Django adds next to db_index
+        return Q(name_normalized__startswith=name)
+    # SQLite's LIKE is case-insensitive and skips the index; a range on the binary collation does not
+    return Q(name_normalized__gte=name, name_normalized__lt=name + '\x7f')
+
+
+def _ids_q(ids):
+    if connection.vendor == 'sqlite':
+        # One bound parameter however many names match, instead of one per id
+        return Q(id__in=RawSQL('SELECT value FROM json_each(%s)', [json.dumps(ids)]))
+    return Q(id__in=ids)
+
+
+def search_q(query):
+    """Filter for the list endpoint's ``?search=``: MMSI prefix, name prefix or name word prefix.
+
+    Prefixes, not substrings: "alab" finds "Maersk Alabama" but "abama" finds nothing.
+    """
+    name = normalize_name(query)
+    if not name:
+        return Q(pk__in=[])
+    if connection.vendor == 'postgresql':
+        q = name_prefix_q(name) | Q(name_normalized__contains=f' {name}')
+    else:
+        # A LIKE '%...' here would scan every row; the word index already knows the matches
+        q = name_prefix_q(name) | _ids_q(get_name_index().ranked_ids(name).tolist())
+    if name.isdigit():
+        q |= mmsi_prefix_q(name)
+    return q
+
+
+class NameIndex:
+    """Every name word in one sorted byte array; a prefix is two binary searches."""
+
+    def __init__(self, rows, version):
+        words, owners, first, lengths = [], [], [], []
+        for vessel_id, name in rows:
+            for position, word in enumerate(name.split()):
+                words.append(word.encode()[:WORD_BYTES])
+                owners.append(vessel_id)
+                first.append(position == 0)
+                lengths.append(len(name))
+        words = np.array(words, dtype=f'S{WORD_BYTES}')
+        order = np.argsort(words, kind='stable')
+        self.words = words[order]
+        self.owners = np.array(owners, dtype=np.int64)[order]
+        self.first = np.array(first, dtype=bool)[order]
+        self.lengths = np.array(lengths, dtype=np.int32)[order]
+        self.version = version
+
+    def _range(self, token):
+        key = token.encode()[:WORD_BYTES - 1]
+        return (
+            np.searchsorted(self.words, key, side='left'),
+            np.searchsorted(self.words, key + b'\xff', side='left'),
+        )
+
+    def ranked_ids(self, name):
+        """Vessel ids whose words start with every token of ``name``, best match first."""
+        tokens = name.split()
+        low, high = self._range(tokens[0])
+        owners, lengths = self.owners[low:high], self.lengths[low:high].astype(np.int64)
+        # 0: whole name equals the query, 1: name starts with it, 2: a later word does
+        tier = np.where(self.first[low:high], np.where(lengths == len(name), 0, 1), 2)
+
+        # One int64 sort key (tier, name length, id); a vessel's first entry is its best
+        keys = np.sort((tier << TIER_SHIFT) | (np.minimum(lengths, 0xFFFF) << LENGTH_SHIFT) | owners)
+        ranked = keys & ID_MASK
+        _, first = np.unique(ranked, return_index=True)
+        ranked = ranked[np.sort(first)]
+
+        for token in tokens[1:]:
+            token_low, token_high = self._range(token)
+            ranked = ranked[np.isin(ranked, self.owners[token_low:token_high])]
+        return ranked
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_name_index():
+    global _index
+    version = model_versions(NAMES_VERSION)[0]
+    if _index is None or _index.version != version:
+        with _index_lock:
+            if _index is None or _index.version != version:
+                rows = Vessel.objects.values_list('id', 'name_normalized').iterator(chunk_size=LOAD_CHUNK)
+                _index = NameIndex(rows, version)
+    return _index
+
+
+def names_changed():
+    bump_versions(NAMES_VERSION)
+
+
+def _postgres_name_matches(queryset, name, limit):
+    rank = Case(
+        When(name_normalized=name, then=Value(0)),
+        When(name_normalized__startswith=name, then=Value(1)),
+        default=Value(2),
+        output_field=IntegerField(),
+    )
+    return list(
+        queryset.filter(name_prefix_q(name) | Q(name_normalized__contains=f' {name}'))
+        .annotate(search_rank=rank)
+        .order_by('search_rank', Length('name_normalized'), 'id')[:limit]
+    )
+
+
+def _indexed_name_matches(queryset, name, limit):
+    ranked = get_name_index().ranked_ids(name)
+    found = []
+    # The queryset may hide some ids (role, viewport), so fetch ranked ids chunk by chunk
+    step = min(limit + 10, FETCH_CHUNK)
+    for start in range(0, len(ranked), step):
+        chunk = ranked[start:start + step].tolist()
+        by_id = {vessel.id: vessel for vessel in queryset.filter(id__in=chunk)}
+        found.extend(by_id[vessel_id] for vessel_id in chunk if vessel_id in by_id)
+        if len(found) >= limit:
+            break
+    return found[:limit]
+
+
+def search_vessels(queryset, query, limit=SEARCH_DEFAULT_LIMIT):
+    """Best matches first: MMSI prefix (numerically), then exact name, name prefix, word prefix."""
+    name = normalize_name(query)
+    if not name:
+        return []
+    found = []
+    if name.isdigit():
+        found.extend(queryset.filter(mmsi_prefix_q(name)).order_by('mmsi')[:limit])
+    if len(found) < limit:
+        matches = _postgres_name_matches if connection.vendor == 'postgresql' else _indexed_name_matches
+        seen = {vessel.id for vessel in found}
+        found.extend(vessel for vessel in matches(queryset, name, limit) if vessel.id not in seen)
+    return found[:limit]
@@ -1,9 +1,33 @@
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from .models import User, Vessel, Port, VesselHistory, Voyage, Event, Notification
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from .authentication import GENERATION_CLAIM, current_generation, stamp
+from .models import User, Vessel, Port, VesselHistory, Voyage, Event, Notification, NotificationDelivery, Job
+from .notifications import notify
+
+# --- Field Projection (?fields=id,mmsi,last_position_lat,...) ---
+class FieldProjectionMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        # Reads only: a projected serializer must never drop fields from validation
+        if request is None or request.method not in SAFE_METHODS:
+            return
+        requested = request.query_params.get('fields')
+        if requested:
+            keep = {name.strip() for name in requested.split(',')}
+            for name in set(self.fields) - keep:
+                self.fields.pop(name)
 
 # --- Custom JWT Response (Powers Sidebar Role Display) ---
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        # Role claims let RoleTokenAuthentication authorize without loading the user
+        return stamp(super().get_token(user), user)
+
     def validate(self, attrs):
         data = super().validate(attrs)
         # Required for the Maritime Command identity badge
@@ -12,26 +36,36 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         data['email'] = self.user.email
         return data
 
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        # The new access token inherits the refresh token's claims, so refuse revoked ones up front
+        refresh = self.token_class(attrs['refresh'])
+        if refresh.get(GENERATION_CLAIM, 0) < current_generation(refresh.get(api_settings.USER_ID_CLAIM)):
+            raise AuthenticationFailed('Token has been revoked', code='token_revoked')
+        return super().validate(attrs)
+
 # --- User Serializer ---
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(FieldProjectionMixin, serializers.ModelSerializer):
     class Meta:
         model = User
-        fields = ['id', 'username', 'email', 'role']
+        fields = ['id', 'username', 'email', 'role', 'region']
 
 # --- Live Tracking Serializer (Includes MMSI for search) ---
-class VesselSerializer(serializers.ModelSerializer):
+# Explicit fields: grid_cell, name_normalized, last_position_time and updated_at are index /
+# bookkeeping columns, not part of the API
+class VesselSerializer(FieldProjectionMixin, serializers.ModelSerializer):
     class Meta:
         model = Vessel
-        fields = '__all__'
+        fields = ['id', 'name', 'mmsi', 'vessel_type', 'last_position_lat', 'last_position_lon', 'status']
 
 # --- Port Analytics Serializer ---
-class PortSerializer(serializers.ModelSerializer):
+class PortSerializer(FieldProjectionMixin, serializers.ModelSerializer):
     class Meta:
         model = Port
-        fields = '__all__'
+        fields = ['id', 'name', 'location']
 
 # --- History Breadcrumbs Serializer ---
-class VesselHistorySerializer(serializers.ModelSerializer):
+class VesselHistorySerializer(FieldProjectionMixin, serializers.ModelSerializer):
     vessel_name = serializers.ReadOnlyField(source='vessel.name')
 
     class Meta:
@@ -39,7 +73,7 @@ class VesselHistorySerializer(serializers.ModelSerializer):
         fields = ['id', 'vessel', 'vessel_name', 'latitude', 'longitude', 'timestamp']
 
 # --- Voyage Audit Log Serializer (Sidebar Optimized) ---
-class VoyageSerializer(serializers.ModelSerializer):
+class VoyageSerializer(FieldProjectionMixin, serializers.ModelSerializer):
     vessel_name = serializers.ReadOnlyField(source='vessel.name')
     port_from_name = serializers.ReadOnlyField(source='port_from.name')
     port_to_name = serializers.ReadOnlyField(source='port_to.name')
@@ -48,11 +82,13 @@ class VoyageSerializer(serializers.ModelSerializer):
         model = Voyage
         fields = [
             'id', 'vessel', 'vessel_name', 'port_from', 'port_from_name', 
-            'port_to', 'port_to_name', 'departure_time', 'arrival_time', 'status'
+            'port_to', 'port_to_name', 'departure_time', 'arrival_time', 'status',
+            'eta', 'planned_arrival', 'detected',
         ]
+        read_only_fields = ['eta', 'detected']
 
 # --- Risk & Safety Intelligence Serializer ---
-class EventSerializer(serializers.ModelSerializer):
+class EventSerializer(FieldProjectionMixin, serializers.ModelSerializer):
     vessel_name = serializers.ReadOnlyField(source='vessel.name')
 
     class Meta:
@@ -60,7 +96,47 @@ class EventSerializer(serializers.ModelSerializer):
         # Explicitly included timestamp to match model update
         fields = ['id', 'vessel', 'vessel_name', 'event_type', 'location', 'timestamp', 'details']
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(FieldProjectionMixin, serializers.ModelSerializer):
+    # Targets for a new notification; none at all sends it to every active user
+    roles = serializers.ListField(
+        child=serializers.ChoiceField(choices=[role for role, _ in User.ROLE_CHOICES]), required=False, write_only=True,
+    )
+    regions = serializers.ListField(child=serializers.CharField(max_length=50), required=False, write_only=True)
+    users = serializers.ListField(child=serializers.IntegerField(), required=False, write_only=True)
+
     class Meta:
         model = Notification
-        fields = ['id', 'message', 'created_at', 'is_read']
\ No newline at end of file
+        fields = ['id', 'message', 'created_at', 'audience', 'recipients', 'roles', 'regions', 'users']
+        read_only_fields = ['audience', 'recipients']
+
+    def create(self, validated_data):
+        return notify(
+            validated_data['message'], validated_data.get('roles'), validated_data.get('regions'), validated_data.get('users'),
+        )
+
+# --- A user's inbox entry: the notification plus that user's read state ---
+class NotificationDeliverySerializer(FieldProjectionMixin, serializers.ModelSerializer):
+    id = serializers.ReadOnlyField(source='notification_id')
+    message = serializers.ReadOnlyField(source='notification.message')
+    is_read = serializers.SerializerMethodField()
+
+    class Meta:
+        model = NotificationDelivery
+        fields = ['id', 'message', 'created_at', 'is_read', 'read_at']
+
+    def get_is_read(self, delivery):
+        return delivery.read_at is not None
+
+# --- Background Job Status ---
+class JobSerializer(FieldProjectionMixin, serializers.ModelSerializer):
+    created_by = serializers.ReadOnlyField(source='created_by.username')
+
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'task', 'queue', 'status', 'priority', 'payload', 'attempts', 'max_attempts',
+            'run_at', 'created_by', 'created_at', 'started_at', 'finished_at', 'result', 'error',
+        ]
+        read_only_fields = [
+            'queue', 'status', 'attempts', 'max_attempts', 'started_at', 'finished_at', 'result', 'error',
+        ]
@@ -0,0 +1,188 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import analytics, authentication, clusters, collision, geofence, jobs, middleware, notifications, search, tracking
+from .caching import bump_versions
+from .ingestion import positions_ingested
+from .models import User, Vessel, Port, Voyage, Event, Notification
+from .realtime import publish_positions, publish_record
+from .serializers import EventSerializer
+from .sync import record_tombstone
+
+
+# --- Delta Sync: remember deletions so polling clients can drop them ---
+@receiver(post_delete, sender=Vessel)
+@receiver(post_delete, sender=Port)
+@receiver(post_delete, sender=Voyage)
+@receiver(post_delete, sender=Event)
+@receiver(post_delete, sender=Notification)
+def track_sync_deletion(sender, instance, **kwargs):
+    record_tombstone(sender, instance.pk)
+
+
+# --- Real-time Push: forward committed writes to open streams ---
+@receiver(positions_ingested)
+def push_ingested_positions(sender, vessels, **kwargs):
+    transaction.on_commit(lambda: publish_positions(vessels))
+
+
+@receiver(post_save, sender=Vessel)
+def push_vessel_position(sender, instance, **kwargs):
+    transaction.on_commit(lambda: publish_positions([instance]))
+
+
+@receiver(post_save, sender=Event)
+def push_event(sender, instance, **kwargs):
+    transaction.on_commit(lambda: publish_record('event', EventSerializer(instance).data))
+
+
+@receiver(post_save, sender=Notification)
+def deliver_notification(sender, instance, created, **kwargs):
+    # Fan-out to the audience; the recipients' streams are pushed once it commits
+    if created:
+        notifications.deliver(instance)
+
+
+# --- Geofencing: re-check moved vessels off the request path, rebuild zones when they change ---
+@receiver(positions_ingested)
+def evaluate_ingested_geofences(sender, vessels, **kwargs):
+    if settings.GEOFENCE_ON_INGEST:
+        jobs.enqueue('geofence.evaluate', {'vessel_ids': [vessel.id for vessel in vessels]})
+
+
+@receiver(post_save, sender=Vessel)
+def evaluate_vessel_geofences(sender, instance, **kwargs):
+    if settings.GEOFENCE_ON_INGEST:
+        # Same transaction as the save: the job exists only if the new position does
+        jobs.enqueue('geofence.evaluate', {'vessel_ids': [instance.id]})
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+@receiver(post_save, sender=Port)
+@receiver(post_delete, sender=Port)
+def refresh_geofence_zones(sender, instance, **kwargs):
+    geofence.invalidate_zones()
+    if settings.GEOFENCE_ON_INGEST and (sender is Port or instance.event_type in geofence.RISK_ZONE_EVENT_TYPES):
+        geofence.reevaluate_all()
+
+
+# --- Voyage Tracking: fold ingested fixes into departures, arrivals and ETAs off the request path ---
+@receiver(positions_ingested)
+def track_ingested_voyages(sender, history, **kwargs):
+    if settings.VOYAGE_TRACKING:
+        jobs.enqueue('voyages.track', {'history_ids': [row.id for row in history if row.id is not None]})
+
+
+@receiver(post_save, sender=Port)
+@receiver(post_delete, sender=Port)
+def refresh_tracking_ports(sender, **kwargs):
+    tracking.invalidate_ports()
+
+
+# --- Collision Screening: a fleet-wide CPA / TCPA pass at most every COLLISION_INTERVAL_SECONDS ---
+@receiver(positions_ingested)
+def screen_ingested_collisions(sender, **kwargs):
+    if settings.COLLISION_SCREENING:
+        collision.schedule()
+
+
+# --- Map Clusters: move each vessel's count between tiles in the write's own transaction ---
+@receiver(pre_save, sender=Vessel)
+def load_vessel_cluster_state(sender, instance, **kwargs):
+    # Instances not loaded from the database (built with a pk) learn their stored state here
+    if instance.pk is not None and not hasattr(instance, '_cluster_state'):
+        instance._cluster_state = Vessel.objects.filter(pk=instance.pk).values_list(*Vessel.CLUSTER_FIELDS).first()
+
+
+@receiver(post_save, sender=Vessel)
+def cluster_vessel(sender, instance, created, **kwargs):
+    state = instance.cluster_state()
+    clusters.record_change(None if created else getattr(instance, '_cluster_state', None), state)
+    instance._cluster_state = state
+
+
+@receiver(post_delete, sender=Vessel)
+def uncluster_vessel(sender, instance, **kwargs):
+    clusters.record_change(getattr(instance, '_cluster_state', instance.cluster_state()), None)
+
+
+@receiver(positions_ingested)
+def cluster_ingested_vessels(sender, vessels, **kwargs):
+    # The moved vessels were loaded by ingestion, so each still knows the state it was counted in
+    clusters.record_changes([(vessel._cluster_state, vessel.cluster_state()) for vessel in vessels])
+    for vessel in vessels:
+        vessel._cluster_state = vessel.cluster_state()
+
+
+# --- API Response Cache: any write to a cached model retires its cached responses ---
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Vessel)
+@receiver(post_delete, sender=Vessel)
+@receiver(post_save, sender=Port)
+@receiver(post_delete, sender=Port)
+def invalidate_cached_responses(sender, **kwargs):
+    transaction.on_commit(lambda: bump_versions(sender))
+
+
+@receiver(positions_ingested)
+def invalidate_ingested_vessels(sender, **kwargs):
+    # Ingestion writes with bulk_update, which sends no post_save
+    transaction.on_commit(lambda: bump_versions(Vessel))
+
+
+# --- Vessel Search: rebuild the in-process name index only when a name changes ---
+@receiver(post_save, sender=Vessel)
+def refresh_search_names(sender, instance, created, **kwargs):
+    if created or getattr(instance, '_loaded_name', None) != instance.name:
+        instance._loaded_name = instance.name
+        transaction.on_commit(search.names_changed)
+
+
+@receiver(post_delete, sender=Vessel)
+def forget_search_name(sender, **kwargs):
+    transaction.on_commit(search.names_changed)
+
+
+# --- Analytics Rollups: apply each voyage's change to the pre-aggregated tables, same transaction ---
+@receiver(pre_save, sender=Voyage)
+def load_voyage_rollup_state(sender, instance, **kwargs):
+    # Instances not loaded from the database (built with a pk) learn their stored state here
+    if instance.pk is not None and not hasattr(instance, '_rollup_state'):
+        instance._rollup_state = Voyage.objects.filter(pk=instance.pk).values_list(*Voyage.ROLLUP_FIELDS).first()
+
+
+@receiver(post_save, sender=Voyage)
+def roll_up_voyage(sender, instance, created, **kwargs):
+    state = instance.rollup_state()
+    analytics.record_change(None if created else getattr(instance, '_rollup_state', None), state)
+    instance._rollup_state = state
+
+
+@receiver(post_delete, sender=Voyage)
+def roll_back_voyage(sender, instance, **kwargs):
+    analytics.record_change(getattr(instance, '_rollup_state', instance.rollup_state()), None)
+
+
+# --- Token revocation: sessions end once what their tokens claim stops being true ---
+@receiver(post_save, sender=User)
+def revoke_changed_user_tokens(sender, instance, created, **kwargs):
+    state = getattr(instance, '_token_state', None)
+    if not created and state is not None and state != instance.token_state():
+        authentication.revoke([instance.pk])
+    instance._token_state = instance.token_state()
+
+
+@receiver(post_delete, sender=User)
+def revoke_deleted_user_tokens(sender, instance, **kwargs):
+    authentication.revoke([instance.pk])
+
+
+# --- Request Metrics: time every statement, including those the async ORM runs on its executor thread ---
+@receiver(connection_created)
+def time_connection_queries(sender, connection, **kwargs):
+    middleware.time_queries(connection)
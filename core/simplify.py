@@ -0,0 +1,91 @@
+import math
+
+import numpy as np
+
+# --- Track Simplification (Douglas-Peucker) ---
+# Coordinates are projected to a local equirectangular plane (x scaled by cos(mean lat)) so
+# the tolerance is in degrees of latitude everywhere on the track. Each split step measures
+# every point of a segment against its chord in one vectorized pass.
+
+
+# Zoom levels web maps actually render; anything outside is clamped
+MIN_ZOOM, MAX_ZOOM = 0.0, 24.0
+
+
+def zoom_tolerance(zoom, pixels=1.0):
+    """Degrees covered by ``pixels`` screen pixels at a Web-Mercator zoom level (256px tiles)."""
+    zoom = min(max(zoom, MIN_ZOOM), MAX_ZOOM)
+    return pixels * 360.0 / (256.0 * 2 ** zoom)
+
+
+# Segments with more interior points than this are split one at a time (one vectorized
+# pass each); the many small leftovers are then split together, level by level.
+BATCH_SEGMENT_POINTS = 512
+
+
+def _chord_distances(dx, dy, px, py):
+    chord = np.hypot(dx, dy)
+    # Closed loops / stationary segments fall back to distance from the anchor point
+    return np.where(chord > 0, np.abs(dx * py - dy * px) / np.where(chord > 0, chord, 1.0), np.hypot(px, py))
+
+
+def _split_batched(x, y, starts, ends, tolerance, keep):
+    while len(starts):
+        interior = ends - starts - 1
+        open_segments = interior > 0
+        starts, ends, interior = starts[open_segments], ends[open_segments], interior[open_segments]
+        if not len(starts):
+            return
+
+        segment = np.repeat(np.arange(len(starts)), interior)
+        first = np.concatenate(([0], np.cumsum(interior)[:-1]))
+        index = np.arange(len(segment)) - first[segment] + starts[segment] + 1
+
+        x0, y0 = x[starts][segment], y[starts][segment]
+        distances = _chord_distances(
+            x[ends][segment] - x0, y[ends][segment] - y0, x[index] - x0, y[index] - y0
+        )
+        worst = np.maximum.reduceat(distances, first)
+        split_segments = worst > tolerance
+        if not split_segments.any():
+            return
+        # First point reaching each segment's maximum becomes the split point
+        candidates = np.where(distances == worst[segment], np.arange(len(segment)), len(segment))
+        split_at = index[np.minimum.reduceat(candidates, first)][split_segments]
+
+        keep[split_at] = True
+        starts = np.concatenate((starts[split_segments], split_at))
+        ends = np.concatenate((split_at, ends[split_segments]))
+
+
+def douglas_peucker(lat, lon, tolerance):
+    """Returns the sorted indices of the points kept from the ``lat``/``lon`` arrays."""
+    count = len(lat)
+    if count <= 2 or tolerance <= 0:
+        return np.arange(count)
+
+    y = np.asarray(lat, dtype=np.float64)
+    x = np.asarray(lon, dtype=np.float64) * math.cos(math.radians(float(np.mean(y))))
+
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack, small_starts, small_ends = [(0, count - 1)], [], []
+    while stack:
+        start, end = stack.pop()
+        if end - start - 1 <= BATCH_SEGMENT_POINTS:
+            small_starts.append(start)
+            small_ends.append(end)
+            continue
+        dx, dy = x[end] - x[start], y[end] - y[start]
+        px, py = x[start + 1:end] - x[start], y[start + 1:end] - y[start]
+        chord = math.hypot(dx, dy)
+        distances = np.abs(dx * py - dy * px) / chord if chord > 0 else np.hypot(px, py)
+        worst = int(np.argmax(distances))
+        if distances[worst] > tolerance:
+            split = start + 1 + worst
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    _split_batched(x, y, np.array(small_starts, dtype=np.int64), np.array(small_ends, dtype=np.int64), tolerance, keep)
+    return np.flatnonzero(keep)
@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Vessel, Port, VesselHistory, Voyage, Event, Notification, NotificationDelivery, SyncTombstone
+from .serializers import (
+    VesselSerializer, PortSerializer, VesselHistorySerializer,
+    VoyageSerializer, EventSerializer, NotificationDeliverySerializer,
+)
+
+# --- Delta Sync (replaces the dashboard's five full-table polls) ---
+# The cursor encodes the server time of the previous poll plus the highest VesselHistory id
+# the client has seen. Mutable tables are diffed on their indexed ``updated_at`` column,
+# VesselHistory (append-only) on its primary key, and deletions come from SyncTombstone.
+SYNCED_MODELS = {
+    'vessels': (Vessel, VesselSerializer),
+    'ports': (Port, PortSerializer),
+    'voyages': (Voyage, VoyageSerializer),
+    'events': (Event, EventSerializer),
+    # The caller's own inbox, read state included
+    'notifications': (NotificationDelivery, NotificationDeliverySerializer),
+}
+TOMBSTONE_NAMES = {model: name for name, (model, _) in SYNCED_MODELS.items()}
+# A deleted notification disappears from every inbox; its id is the one clients know
+TOMBSTONE_NAMES[Notification] = 'notifications'
+
+# Re-send rows touched just before the previous cursor to cover transactions that committed late
+OVERLAP = timedelta(seconds=getattr(settings, 'SYNC_OVERLAP_SECONDS', 2))
+TOMBSTONE_TTL = timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_TTL_DAYS', 7))
+# A full snapshot only carries the recent trail, not the whole history table
+SNAPSHOT_HISTORY_WINDOW = timedelta(hours=getattr(settings, 'SYNC_HISTORY_WINDOW_HOURS', 24))
+HISTORY_LIMIT = getattr(settings, 'SYNC_HISTORY_LIMIT', 5000)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(moment, history_id):
+    return f'{int(moment.timestamp() * 1_000_000)}-{history_id}'
+
+
+def decode_cursor(cursor):
+    try:
+        micros, history_id = (int(part) for part in cursor.split('-'))
+        # Out-of-range times overflow (or hit the platform's time_t limits) rather than raising ValueError
+        return datetime.fromtimestamp(micros / 1_000_000, tz=dt_timezone.utc), history_id
+    except (ValueError, OverflowError, OSError):
+        raise InvalidCursor('Malformed sync cursor')
+
+
+def _base_queryset(name, model, user):
+    queryset = model.objects.all()
+    if name == 'vessels' and not _is_admin(user):
+        queryset = queryset.filter(status='Active')
+    if name == 'voyages':
+        queryset = queryset.select_related('vessel', 'port_from', 'port_to')
+    elif name == 'events':
+        queryset = queryset.select_related('vessel')
+    elif name == 'notifications':
+        queryset = queryset.filter(user_id=user.id).select_related('notification')
+    return queryset
+
+
+def _is_admin(user):
+    return getattr(user, 'role', '').lower() == 'admin'
+
+
+def build_sync_payload(user, cursor=None, context=None):
+    now = timezone.now()
+    since, last_history_id = decode_cursor(cursor) if cursor else (None, 0)
+    # Clients that fell behind the tombstone horizon cannot be diffed reliably
+    full = since is None or since < now - TOMBSTONE_TTL
+
+    changes, deleted = {}, {}
+    for name, (model, serializer_class) in SYNCED_MODELS.items():
+        queryset = _base_queryset(name, model, user)
+        if not full:
+            queryset = queryset.filter(updated_at__gt=since - OVERLAP)
+        changes[name] = serializer_class(queryset, many=True, context=context).data
+        deleted[name] = []
+
+    history = VesselHistory.objects.select_related('vessel')
+    if full:
+        rows = list(history.filter(timestamp__gte=now - SNAPSHOT_HISTORY_WINDOW).order_by('-id')[:HISTORY_LIMIT])[::-1]
+        latest_history_id = VesselHistory.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        has_more = False
+    else:
+        # A client that was offline for a while catches up over several polls
+        rows = list(history.filter(id__gt=last_history_id).order_by('id')[:HISTORY_LIMIT + 1])
+        has_more = len(rows) > HISTORY_LIMIT
+        rows = rows[:HISTORY_LIMIT]
+        latest_history_id = rows[-1].id if rows else last_history_id
+    changes['history'] = VesselHistorySerializer(rows, many=True, context=context).data
+
+    if not full:
+        for tombstone in SyncTombstone.objects.filter(deleted_at__gt=since - OVERLAP).values('model', 'object_id'):
+            deleted.setdefault(tombstone['model'], []).append(tombstone['object_id'])
+        if not _is_admin(user):
+            # Operators only see active vessels: a vessel leaving 'Active' disappears from their map
+            deleted['vessels'] += list(
+                Vessel.objects.filter(updated_at__gt=since - OVERLAP).exclude(status='Active')
+                .values_list('id', flat=True)
+            )
+
+    return {
+        'cursor': encode_cursor(now, latest_history_id),
+        'full': full,
+        'has_more': has_more,
+        'changes': changes,
+        'deleted': deleted,
+    }
+
+
+def record_tombstone(model, object_id):
+    SyncTombstone.objects.create(model=TOMBSTONE_NAMES[model], object_id=object_id)
+    # Prune expired markers at most once an hour per process/cache
+    if cache.add('sync:tombstone-prune', True, 3600):
+        SyncTombstone.objects.filter(deleted_at__lt=timezone.now() - TOMBSTONE_TTL).delete()
@@ -0,0 +1,378 @@
+import csv
+import io
+import multiprocessing
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.db import connection, connections
+from django.utils import timezone
+
+from . import analytics, clusters, geofence, search
+from .caching import bump_versions
+from .geo import EARTH_RADIUS_KM, GRID_CELL_DEGREES, GRID_COLUMNS, GRID_ROWS, grid_cell
+from .models import User, Vessel, Port, VesselHistory, Voyage, Event, Notification, NotificationDelivery, normalize_name
+
+# --- Synthetic Fleet Generator (staging data, benchmarks, load tests) ---
+# Every vessel follows an itinerary between Ports: dwell at a port, sail the great circle to
+# one of its nearest neighbours at a noisy speed with cross-track drift, dwell again. Each
+# vessel draws from its own seed (seed, vessel index), so output is identical however the
+# work is split across processes. Fixes are streamed in chunks: COPY on PostgreSQL,
+# bulk_create elsewhere. Rows bypass save() and signals, so derived columns (grid_cell,
+# name_normalized) are filled here; caches, analytics rollups and map clusters are refreshed once at the end.
+CHUNK = 20000
+COPY_CHUNK = 200000
+VESSELS_PER_TASK = 500
+MMSI_BASE = 200000000
+NEIGHBOUR_PORTS = 8
+KNOTS_TO_KMH = 1.852
+MODELS = [User, Port, Vessel, VesselHistory, Voyage, Event, Notification, NotificationDelivery]
+VESSEL_TYPES = ['Cargo', 'Tanker', 'Container', 'LNG Carrier', 'Bulk Carrier', 'Ro-Ro']
+EVENT_TYPES = ['Storm', 'Piracy', 'Accident', 'Inspection', 'Engine Fault']
+REGIONS = ['North Atlantic', 'North Sea', 'Mediterranean', 'Indian Ocean', 'South China Sea', 'Pacific']
+NAME_PREFIXES = ['MV', 'MT', 'MSC', 'CMA CGM', 'Maersk', 'Ever', 'Cosco', 'ONE', 'Hapag', 'Nordic', 'Ocean', 'Pacific']
+NAME_WORDS = [
+    'Alabama', 'Aurora', 'Baltic', 'Horizon', 'Atlas', 'Triton', 'Neptune', 'Voyager', 'Meridian', 'Falcon',
+    'Harmony', 'Pioneer', 'Sirius', 'Orion', 'Vega', 'Polaris', 'Endeavour', 'Liberty', 'Zephyr', 'Coral',
+]
+# Busy sea areas (lat, lon) synthetic ports cluster around
+SEA_AREAS = [
+    (1.3, 103.8), (25.0, 55.1), (51.9, 4.1), (18.9, 72.8), (31.2, 121.5), (35.4, 139.7),
+    (22.3, 114.2), (29.9, 32.6), (36.1, -5.4), (40.7, -74.0), (33.7, -118.3), (-33.9, 18.4),
+]
+
+
+def _chunks(total, size=CHUNK):
+    for start in range(0, total, size):
+        yield start, min(start + size, total)
+
+
+def _report(progress, label, done, total):
+    if progress:
+        progress(label, done, total)
+
+
+def _unit_vectors(lat, lon):
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)), axis=-1)
+
+
+def _lat_lon(vectors):
+    lat = np.degrees(np.arcsin(np.clip(vectors[..., 2], -1.0, 1.0)))
+    return lat, np.degrees(np.arctan2(vectors[..., 1], vectors[..., 0]))
+
+
+def _grid_cells(lat, lon):
+    # Vectorized core.geo.grid_cell
+    rows = np.clip(np.floor((lat + 90.0) / GRID_CELL_DEGREES).astype(np.int64), 0, GRID_ROWS - 1)
+    cols = np.clip(np.floor((lon + 180.0) / GRID_CELL_DEGREES).astype(np.int64), 0, GRID_COLUMNS - 1)
+    return rows * GRID_COLUMNS + cols
+
+
+def _datetime(epoch):
+    return datetime.fromtimestamp(float(epoch), tz=dt_timezone.utc)
+
+
+class PortNetwork:
+    def __init__(self, ids, lat, lon):
+        self.ids = np.asarray(ids)
+        self.vectors = _unit_vectors(np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64))
+        similarity = self.vectors @ self.vectors.T
+        np.fill_diagonal(similarity, -np.inf)
+        count = max(1, min(NEIGHBOUR_PORTS, len(self.ids) - 1))
+        self.neighbours = np.argsort(-similarity, axis=1)[:, :count]
+
+
+# --- Itineraries & tracks ---
+class Itinerary:
+    """One vessel's alternating dwell / sailing segments covering [start, end] (epoch seconds)."""
+
+    def __init__(self, rng, network, start, end):
+        port = int(rng.integers(len(network.ids)))
+        moment = start - rng.uniform(0, 48 * 3600)
+        origins, targets, begins, ends, bulges = [], [], [], [], []
+
+        def segment(origin, target, duration, bulge=0.0):
+            origins.append(origin)
+            targets.append(target)
+            begins.append(moment)
+            ends.append(moment + duration)
+            bulges.append(bulge)
+            return moment + duration
+
+        while moment < end:
+            moment = segment(port, port, rng.uniform(6, 48) * 3600)
+            if moment >= end or len(network.ids) < 2:
+                continue
+            target = int(rng.choice(network.neighbours[port]))
+            distance_km = np.arccos(np.clip(network.vectors[port] @ network.vectors[target], -1.0, 1.0)) * EARTH_RADIUS_KM
+            speed_kmh = np.clip(rng.normal(14.0, 2.0), 8.0, 22.0) * KNOTS_TO_KMH
+            # Cross-track drift: a signed bulge of a few percent of the leg
+            bulge_km = rng.normal(0, 0.02) * min(distance_km, 3000.0)
+            moment = segment(port, target, max(distance_km / speed_kmh * 3600, 600.0), bulge_km)
+            port = target
+
+        self.network = network
+        self.origins, self.targets = np.array(origins), np.array(targets)
+        self.begins, self.ends = np.array(begins), np.array(ends)
+        self.bulges_km = np.array(bulges)
+        # Speed noise per segment; below 1/2pi the warped schedule stays monotonic
+        self.wobble = rng.uniform(0, 0.12, len(origins))
+
+    def sailing(self):
+        return self.origins != self.targets
+
+    def positions(self, times, jitter_km=None):
+        segment = np.clip(np.searchsorted(self.begins, times, side='right') - 1, 0, len(self.begins) - 1)
+        a = self.network.vectors[self.origins[segment]]
+        b = self.network.vectors[self.targets[segment]]
+        span = np.maximum(self.ends[segment] - self.begins[segment], 1.0)
+        fraction = np.clip((times - self.begins[segment]) / span, 0.0, 1.0)
+        fraction = fraction + self.wobble[segment] * np.sin(2 * np.pi * fraction)
+
+        # Spherical interpolation along the great circle a -> b
+        omega = np.arccos(np.clip(np.einsum('ij,ij->i', a, b), -1.0, 1.0))
+        moving = omega > 1e-9
+        sin_omega = np.where(moving, np.sin(omega), 1.0)
+        weight_a = np.where(moving, np.sin((1 - fraction) * omega) / sin_omega, 1.0)
+        weight_b = np.where(moving, np.sin(fraction * omega) / sin_omega, 0.0)
+        points = weight_a[:, None] * a + weight_b[:, None] * b
+
+        normal = np.cross(a, b)
+        length = np.linalg.norm(normal, axis=1, keepdims=True)
+        normal = np.divide(normal, length, out=np.zeros_like(normal), where=length > 1e-12)
+        points += normal * (self.bulges_km[segment] * np.sin(np.pi * fraction) / EARTH_RADIUS_KM)[:, None]
+        if jitter_km is not None:
+            points += jitter_km / EARTH_RADIUS_KM
+        points /= np.linalg.norm(points, axis=1, keepdims=True)
+        return _lat_lon(points)
+
+
+def _vessel_rng(seed, index, stream):
+    # stream 0: itinerary, 1: fix noise, 2: vessel attributes
+    return np.random.default_rng([seed, index, stream])
+
+
+def _track(seed, index, network, start, end, fixes_per_day):
+    itinerary = Itinerary(_vessel_rng(seed, index, 0), network, start, end)
+    rng = _vessel_rng(seed, index, 1)
+    step = 86400.0 / fixes_per_day
+    count = int((end - start) // step)
+    # AIS reporting jitter on top of the nominal interval, ~50 m position noise
+    times = start + step * np.arange(count) + rng.uniform(0, step * 0.2, count)
+    lat, lon = itinerary.positions(times, jitter_km=rng.normal(0, 0.05, (count, 3)))
+    return times, lat, lon
+
+
+# --- Writers ---
+def _copy(table, columns, rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    sql = f'COPY {table} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)'
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, 'copy_expert'):  # psycopg2
+            raw.copy_expert(sql, buffer)
+        else:  # psycopg 3
+            with raw.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+
+
+def _write_history(vessel_ids, times, lat, lon):
+    cells = _grid_cells(lat, lon)
+    if connection.vendor == 'postgresql':
+        stamps = np.datetime_as_string((times * 1e6).astype('datetime64[us]'), unit='us')
+        _copy(
+            VesselHistory._meta.db_table, ['vessel_id', 'latitude', 'longitude', 'timestamp', 'grid_cell'],
+            zip(vessel_ids.tolist(), lat.tolist(), lon.tolist(), (f'{stamp}+00' for stamp in stamps), cells.tolist()),
+        )
+    else:
+        VesselHistory.objects.bulk_create([
+            VesselHistory(vessel_id=v, latitude=y, longitude=x, timestamp=_datetime(t), grid_cell=c)
+            for v, y, x, t, c in zip(vessel_ids.tolist(), lat.tolist(), lon.tolist(), times.tolist(), cells.tolist())
+        ], batch_size=CHUNK)
+
+
+def _create_backdated(model, objects, field):
+    # auto_now_add fields are overwritten with "now" by bulk_create; write the intended times back
+    times = [getattr(obj, field) for obj in objects]
+    created = model.objects.bulk_create(objects)
+    for obj, moment in zip(created, times):
+        setattr(obj, field, moment)
+    model.objects.bulk_update(created, [field], batch_size=1000)
+
+
+# --- Parallel history ---
+# Set in the parent before forking; workers read it instead of unpickling it per task
+_job = None
+
+
+def _history_task(bounds):
+    first, last = bounds
+    seed, network, vessel_ids, start, end, fixes_per_day = _job
+    parts, pending, rows = [], 0, 0
+    for index in range(first, last):
+        times, lat, lon = _track(seed, index, network, start, end, fixes_per_day)
+        parts.append((np.full(len(times), vessel_ids[index]), times, lat, lon))
+        pending += len(times)
+        if pending >= COPY_CHUNK or index == last - 1:
+            _write_history(*(np.concatenate(column) for column in zip(*parts)))
+            rows += pending
+            parts, pending = [], 0
+    return rows
+
+
+def max_workers(requested):
+    # SQLite serialises writers (and an in-memory test DB is private to one process)
+    if connection.vendor == 'sqlite' or 'fork' not in multiprocessing.get_all_start_methods():
+        return 1
+    return max(1, requested)
+
+
+def _generate_history(seed, network, vessel_ids, start, end, fixes_per_day, workers, progress):
+    global _job
+    _job = (seed, network, vessel_ids, start, end, fixes_per_day)
+    tasks = list(_chunks(len(vessel_ids), VESSELS_PER_TASK))
+    total = len(vessel_ids) * int((end - start) // (86400.0 / fixes_per_day))
+    rows = 0
+    try:
+        if workers > 1:
+            # Forked children must not share the parent's connection
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(workers, initializer=connections.close_all) as pool:
+                for written in pool.imap_unordered(_history_task, tasks):
+                    rows += written
+                    _report(progress, 'history', rows, total)
+        else:
+            for task in tasks:
+                rows += _history_task(task)
+                _report(progress, 'history', rows, total)
+    finally:
+        _job = None
+    return rows
+
+
+def generate(vessels=1000, ports=50, history_days=30, fixes_per_day=24, events=None, notifications=None,
+             users=10, seed=42, end=None, workers=1, progress=None):
+    """Writes a synthetic fleet and returns the row counts created per model.
+
+    ``ports`` is a number of synthetic ports or a list of ``(name, lat, lon)``. Raises ValueError,
+    before writing anything, if the fleet's MMSIs or usernames are already taken.
+    """
+    rng = np.random.default_rng(seed)
+    end = (end or timezone.now()).timestamp()
+    start = end - history_days * 86400
+    events = vessels // 10 if events is None else events
+    notifications = vessels // 10 if notifications is None else notifications
+
+    if isinstance(ports, int):
+        centres = np.array(SEA_AREAS)[rng.integers(0, len(SEA_AREAS), ports)] + rng.normal(0, 6.0, (ports, 2))
+        ports = [
+            (f'Port {i:04d}', float(np.clip(lat, -75.0, 75.0)), float((lon + 180.0) % 360.0 - 180.0))
+            for i, (lat, lon) in enumerate(centres)
+        ]
+    mmsi_start = MMSI_BASE + int(rng.integers(0, 10000)) * 10000
+    usernames = [f'synthetic_{seed}_{i}' for i in range(users)]
+
+    # Usernames and MMSIs are unique: check before the first write rather than fail halfway
+    if Vessel.objects.filter(mmsi__gte=mmsi_start, mmsi__lt=mmsi_start + vessels).exists():
+        raise ValueError(f'MMSIs {mmsi_start}-{mmsi_start + vessels - 1} are taken (a fleet with this seed exists?)')
+    if users and User.objects.filter(username__in=usernames).exists():
+        raise ValueError(f'users synthetic_{seed}_* exist already')
+
+    password = make_password(None)
+    recipients = User.objects.bulk_create([
+        User(username=username, role=('operator', 'analyst')[i % 2], region=REGIONS[i % len(REGIONS)], password=password)
+        for i, username in enumerate(usernames)
+    ], batch_size=CHUNK)
+
+    created = Port.objects.bulk_create([Port(name=name, location=f'{lat:.4f},{lon:.4f}') for name, lat, lon in ports])
+    network = PortNetwork([port.id for port in created], [port[1] for port in ports], [port[2] for port in ports])
+    _report(progress, 'ports', len(ports), len(ports))
+
+    # Each vessel starts where its itinerary is at ``end``; its voyages are the itinerary's legs
+    voyage_count = 0
+    for first, last in _chunks(vessels):
+        batch, plans = [], []
+        for index in range(first, last):
+            itinerary = Itinerary(_vessel_rng(seed, index, 0), network, start, end)
+            attributes = _vessel_rng(seed, index, 2)
+            lat, lon = itinerary.positions(np.array([end]))
+            name = f'{NAME_PREFIXES[index % len(NAME_PREFIXES)]} {NAME_WORDS[attributes.integers(len(NAME_WORDS))]} {index}'
+            batch.append(Vessel(
+                name=name, name_normalized=normalize_name(name), mmsi=mmsi_start + index,
+                vessel_type=VESSEL_TYPES[attributes.integers(len(VESSEL_TYPES))],
+                status='Inactive' if attributes.random() < 0.1 else 'Active',
+                last_position_lat=float(lat[0]), last_position_lon=float(lon[0]), grid_cell=grid_cell(lat[0], lon[0]),
+            ))
+            plans.append((itinerary, attributes))
+        Vessel.objects.bulk_create(batch)
+
+        voyages = []
+        for vessel, (itinerary, attributes) in zip(batch, plans):
+            for leg in np.flatnonzero(itinerary.sailing() & (itinerary.ends > start)):
+                arrived = itinerary.ends[leg] <= end
+                voyages.append(Voyage(
+                    vessel_id=vessel.id,
+                    port_from_id=int(network.ids[itinerary.origins[leg]]),
+                    port_to_id=int(network.ids[itinerary.targets[leg]]),
+                    departure_time=_datetime(itinerary.begins[leg]),
+                    arrival_time=_datetime(itinerary.ends[leg]) if arrived else None,
+                    status='Completed' if arrived else ('Delayed' if attributes.random() < 0.2 else 'On Schedule'),
+                ))
+        if voyages:
+            Voyage.objects.bulk_create(voyages, batch_size=CHUNK)
+        voyage_count += len(voyages)
+        _report(progress, 'vessels', last, vessels)
+
+    vessel_ids = np.array(
+        Vessel.objects.filter(mmsi__gte=mmsi_start, mmsi__lt=mmsi_start + vessels)
+        .order_by('mmsi').values_list('id', flat=True)
+    )
+    history = 0
+    if history_days and fixes_per_day and vessels:
+        history = _generate_history(seed, network, vessel_ids, start, end, fixes_per_day, max_workers(workers), progress)
+
+    for first, last in _chunks(events if vessels else 0):
+        batch = []
+        for _ in range(first, last):
+            lat, lon = _lat_lon(network.vectors[rng.integers(len(network.ids))] + rng.normal(0, 0.02, 3))
+            batch.append(Event(
+                vessel_id=int(rng.choice(vessel_ids)), event_type=EVENT_TYPES[rng.integers(len(EVENT_TYPES))],
+                location=f'{lat:.4f},{lon:.4f}', details='Synthetic event', timestamp=_datetime(rng.uniform(start, end)),
+            ))
+        _create_backdated(Event, batch, 'timestamp')
+        _report(progress, 'events', last, events)
+
+    # Alerts go to one role each, delivered to the synthetic users holding it; about half already read
+    by_role = {role: [user for user in recipients if user.role == role] for role in ('operator', 'analyst')}
+    deliveries = 0
+    for first, last in _chunks(notifications):
+        roles = [('operator', 'analyst')[rng.integers(2)] for _ in range(first, last)]
+        batch = [
+            Notification(message=f'Synthetic alert {i}', audience={'roles': [role]}, recipients=len(by_role[role]),
+                         created_at=_datetime(rng.uniform(start, end)))
+            for i, role in zip(range(first, last), roles)
+        ]
+        _create_backdated(Notification, batch, 'created_at')
+        rows = [
+            NotificationDelivery(notification=notification, user=user, created_at=notification.created_at,
+                                 read_at=notification.created_at if rng.random() < 0.5 else None)
+            for notification, role in zip(batch, roles)
+            for user in by_role[role]
+        ]
+        NotificationDelivery.objects.bulk_create(rows, batch_size=CHUNK)
+        deliveries += len(rows)
+        _report(progress, 'notifications', last, notifications)
+
+    bump_versions(User, Vessel, Port)
+    search.names_changed()
+    geofence.invalidate_zones()
+    analytics.rebuild()
+    clusters.rebuild()
+    return {
+        'users': users, 'ports': len(ports), 'vessels': vessels, 'history': history,
+        'voyages': voyage_count, 'events': events if vessels else 0, 'notifications': notifications,
+        'deliveries': deliveries,
+    }
@@ -0,0 +1,60 @@
+from . import analytics, clusters, collision, geofence, tracking
+from .jobs import task
+from .retention import apply_retention, archive_path
+
+# --- Background Task Catalogue (enqueue by name: jobs.enqueue('geofence.evaluate', {...})) ---
+
+
+def _merge_geofence(waiting, new):
+    # None means every vessel, which covers any list
+    ids = [waiting.get('vessel_ids'), new.get('vessel_ids')]
+    return {
+        'vessel_ids': None if None in ids else sorted({*ids[0], *ids[1]}),
+        'refresh_zones': waiting.get('refresh_zones', False) or new.get('refresh_zones', False),
+    }
+
+
+# Occupancy diffing is read-modify-write, so passes never overlap. Every save and ingested
+# batch asks for one, so requests made while one waits are folded into it.
+@task('geofence.evaluate', exclusive=True, coalesce=_merge_geofence)
+def evaluate_geofences(vessel_ids=None, refresh_zones=False):
+    # The worker's zone cache does not see the web process invalidating its own
+    if refresh_zones:
+        geofence.invalidate_zones()
+    return geofence.evaluate(vessel_ids)
+
+
+# Each vessel's track is read-modify-write and fixes must be applied in order: a batch whose
+# job is backing off before a retry holds back the later ones, whose fixes it precedes
+@task('voyages.track', exclusive=True, ordered=True)
+def track_voyages(history_ids):
+    return tracking.track(history_ids)
+
+
+# Open encounters are diffed read-modify-write, like geofence occupancy
+@task('collisions.screen', exclusive=True)
+def screen_collisions():
+    return collision.screen()
+
+
+@task('history.prune', exclusive=True, max_attempts=1, timeout=6 * 3600)
+def prune_history(retention_days=None, interval_minutes=None, turn_degrees=None, archive_dir=None):
+    # The payload may come from the jobs API: only write below HISTORY_ARCHIVE_DIR
+    days = list(apply_retention(retention_days, interval_minutes, turn_degrees, archive_path(archive_dir)))
+    return {
+        'days': [str(day['day']) for day in days],
+        'raw_rows': sum(day['raw_rows'] for day in days),
+        'kept_rows': sum(day['kept_rows'] for day in days),
+    }
+
+
+# Recomputes from Voyage after writes that bypass model signals (bulk loads, queryset.update())
+@task('analytics.rebuild', exclusive=True, max_attempts=1, timeout=3600)
+def rebuild_analytics():
+    return analytics.rebuild()
+
+
+# Recounts from Vessel after writes that bypass model signals, or a CLUSTER_MAX_ZOOM change
+@task('clusters.rebuild', exclusive=True, max_attempts=1, timeout=3600)
+def rebuild_clusters():
+    return clusters.rebuild()
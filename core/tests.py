@@ -1,3 +1,1406 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import os
+import tempfile
+import zlib
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import iscoroutinefunction
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import CommandError, call_command
+from django.db import connection, router
+from django.db.models import Q
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import (
+    analytics, asyncviews, caching, clusters, collision, export, geofence, jobs, metrics, notifications, replicas,
+    tracking, views,
+)
+from .ais import decode_nmea, read_nmea
+from .authentication import RoleTokenAuthentication, RoleTokenUser, revocations
+from .benchmarking import percentiles
+from .columnar import MEDIA_TYPE, decode
+from .geo import cells_for_bbox, radius_bbox, split_bbox
+from .ingestion import ingest_fixes
+from .middleware import ReplicaRoutingMiddleware
+from .models import (
+    ClusterCell, CloseEncounter, Event, HistoryArchive, Job, Notification, Port, PortTraffic, RouteStats, User, Vessel,
+    VesselHistory, VesselTrackState, Voyage, VoyageStatusCount, ZoneOccupancy,
+)
+from .realtime import InMemoryBroker
+from .retention import apply_retention
+from .simplify import MAX_ZOOM, douglas_peucker, zoom_tolerance
+from .sync import decode_cursor, encode_cursor
+
+# --- Real-time Push: in-memory broker (no Redis / ASGI server needed) ---
+class InMemoryBrokerTests(SimpleTestCase):
+    def position(self, vessel_id, lat, lon, status='Active'):
+        return {'id': vessel_id, 'lat': lat, 'lon': lon, 'status': status, 'in_view': True}
+
+    def test_bursts_coalesce_to_latest_position_per_vessel(self):
+        broker = InMemoryBroker()
+        subscription = broker.subscribe()
+        for step in range(5):
+            broker.publish('position', 1, self.position(1, 10.0 + step, 60.0))
+        broker.publish('position', 2, self.position(2, 11.0, 61.0))
+
+        messages = dict((payload['id'], payload) for _, payload in subscription.drain())
+        self.assertEqual(len(messages), 2)
+        self.assertEqual(messages[1]['lat'], 14.0)
+        self.assertEqual(subscription.drain(), [])
+
+    def test_viewport_filters_positions_and_reports_exits(self):
+        broker = InMemoryBroker()
+        subscription = broker.subscribe(bbox=(55.0, 5.0, 65.0, 15.0))
+        broker.publish('position', 1, self.position(1, 40.0, -70.0))
+        self.assertEqual(subscription.drain(), [])
+
+        broker.publish('position', 1, self.position(1, 10.0, 60.0))
+        self.assertTrue(subscription.drain()[0][1]['in_view'])
+
+        broker.publish('position', 1, self.position(1, 40.0, -70.0))
+        self.assertEqual(subscription.drain(), [('position', {'id': 1, 'in_view': False})])
+
+    def test_operators_only_receive_active_vessels_and_all_events(self):
+        broker = InMemoryBroker()
+        subscription = broker.subscribe(active_only=True)
+        broker.publish('position', 1, self.position(1, 10.0, 60.0, status='Inactive'))
+        broker.publish('event', 7, {'id': 7, 'event_type': 'Storm'})
+        self.assertEqual(subscription.drain(), [('event', {'id': 7, 'event_type': 'Storm'})])
+
+    def test_unsubscribed_streams_stop_receiving(self):
+        broker = InMemoryBroker()
+        subscription = broker.subscribe()
+        broker.unsubscribe(subscription)
+        broker.publish('notification', 1, {'id': 1})
+        self.assertEqual(subscription.drain(), [])
+
+
+# --- Query Budget: list endpoints must not go O(n) in queries ---
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class ListQueryCountTests(TestCase):
+    ENDPOINTS = [
+        '/api/vessels/', '/api/ports/', '/api/history/', '/api/voyages/',
+        '/api/events/', '/api/notifications/', '/api/users/', '/api/sync/',
+    ]
+    TABLE_SIZES = [1, 10, 40]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin_qc', role='admin')
+        cls.operator = User.objects.create(username='operator_qc', role='operator')
+
+    def setUp(self):
+        self.created = 0
+
+    def grow_tables(self, size):
+        # Tops every table up to ``size`` rows, each row with distinct related objects.
+        # On-commit hooks run so cached responses are invalidated as in production.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_rows(size)
+        self.created = size
+
+    def create_rows(self, size):
+        for i in range(self.created, size):
+            vessel = Vessel.objects.create(
+                name=f'Vessel {i}', mmsi=100000000 + i, vessel_type='Cargo',
+                last_position_lat=10.0 + i * 0.01, last_position_lon=60.0,
+            )
+            port_from = Port.objects.create(name=f'From {i}', location='18.94,72.84')
+            port_to = Port.objects.create(name=f'To {i}', location='1.26,103.83')
+            VesselHistory.objects.create(vessel=vessel, latitude=10.0, longitude=60.0)
+            Voyage.objects.create(vessel=vessel, port_from=port_from, port_to=port_to)
+            Event.objects.create(vessel=vessel, event_type='Storm', location='15.0,68.0', details='Test')
+            Notification.objects.create(message=f'Alert {i}')
+            User.objects.create(username=f'user_qc_{i}')
+
+    def count_queries(self, client, url):
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(captured)
+
+    def assert_constant_queries(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        counts = {url: [] for url in self.ENDPOINTS}
+        for size in self.TABLE_SIZES:
+            self.grow_tables(size)
+            for url in self.ENDPOINTS:
+                counts[url].append(self.count_queries(client, url))
+        for url, per_size in counts.items():
+            self.assertEqual(len(set(per_size)), 1, f'{url} queries grow with table size: {per_size}')
+
+    def test_admin_list_endpoints_run_in_constant_queries(self):
+        self.assert_constant_queries(self.admin)
+
+    def test_operator_list_endpoints_run_in_constant_queries(self):
+        self.assert_constant_queries(self.operator)
+
+
+# --- API Response Cache: ETag revalidation and write invalidation ---
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class ResponseCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin_rc', role='admin')
+        cls.operator = User.objects.create(username='operator_rc', role='operator')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.port = Port.objects.create(name='Mumbai', location='18.94,72.84')
+
+    def test_unchanged_poll_is_not_modified_without_queries(self):
+        first = self.client.get('/api/ports/')
+        self.assertEqual(first.status_code, 200)
+        with CaptureQueriesContext(connection) as captured:
+            second = self.client.get('/api/ports/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(len(captured), 0)
+
+    def test_save_invalidates_cached_list(self):
+        etag = self.client.get('/api/ports/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.port.name = 'Nhava Sheva'
+            self.port.save()
+        response = self.client.get('/api/ports/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['name'], 'Nhava Sheva')
+
+    def test_vessel_list_is_cached_per_role(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Vessel.objects.create(
+                name='Docked', mmsi=200000001, vessel_type='Cargo', status='Inactive',
+                last_position_lat=18.9, last_position_lon=72.8,
+            )
+        vessels = self.client.get('/api/vessels/').json()
+        self.assertEqual(len(vessels), 1)
+        # Index and bookkeeping columns stay out of the payload
+        self.assertEqual(set(vessels[0]), {'id', 'name', 'mmsi', 'vessel_type', 'last_position_lat', 'last_position_lon', 'status'})
+        operator = APIClient()
+        operator.force_authenticate(self.operator)
+        self.assertEqual(operator.get('/api/vessels/').json(), [])
+
+    def test_per_process_cache_keeps_entries_briefly(self):
+        # The test cache is locmem, which never sees the worker's version bumps
+        self.assertEqual(caching._entry_seconds(), min(caching.CACHE_SECONDS, caching.LOCAL_CACHE_SECONDS))
+        with mock.patch.object(caching, 'is_process_local', return_value=False):
+            self.assertEqual(caching._entry_seconds(), caching.CACHE_SECONDS)
+
+
+# --- Vessel Search: indexed MMSI ranges and ranked name matches ---
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class VesselSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin_vs', role='admin')
+        cls.operator = User.objects.create(username='operator_vs', role='operator')
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            for mmsi, name, status in [
+                (366123000, 'Maersk Alabama', 'Active'),
+                (366124000, 'Alabama', 'Active'),
+                (412000001, 'MV Alabama Star', 'Inactive'),
+                (36612, 'Coastal Relay', 'Active'),
+            ]:
+                Vessel.objects.create(
+                    name=name, mmsi=mmsi, vessel_type='Cargo', status=status,
+                    last_position_lat=10.0, last_position_lon=60.0,
+                )
+
+    def search(self, user, query, **params):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/api/vessels/search/', {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [vessel['name'] for vessel in response.json()]
+
+    def test_mmsi_prefix_matches_every_length(self):
+        self.assertEqual(self.search(self.admin, '36612'), ['Coastal Relay', 'Maersk Alabama', 'Alabama'])
+        self.assertEqual(self.search(self.admin, '366124000'), ['Alabama'])
+
+    def test_leading_zeros_only_match_the_nine_digit_form(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Vessel.objects.create(
+                name='Coast Station', mmsi=36612345, vessel_type='Base', last_position_lat=10.0, last_position_lon=60.0,
+            )
+        self.assertEqual(self.search(self.admin, '0366'), ['Coast Station'])
+        self.assertEqual(self.search(self.admin, '036612345'), ['Coast Station'])
+
+    def test_list_search_matches_prefixes_without_a_like_scan(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with CaptureQueriesContext(connection) as captured:
+            names = sorted(vessel['name'] for vessel in client.get('/api/vessels/', {'search': 'alab'}).json())
+        self.assertEqual(names, ['Alabama', 'MV Alabama Star', 'Maersk Alabama'])
+        self.assertFalse(any('LIKE' in query['sql'] for query in captured.captured_queries))
+        self.assertEqual(client.get('/api/vessels/', {'search': 'abama'}).json(), [])
+        self.assertEqual([v['name'] for v in client.get('/api/vessels/', {'search': '0366'}).json()], [])
+
+    def test_names_rank_exact_then_prefix_then_word(self):
+        self.assertEqual(self.search(self.admin, 'alab'), ['Alabama', 'Maersk Alabama', 'MV Alabama Star'])
+        self.assertEqual(self.search(self.admin, 'ALABAMA', limit=1), ['Alabama'])
+        self.assertEqual(self.search(self.admin, 'mv ala st'), ['MV Alabama Star'])
+
+    def test_operators_only_find_active_vessels(self):
+        self.assertEqual(self.search(self.operator, 'alabama'), ['Alabama', 'Maersk Alabama'])
+
+    def test_renamed_vessel_is_found_by_its_new_name(self):
+        self.search(self.admin, 'alab')
+        with self.captureOnCommitCallbacks(execute=True):
+            vessel = Vessel.objects.get(mmsi=36612)
+            vessel.name = 'Relay Alpha'
+            vessel.save()
+        self.assertEqual(self.search(self.admin, 'alp'), ['Relay Alpha'])
+
+
+# --- Request Instrumentation: Server-Timing, /metrics, slow-query log ---
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class RequestMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin_rm', role='admin')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_server_timing_splits_phases_and_counts_queries(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/history/')
+        timing = dict(
+            (entry.split(';')[0], entry) for entry in response['Server-Timing'].split(', ')
+        )
+        self.assertTrue({'db', 'serialize', 'render', 'total'} <= set(timing))
+        self.assertIn(f'desc="{len(captured)} queries"', timing['db'])
+
+    def test_metrics_exposes_per_view_counters(self):
+        self.client.get('/api/ports/')
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.client.force_login(self.admin)
+        body = self.client.get('/metrics').content.decode()
+        self.assertIn('maritime_http_requests_total{view="port-list",method="GET",status="200"}', body)
+        self.assertIn('maritime_http_phase_seconds_total{view="port-list",phase="db"}', body)
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_metrics_token_is_required_when_configured(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        operator = User.objects.create(username='operator_rm', role='operator')
+        access = RefreshToken.for_user(operator).access_token
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION=f'Bearer {access}').status_code, 401)
+        access = RefreshToken.for_user(self.admin).access_token
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION=f'Bearer {access}').status_code, 200)
+
+    def test_slow_query_is_logged_with_its_sql_but_not_its_values(self):
+        with mock.patch.object(metrics, 'SLOW_QUERY_MS', 0.0), self.assertLogs('core.performance', 'WARNING') as logs:
+            self.client.get('/api/history/')
+            self.client.get('/api/vessels/', {'search': 'zzsecret'})
+        self.assertTrue(any('Slow query' in line and 'core_vesselhistory' in line for line in logs.output))
+        self.assertFalse(any('zzsecret' in line for line in logs.output))
+
+
+# --- Columnar Map Layers: packed binary lists for /api/vessels/ and /api/history/ ---
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class ColumnarFormatTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin_cf', role='admin')
+        cls.vessels = [
+            Vessel.objects.create(
+                name=f'Layer {i}', mmsi=(200000000 + i) if i else None, vessel_type=['Cargo', 'Tanker'][i % 2],
+                status='Active', last_position_lat=1.25 + i, last_position_lon=103.5 + i,
+            )
+            for i in range(3)
+        ]
+        for minute in range(5):
+            VesselHistory.objects.create(vessel=cls.vessels[0], latitude=1.0, longitude=minute, timestamp=f'2026-01-01T00:0{minute}:00Z')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_vessel_layer_matches_json_list(self):
+        response = self.client.get('/api/vessels/', HTTP_ACCEPT=MEDIA_TYPE)
+        self.assertEqual(response['Content-Type'], MEDIA_TYPE)
+        header, columns = decode(response.content)
+        self.assertEqual(header['rows'], 3)
+        by_id = {vessel['id']: vessel for vessel in self.client.get('/api/vessels/').json()}
+        for i, vessel_id in enumerate(columns['id'].tolist()):
+            vessel = by_id[vessel_id]
+            self.assertEqual(columns['mmsi'][i], vessel['mmsi'] or 0)
+            self.assertAlmostEqual(float(columns['lat'][i]), vessel['last_position_lat'], places=4)
+            self.assertEqual(columns['type'][i], vessel['vessel_type'])
+
+    def test_history_layer_pages_with_a_cursor(self):
+        response = self.client.get('/api/history/', {'format': 'columnar', 'page_size': 2})
+        header, columns = decode(response.content)
+        self.assertEqual(columns['lon'].tolist(), [4.0, 3.0])
+        self.assertEqual(columns['timestamp'][0], 1767225840)
+        _, rest = decode(self.client.get(header['next']).content)
+        self.assertEqual(rest['lon'].tolist(), [2.0, 1.0])
+
+    def test_only_list_endpoints_offer_the_format(self):
+        response = self.client.get(f'/api/vessels/{self.vessels[0].id}/', HTTP_ACCEPT=MEDIA_TYPE)
+        self.assertEqual(response.status_code, 406)
+
+
+# --- Bulk Export: streamed CSV / NDJSON for analysts and admins ---
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.analyst = User.objects.create(username='analyst_ex', role='analyst')
+        cls.operator = User.objects.create(username='operator_ex', role='operator')
+        cls.vessel = Vessel.objects.create(
+            name='Exporter, "The"', mmsi=200000123, vessel_type='Cargo', last_position_lat=1.0, last_position_lon=2.0,
+        )
+        for hour in range(3):
+            VesselHistory.objects.create(vessel=cls.vessel, latitude=1.0 + hour, longitude=2.0, timestamp=f'2026-01-01T0{hour}:00:00Z')
+        ports = [Port.objects.create(name=name, location='0,0') for name in ('Mumbai', 'Dubai', 'Rotterdam')]
+        Voyage.objects.create(vessel=cls.vessel, port_from=ports[0], port_to=ports[1], status='Completed')
+        Voyage.objects.create(vessel=cls.vessel, port_from=ports[2], port_to=ports[1], status='Delayed')
+        cls.ports = ports
+
+    def export(self, path, user=None, **extra):
+        client = APIClient()
+        client.force_authenticate(user or self.analyst)
+        return client.get(path, **extra)
+
+    def test_history_csv_streams_every_row_in_time_order(self):
+        response = self.export('/api/export/history/', data={'from': '2026-01-01T01:00:00Z'})
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,vessel_id,mmsi,vessel_name,latitude,longitude,timestamp')
+        self.assertEqual(len(lines), 3)
+        self.assertIn('"Exporter, ""The""",2.0,2.0,2026-01-01T01:00:00+00:00', lines[1])
+
+    def test_gzip_ndjson_voyages_filtered_by_port(self):
+        response = self.export(
+            '/api/export/voyages/', data={'format': 'ndjson', 'port': self.ports[0].id}, HTTP_ACCEPT_ENCODING='gzip',
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        body = zlib.decompress(b''.join(response.streaming_content), 31)
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([(row['port_from_name'], row['status']) for row in rows], [('Mumbai', 'Completed')])
+
+    def test_operators_cannot_export(self):
+        self.assertEqual(self.export('/api/export/history/', user=self.operator).status_code, 403)
+
+    def test_bad_windows_are_rejected(self):
+        for params in ({'from': 'yesterday'}, {'to': '2026-13-45T00:00:00Z'}, {'vessel': 'a,b'}):
+            self.assertEqual(self.export('/api/export/history/', data=params).status_code, 400, params)
+
+    def test_parquet_without_pyarrow_is_not_acceptable(self):
+        with mock.patch.object(export, 'pa', None):
+            response = self.export('/api/export/voyages/', data={'format': 'parquet'})
+        self.assertEqual(response.status_code, 406)
+        self.assertIn('pyarrow', response.json()['detail'])
+
+    def test_gzip_round_trip_matches_the_plain_body(self):
+        plain = b''.join(self.export('/api/export/history/').streaming_content)
+        response = self.export('/api/export/history/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), plain)
+        self.assertEqual(len(plain.decode().splitlines()), 4)
+
+
+# --- Background Jobs: claim, retry with backoff, exclusivity, status API ---
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class JobQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin_jobs', role='admin')
+        cls.operator = User.objects.create(username='operator_jobs', role='operator')
+
+    def setUp(self):
+        self.calls = []
+        registry = dict(jobs.registry)
+        self.addCleanup(lambda: (jobs.registry.clear(), jobs.registry.update(registry)))
+        jobs.task('test.record')(lambda **payload: self.calls.append(payload) or len(self.calls))
+        jobs.task('test.flaky', max_attempts=2)(self.flaky)
+        jobs.task('test.exclusive', exclusive=True)(lambda: None)
+        jobs.task('test.coalesced', coalesce=lambda waiting, new: {'ids': waiting['ids'] + new['ids']})(lambda ids: ids)
+
+    def flaky(self):
+        raise RuntimeError('feed unavailable')
+
+    def test_job_runs_once_and_stores_its_result(self):
+        job = jobs.enqueue('test.record', {'vessel_ids': [1, 2]})
+        self.assertTrue(jobs.run_next('w1'))
+        self.assertIsNone(jobs.run_next('w2'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.attempts), (Job.SUCCEEDED, 1, 1))
+        self.assertEqual(self.calls, [{'vessel_ids': [1, 2]}])
+
+    def test_failure_retries_with_backoff_then_fails(self):
+        job = jobs.enqueue('test.flaky')
+        with self.assertLogs('core.jobs', 'WARNING'):
+            self.assertFalse(jobs.run_next('w1'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIsNone(jobs.run_next('w1'))  # not due yet
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.run_next('w1')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertIn('feed unavailable', job.error)
+
+    def test_exclusive_task_never_runs_twice_at_once(self):
+        first, second = jobs.enqueue('test.exclusive'), jobs.enqueue('test.exclusive')
+        self.assertEqual(jobs.claim('w1').pk, first.pk)
+        self.assertIsNone(jobs.claim('w2'))
+        Job.objects.filter(pk=first.pk).update(lease_expires=timezone.now() - timedelta(seconds=1), max_attempts=1)
+        self.assertEqual(jobs.recover_expired(), (0, 1))
+        self.assertEqual(jobs.claim('w2').pk, second.pk)
+
+    def test_coalesced_jobs_fold_into_the_waiting_one(self):
+        first = jobs.enqueue('test.coalesced', {'ids': [1]})
+        self.assertEqual(jobs.enqueue('test.coalesced', {'ids': [2]}).pk, first.pk)
+        self.assertEqual(jobs.claim('w1').payload, {'ids': [1, 2]})
+        # A running job is left alone; the next request waits in a row of its own
+        self.assertNotEqual(jobs.enqueue('test.coalesced', {'ids': [3]}).pk, first.pk)
+
+    def test_ordered_jobs_wait_for_older_ones(self):
+        jobs.task('test.ordered', ordered=True)(lambda: None)
+        first, second = jobs.enqueue('test.ordered'), jobs.enqueue('test.ordered')
+        Job.objects.filter(pk=first.pk).update(run_at=timezone.now() + timedelta(minutes=1))
+        self.assertIsNone(jobs.claim('w1'))
+        Job.objects.filter(pk=first.pk).update(run_at=timezone.now())
+        self.assertEqual(jobs.claim('w1').pk, first.pk)
+        self.assertIsNone(jobs.claim('w2'))  # nor while it runs
+
+    def test_finished_and_failed_jobs_age_out(self):
+        old = timezone.now() - timedelta(days=jobs.KEEP_DAYS + 1)
+        for status in (Job.SUCCEEDED, Job.FAILED, Job.QUEUED):
+            Job.objects.create(task='test.record', status=status, finished_at=old)
+        self.assertEqual(jobs.purge_finished(), 2)
+        self.assertEqual(list(Job.objects.values_list('status', flat=True)), [Job.QUEUED])
+
+    def test_eager_copy_that_loses_the_exclusive_race_still_runs(self):
+        with mock.patch.object(jobs, 'EAGER', True), self.captureOnCommitCallbacks() as callbacks:
+            first, second = jobs.enqueue('test.exclusive'), jobs.enqueue('test.exclusive')
+        # The second copy's own attempt comes while the first runs, and loses
+        running = jobs.claim('w1', job_id=first.pk)
+        callbacks[1]()
+        self.assertEqual(Job.objects.get(pk=second.pk).status, Job.QUEUED)
+        Job.objects.filter(pk=running.pk).update(status=Job.QUEUED, attempts=0)
+        callbacks[0]()
+        self.assertEqual(set(Job.objects.values_list('status', flat=True)), {Job.SUCCEEDED})
+
+    def test_prune_jobs_only_write_below_the_archive_dir(self):
+        job = jobs.enqueue('history.prune', {'archive_dir': '../../etc'})
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.assertFalse(jobs.run_next('w1'))
+        job.refresh_from_db()
+        self.assertIn('archive_dir must be inside', job.error)
+
+    def test_worker_refuses_a_per_process_cache(self):
+        with self.assertRaisesMessage(CommandError, '--allow-local-cache'):
+            call_command('worker', '--burst', stdout=StringIO())
+        stdout, stderr = StringIO(), StringIO()
+        with mock.patch('core.management.commands.worker.signal.signal'):
+            call_command('worker', '--burst', '--allow-local-cache', stdout=stdout, stderr=stderr)
+        self.assertIn('locmem', stderr.getvalue())
+        self.assertIn('Worker stopped.', stdout.getvalue())
+
+    def test_status_api_scopes_jobs_and_lets_admins_queue(self):
+        admin, operator = APIClient(), APIClient()
+        admin.force_authenticate(self.admin)
+        operator.force_authenticate(self.operator)
+        created = admin.post('/api/jobs/', {'task': 'test.record', 'payload': {'n': 1}}, format='json')
+        self.assertEqual(created.status_code, 201)
+        self.assertEqual(admin.get(f"/api/jobs/{created.json()['id']}/").json()['status'], 'queued')
+        self.assertEqual(operator.get('/api/jobs/').json()['results'], [])
+        self.assertEqual(operator.post('/api/jobs/', {'task': 'test.record'}, format='json').status_code, 403)
+
+
+# --- Analytics Rollups: incremental upkeep must always equal a full rebuild ---
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class AnalyticsRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='analytics_user', role='operator')
+        cls.vessel = Vessel.objects.create(
+            name='Counter', mmsi=200000321, vessel_type='Cargo', last_position_lat=1.0, last_position_lon=2.0,
+        )
+        cls.ports = [Port.objects.create(name=name, location='0,0') for name in ('Mumbai', 'Dubai', 'Rotterdam')]
+
+    def snapshot(self):
+        return (
+            sorted(PortTraffic.objects.filter(~Q(arrivals=0) | ~Q(departures=0)).values_list('port_id', 'hour', 'arrivals', 'departures')),
+            sorted(RouteStats.objects.filter(voyages__gt=0).values_list('port_from_id', 'port_to_id', 'voyages', 'transit_seconds')),
+            sorted(VoyageStatusCount.objects.filter(voyages__gt=0).values_list('status', 'voyages')),
+        )
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        analytics.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+    def voyage(self, port_from, port_to, departed, arrived=None, status='On Schedule'):
+        voyage = Voyage.objects.create(
+            vessel=self.vessel, port_from=self.ports[port_from], port_to=self.ports[port_to], departure_time=departed, status=status,
+        )
+        if arrived:
+            voyage.arrival_time, voyage.status = arrived, 'Completed'
+            voyage.save()
+        return voyage
+
+    def test_saves_and_deletes_keep_rollups_equal_to_a_rebuild(self):
+        start = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=10)
+        first = self.voyage(0, 1, start, start + timedelta(hours=6, minutes=30))
+        self.voyage(0, 1, start + timedelta(minutes=20), start + timedelta(hours=7, minutes=30))
+        delayed = self.voyage(2, 1, start)
+        delayed.status = 'Delayed'
+        delayed.save()
+        self.assertEqual(RouteStats.objects.get(port_from=self.ports[0], port_to=self.ports[1]).voyages, 2)
+        self.assertEqual(PortTraffic.objects.get(port=self.ports[0], hour=start).departures, 2)
+        self.assertMatchesRebuild()
+
+        first.port_to = self.ports[2]
+        first.save()
+        self.assertMatchesRebuild()
+        first.delete()
+        self.assertMatchesRebuild()
+        self.assertEqual(dict(VoyageStatusCount.objects.filter(voyages__gt=0).values_list('status', 'voyages')),
+                         {'Completed': 1, 'Delayed': 1})
+
+    def test_dashboard_endpoints_read_the_rollups(self):
+        start = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=10)
+        self.voyage(0, 1, start, start + timedelta(hours=5))
+        self.voyage(0, 1, start, start + timedelta(hours=7))
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        board = client.get('/api/analytics/port-traffic/').json()['ports']
+        self.assertEqual([(row['port_name'], row['departures']) for row in board], [('Dubai', 0), ('Mumbai', 2)])
+        series = client.get('/api/analytics/port-traffic/', {'port': self.ports[1].id, 'bucket': 'day'}).json()['series']
+        self.assertEqual(sum(row['arrivals'] for row in series), 2)
+        routes = client.get('/api/analytics/routes/', {'port_from': self.ports[0].id}).json()['routes']
+        self.assertEqual((routes[0]['voyages'], routes[0]['avg_transit_hours']), (2, 6.0))
+        self.assertEqual(client.get('/api/analytics/voyage-status/').json()['by_status'], {'Completed': 2})
+        self.assertEqual(client.get('/api/analytics/port-traffic/', {'bucket': 'week'}).status_code, 400)
+
+
+# --- Voyage Tracking: departures, arrivals and ETAs from the ingested position stream ---
+class VoyageTrackingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vessel = Vessel.objects.create(
+            name='Tracker', mmsi=200000654, vessel_type='Cargo', last_position_lat=0.0, last_position_lon=0.0,
+        )
+        # ~111 km apart on the equator
+        cls.origin = Port.objects.create(name='Origin', location='0,0')
+        cls.destination = Port.objects.create(name='Destination', location='0,1')
+
+    def setUp(self):
+        tracking.invalidate_ports()
+        self.start = timezone.now().replace(microsecond=0) - timedelta(hours=6)
+
+    def ingest(self, *fixes):
+        ingest_fixes([
+            {'mmsi': self.vessel.mmsi, 'lat': lat, 'lon': lon, 'timestamp': (self.start + timedelta(hours=hours)).isoformat()}
+            for hours, lat, lon in fixes
+        ])
+        while jobs.run_next('test') is not None:
+            pass
+
+    def test_departure_opens_a_voyage_and_arrival_closes_it(self):
+        self.ingest((0, 0.0, 0.0), (1, 0.0, 0.3), (2, 0.0, 0.6))
+        voyage = Voyage.objects.get(vessel=self.vessel)
+        self.assertTrue(voyage.detected)
+        self.assertEqual((voyage.port_from, voyage.port_to, voyage.status), (self.origin, self.destination, 'On Schedule'))
+        self.assertEqual(voyage.departure_time, self.start + timedelta(hours=1))
+        self.assertGreater(voyage.eta, self.start + timedelta(hours=2))
+        self.assertLess(voyage.eta, voyage.planned_arrival)
+
+        self.ingest((3, 0.0, 0.95))
+        voyage.refresh_from_db()
+        self.assertEqual((voyage.arrival_time, voyage.status), (self.start + timedelta(hours=3), 'Completed'))
+        self.assertEqual(VesselTrackState.objects.get(vessel=self.vessel).port, self.destination)
+        route = RouteStats.objects.get(port_from=self.origin, port_to=self.destination)
+        self.assertEqual((route.voyages, route.transit_seconds), (1, 2 * 3600))
+
+    def test_batch_retried_late_still_goes_before_the_next_one(self):
+        fixes = [{'mmsi': self.vessel.mmsi, 'lat': 0.0, 'lon': lon, 'timestamp': (self.start + timedelta(hours=hours)).isoformat()}
+                 for hours, lon in ((0, 0.0), (1, 0.3), (2, 0.6))]
+        ingest_fixes(fixes[:1])
+        with mock.patch.object(tracking, 'track', side_effect=RuntimeError('database is locked')), \
+                self.assertLogs('core.jobs', 'WARNING'):
+            self.assertFalse(jobs.run_next('test', tasks=['voyages.track']))
+        ingest_fixes(fixes[1:])
+        # The second batch is held back behind the one backing off
+        self.assertIsNone(jobs.run_next('test', tasks=['voyages.track']))
+        Job.objects.filter(task='voyages.track').update(run_at=timezone.now())
+        while jobs.run_next('test') is not None:
+            pass
+        voyage = Voyage.objects.get(vessel=self.vessel)
+        self.assertEqual((voyage.port_from, voyage.departure_time), (self.origin, self.start + timedelta(hours=1)))
+
+    def test_slow_passage_marks_a_planned_voyage_delayed(self):
+        voyage = Voyage.objects.create(
+            vessel=self.vessel, port_from=self.origin, port_to=self.destination,
+            planned_arrival=self.start + timedelta(hours=2),
+        )
+        self.ingest((0, 0.0, 0.0), (1, 0.0, 0.2), (3, 0.0, 0.3))
+        voyage.refresh_from_db()
+        self.assertFalse(voyage.detected)
+        self.assertEqual(voyage.departure_time, self.start + timedelta(hours=1))
+        self.assertEqual(voyage.status, 'Delayed')
+        self.assertEqual(VoyageStatusCount.objects.get(status='Delayed').voyages, 1)
+
+
+# --- Notifications: targeted fan-out, per-user read state, cached unread counts ---
+class NotificationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.analyst = User.objects.create(username='analyst_nt', role='analyst', region='North Sea')
+        cls.north = User.objects.create(username='operator_nt_north', role='operator', region='North Sea')
+        cls.south = User.objects.create(username='operator_nt_south', role='operator', region='Pacific')
+
+    def setUp(self):
+        cache.clear()
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def test_targeted_fan_out_and_per_user_read_state(self):
+        analyst = self.client_for(self.analyst)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = analyst.post('/api/notifications/', {
+                'message': 'Storm warning', 'roles': ['operator'], 'regions': ['North Sea'],
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['recipients'], 1)
+        notification = Notification.objects.get()
+        self.assertEqual(list(notification.deliveries.values_list('user', flat=True)), [self.north.id])
+
+        north, south = self.client_for(self.north), self.client_for(self.south)
+        self.assertEqual(len(south.get('/api/notifications/').data['results']), 0)
+        self.assertEqual(north.get('/api/notifications/unread-count/').data, {'unread': 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            response = north.post(f'/api/notifications/{notification.id}/read/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(north.get('/api/notifications/unread-count/').data, {'unread': 0})
+        self.assertTrue(north.get(f'/api/notifications/{notification.id}/').data['is_read'])
+
+        # Operators read their inbox but cannot broadcast
+        self.assertEqual(north.post('/api/notifications/', {'message': 'Hi'}, format='json').status_code, 403)
+
+    def test_unread_count_is_cached_until_deliveries_change(self):
+        client = self.client_for(self.south)
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(3):
+                notifications.notify(f'Alert {i}')
+        with self.assertNumQueries(1):
+            self.assertEqual(notifications.unread_count(self.south), 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(notifications.unread_count(self.south), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post('/api/notifications/mark-read/', {}, format='json')
+        self.assertEqual(response.data, {'marked': 3})
+        self.assertEqual(client.get('/api/notifications/?unread=true').data['results'], [])
+        # Other users' read state is untouched
+        self.assertEqual(notifications.unread_count(self.north), 3)
+
+
+# --- Stateless JWT: role claims instead of a User query, revocation when they go stale ---
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class TokenAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='analyst_jwt', password='pw-analyst', role='analyst', region='Pacific')
+
+    def setUp(self):
+        revocations.clear()
+
+    def login(self):
+        response = APIClient().post('/api/token/', {'username': 'analyst_jwt', 'password': 'pw-analyst'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def client_with(self, access):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        return client
+
+    def test_requests_authorize_from_claims_without_user_queries(self):
+        tokens = self.login()
+        authenticator = RoleTokenAuthentication()
+        token = authenticator.get_validated_token(tokens['access'].encode())
+        authenticator.get_user(token)  # loads the revocation list once per process
+        with self.assertNumQueries(0):
+            user = authenticator.get_user(token)
+        self.assertIsInstance(user, RoleTokenUser)
+        self.assertEqual((user.id, user.role, user.region), (self.user.id, 'analyst', 'Pacific'))
+
+        response = self.client_with(tokens['access']).get('/api/users/')
+        self.assertEqual([row['username'] for row in response.data], ['analyst_jwt'])
+
+    def test_role_change_and_sign_out_revoke_outstanding_tokens(self):
+        tokens = self.login()
+        client = self.client_with(tokens['access'])
+        self.assertEqual(client.get('/api/notifications/unread-count/').status_code, 200)
+
+        user = User.objects.get(pk=self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            user.role = 'operator'
+            user.save()
+        self.assertEqual(client.get('/api/notifications/unread-count/').status_code, 401)
+        refreshed = APIClient().post('/api/token/refresh/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(refreshed.status_code, 401)
+
+        tokens = self.login()
+        client = self.client_with(tokens['access'])
+        self.assertEqual(RoleTokenAuthentication().get_validated_token(tokens['access'].encode())['role'], 'operator')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(client.post('/api/token/revoke/').status_code, 204)
+        self.assertEqual(client.get('/api/notifications/unread-count/').status_code, 401)
+
+
+# --- Collision Screening: CPA / TCPA kernel and encounter bookkeeping ---
+class CollisionScreeningTests(TestCase):
+    def test_kernel_finds_converging_pairs_only(self):
+        # 0/1 meet head-on across the dateline, 2/3 sail parallel 5 km apart, 4/5 lie at anchor together
+        lat = [0.0, 0.0, 10.0, 10.045, 20.0, 20.001]
+        lon = [179.97, -179.98, 50.0, 50.0, 60.0, 60.0]
+        east, north = collision.velocities([10, 10, 12, 12, 0, 0], [90, 270, 0, 0, 0, 0])
+        first, second, cpa, tcpa = collision.close_approaches(lat, lon, east, north, cpa_km=1.0, horizon_minutes=15)
+        self.assertEqual(list(zip(first.tolist(), second.tolist())), [(0, 1)])
+        self.assertLess(cpa[0], 0.01)
+        # 5.56 km closed at 20 knots
+        self.assertAlmostEqual(tcpa[0], 5.56 / (20 * 1.852 / 60), delta=0.1)
+
+    def test_screen_records_new_encounters_once_and_clears_them(self):
+        now = timezone.now()
+        vessels = [
+            Vessel.objects.create(name=name, mmsi=300000000 + i, vessel_type='Cargo', last_position_lat=0.0,
+                                  last_position_lon=lon)
+            for i, (name, lon) in enumerate([('West', 0.0), ('East', 0.05)])
+        ]
+        states = [
+            VesselTrackState.objects.create(vessel=vessel, last_fix_at=now, last_lat=0.0, last_lon=lon,
+                                            speed_knots=10.0, course=course)
+            for vessel, lon, course in zip(vessels, (0.0, 0.05), (90.0, 270.0))
+        ]
+        result = collision.screen(now)
+        self.assertEqual((result['new'], result['open']), (1, 1))
+        self.assertEqual(Event.objects.filter(event_type=collision.EVENT_TYPE).count(), 2)
+        self.assertIn('West / East', Notification.objects.get().message)
+
+        self.assertEqual(collision.screen(now)['new'], 0)
+        VesselTrackState.objects.filter(pk=states[1].pk).update(course=0.0, last_lat=0.2)
+        self.assertEqual(collision.screen(now)['cleared'], 1)
+        self.assertFalse(CloseEncounter.objects.exists())
+
+    def test_vessel_deleted_during_a_pass_is_skipped(self):
+        now = timezone.now()
+        vessels = []
+        for i, (lon, course) in enumerate([(0.0, 90.0), (0.05, 270.0)]):
+            vessels.append(Vessel.objects.create(name=f'Pair {i}', mmsi=300000010 + i, vessel_type='Cargo',
+                                                 last_position_lat=0.0, last_position_lon=lon))
+            VesselTrackState.objects.create(vessel=vessels[-1], last_fix_at=now, last_lat=0.0, last_lon=lon,
+                                            speed_knots=10.0, course=course)
+        fleet = collision._fleet
+
+        def read_then_delete(when):
+            snapshot = fleet(when)
+            vessels[1].delete()
+            return snapshot
+
+        with mock.patch.object(collision, '_fleet', read_then_delete):
+            self.assertEqual(collision.screen(now)['new'], 0)
+        self.assertFalse(CloseEncounter.objects.exists())
+
+
+# --- Async Read Path: list polls served from the event loop, identical to the DRF views ---
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class AsyncReadPathTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin_ar', role='admin')
+        vessel = Vessel.objects.create(name='Async', mmsi=300000001, vessel_type='Cargo', last_position_lat=1.0, last_position_lon=2.0)
+        for minute in range(5):
+            Event.objects.create(vessel=vessel, event_type='Storm', location='1.0,2.0', details=f'Gale {minute}')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def drf_page(self, url):
+        request = APIRequestFactory().get(url)
+        force_authenticate(request, self.admin)
+        return views.EventViewSet.as_view({'get': 'list'})(request).render().content
+
+    def test_json_lists_run_async_with_the_same_pages(self):
+        self.assertTrue(iscoroutinefunction(resolve('/api/events/').func))
+        with mock.patch.object(asyncviews, '_serve', wraps=asyncviews._serve) as served:
+            response = self.client.get('/api/events/', {'page_size': 2})
+            following = self.client.get(response.json()['next'])
+        self.assertEqual(served.call_count, 2)
+        self.assertEqual(response.content, self.drf_page('/api/events/?page_size=2'))
+        self.assertEqual([row['details'] for row in following.json()['results']], ['Gale 2', 'Gale 1'])
+        self.assertIn('db', response['Server-Timing'])
+        previous = self.client.get(following.json()['previous']).json()
+        self.assertEqual([row['details'] for row in previous['results']], ['Gale 4', 'Gale 3'])
+
+    def test_other_requests_fall_back_to_drf(self):
+        self.assertEqual(APIClient().get('/api/events/').status_code, 401)
+        self.assertEqual(self.client.get('/api/events/', {'format': 'api'})['Content-Type'], 'text/html; charset=utf-8')
+        created = self.client.post('/api/vessels/', {
+            'name': 'Posted', 'vessel_type': 'Tanker', 'last_position_lat': 3.0, 'last_position_lon': 4.0,
+        }, format='json')
+        self.assertEqual(created.status_code, 201)
+
+
+# --- Read Replicas: GETs read a replica until the client writes ---
+@mock.patch.object(replicas, 'REPLICAS', ['replica_1'])
+class ReplicaRoutingTests(SimpleTestCase):
+    def serve(self, request, write=False):
+        reads = []
+
+        def view(request):
+            reads.append(router.db_for_read(Vessel))
+            if write:
+                self.assertEqual(router.db_for_write(Vessel), 'default')
+                reads.append(router.db_for_read(Vessel))
+            return HttpResponse()
+
+        response = ReplicaRoutingMiddleware(view)(request)
+        return reads, response
+
+    def test_reads_go_to_a_replica_until_the_request_writes(self):
+        reads, response = self.serve(RequestFactory().get('/api/history/'))
+        self.assertEqual(reads, ['replica_1'])
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+
+        reads, response = self.serve(RequestFactory().get('/api/notifications/'), write=True)
+        self.assertEqual(reads, ['replica_1', 'default'])
+        self.assertEqual(response.cookies[replicas.PIN_COOKIE]['max-age'], replicas.STICKY_SECONDS)
+
+        # The client's next request reads its write back from the primary
+        pinned = RequestFactory().get('/api/notifications/')
+        pinned.COOKIES[replicas.PIN_COOKIE] = '1'
+        self.assertEqual(self.serve(pinned)[0], ['default'])
+
+    def test_a_request_keeps_the_replica_it_first_read(self):
+        def view(request):
+            aliases = {router.db_for_read(model) for model in (Vessel, VesselHistory, Voyage, Event) * 5}
+            return HttpResponse(','.join(sorted(aliases)))
+
+        with mock.patch.object(replicas, 'REPLICAS', ['replica_1', 'replica_2']), \
+                mock.patch.object(replicas.random, 'choice', side_effect=['replica_2', 'replica_1']) as choice:
+            response = ReplicaRoutingMiddleware(view)(RequestFactory().get('/api/history/'))
+        self.assertEqual(response.content, b'replica_2')
+        self.assertEqual(choice.call_count, 1)
+
+    def test_writes_jobs_and_replica_rows_use_the_primary(self):
+        self.assertEqual(self.serve(RequestFactory().post('/api/vessels/'))[0], ['default'])
+        # No request (worker, ingestion, commands)
+        self.assertEqual(router.db_for_read(Vessel), 'default')
+        vessel = Vessel(name='Replica row')
+        vessel._state.db = 'replica_1'
+        self.assertEqual(router.db_for_write(Vessel, instance=vessel), 'default')
+        with mock.patch.object(replicas, 'REPLICAS', []), self.assertRaises(MiddlewareNotUsed):
+            ReplicaRoutingMiddleware(lambda request: HttpResponse())
+
+
+# --- Map Clusters: counts per tile, kept current by saves and ingestion ---
+class VesselClusterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin_cl', role='admin')
+        cls.operator = User.objects.create(username='operator_cl', role='operator')
+        cls.moving = Vessel.objects.create(name='Moving', mmsi=400000001, vessel_type='Cargo', last_position_lat=10.0, last_position_lon=100.0)
+        cls.staying = Vessel.objects.create(name='Staying', mmsi=400000002, vessel_type='Cargo', last_position_lat=11.0, last_position_lon=101.0)
+        Vessel.objects.create(name='Laid up', mmsi=400000003, vessel_type='Tanker', status='Inactive', last_position_lat=-30.0, last_position_lon=-40.0)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def clusters(self, **params):
+        response = self.client.get('/api/vessels/clusters/', {'zoom': 2, **params})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['clustered'])
+        return [(c['count'], c['vessel_type'], c['status']) for c in response.json()['clusters']]
+
+    def cells(self):
+        return set(ClusterCell.objects.values_list('cell', 'vessel_type', 'status', 'vessels'))
+
+    def test_clusters_follow_saves_and_ingestion(self):
+        self.assertEqual(self.clusters(), [(2, 'Cargo', 'Active'), (1, 'Tanker', 'Inactive')])
+        self.assertEqual(self.clusters(bbox='90,0,110,20'), [(2, 'Cargo', 'Active')])
+        self.client.force_authenticate(self.operator)
+        self.assertEqual(self.clusters(), [(2, 'Cargo', 'Active')])
+        self.client.force_authenticate(self.admin)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ingest_fixes([{'mmsi': self.moving.mmsi, 'lat': -31.0, 'lon': -41.0}])
+        self.assertEqual(self.clusters(), [(2, 'Cargo', 'Active'), (1, 'Cargo', 'Active')])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.staying.delete()
+        self.assertEqual(self.clusters(), [(2, 'Cargo', 'Active')])
+
+        # The incremental counts match a full recount, with emptied cells gone
+        maintained = self.cells()
+        self.assertFalse(any(vessels == 0 for *_, vessels in maintained))
+        clusters.rebuild()
+        self.assertEqual(self.cells(), maintained)
+
+    def test_zoomed_in_views_get_vessels(self):
+        response = self.client.get('/api/vessels/clusters/', {'zoom': clusters.MAX_ZOOM + 1, 'bbox': '99,9,102,12'})
+        self.assertFalse(response.json()['clustered'])
+        self.assertEqual(sorted(v['name'] for v in response.json()['vessels']), ['Moving', 'Staying'])
+        self.assertEqual(self.client.get('/api/vessels/clusters/').status_code, 400)
+        self.assertEqual(self.client.get('/api/vessels/clusters/', {'zoom': 3, 'bbox': '1,2'}).status_code, 400)
+        for zoom in ('inf', 'nan', '-1'):
+            self.assertEqual(self.client.get('/api/vessels/clusters/', {'zoom': zoom}).status_code, 400, zoom)
+
+
+# --- History Retention: archive raw days, keep a thinned track, pick up late fixes ---
+class HistoryRetentionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vessel = Vessel.objects.create(name='Retained', mmsi=500000001, vessel_type='Cargo', last_position_lat=0.3, last_position_lon=0.7)
+        cls.day = (timezone.now() - timedelta(days=40)).date()
+        start = timezone.make_aware(datetime.combine(cls.day, datetime.min.time()), dt_timezone.utc)
+        # Due east for 14 minutes, then a right-angle turn due north
+        track = [(0.0, step / 10) for step in range(8)] + [(step / 10, 0.7) for step in range(1, 4)]
+        cls.fixes = [
+            VesselHistory.objects.create(vessel=cls.vessel, latitude=lat, longitude=lon, timestamp=start + timedelta(minutes=2 * i))
+            for i, (lat, lon) in enumerate(track)
+        ]
+        cls.recent = VesselHistory.objects.create(vessel=cls.vessel, latitude=0.3, longitude=0.7)
+
+    def setUp(self):
+        self.archive_dir = self.enterContext(tempfile.TemporaryDirectory())
+
+    def retain(self):
+        return list(apply_retention(retention_days=30, interval_minutes=60, turn_degrees=30, archive_dir=self.archive_dir))
+
+    def read_archive(self, path):
+        with gzip.open(path, 'rt', newline='') as handle:
+            return list(csv.reader(handle))
+
+    def test_archives_raw_day_and_keeps_turn_and_endpoints(self):
+        [result] = self.retain()
+        self.assertEqual((result['day'], result['raw_rows'], result['kept_rows']), (self.day, 11, 3))
+        rows = self.read_archive(result['path'])
+        self.assertEqual(rows[0], ['id', 'vessel_id', 'latitude', 'longitude', 'timestamp'])
+        self.assertEqual([int(row[0]) for row in rows[1:]], [fix.id for fix in self.fixes])
+        self.assertEqual(rows[8][2:], ['0.0', '0.7', self.fixes[7].timestamp.isoformat()])
+        kept = set(VesselHistory.objects.values_list('id', flat=True))
+        self.assertEqual(kept, {self.fixes[0].id, self.fixes[7].id, self.fixes[-1].id, self.recent.id})
+
+    def test_rerun_does_nothing_until_a_late_fix_arrives(self):
+        [first] = self.retain()
+        self.assertEqual(self.retain(), [])
+        self.assertEqual(os.listdir(self.archive_dir), [os.path.basename(first['path'])])
+
+        late = VesselHistory.objects.create(
+            vessel=self.vessel, latitude=0.35, longitude=0.7, timestamp=self.fixes[-1].timestamp + timedelta(minutes=1),
+        )
+        [result] = self.retain()
+        self.assertEqual((result['day'], result['raw_rows']), (self.day, 1))
+        self.assertTrue(result['path'].endswith(f'+{late.id}.csv.gz'))
+        self.assertEqual([row[0] for row in self.read_archive(result['path'])[1:]], [str(late.id)])
+        archive = HistoryArchive.objects.get(day=self.day)
+        self.assertEqual((archive.raw_rows, archive.max_id), (12, late.id))
+        # The late fix is the new endpoint; the old one is thinned away (it is archived)
+        self.assertIn(late.id, set(VesselHistory.objects.values_list('id', flat=True)))
+        self.assertEqual(self.retain(), [])
+
+
+# --- Delta Sync: cursors, changed rows and tombstones ---
+class DeltaSyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin_sync', role='admin')
+        cls.vessel = Vessel.objects.create(name='Synced', mmsi=600000001, vessel_type='Cargo', last_position_lat=1.0, last_position_lon=2.0)
+        cls.port = Port.objects.create(name='Closing', location='1.0,2.0')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def sync(self, since=None):
+        response = self.client.get('/api/sync/', {'since': since} if since else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_cursor_round_trip_returns_only_newer_rows(self):
+        moment = timezone.now().replace(microsecond=123456)
+        self.assertEqual(decode_cursor(encode_cursor(moment, 42)), (moment, 42))
+
+        snapshot = self.sync()
+        self.assertTrue(snapshot['full'])
+        self.assertEqual([row['id'] for row in snapshot['changes']['vessels']], [self.vessel.id])
+
+        # Rows last touched well before the cursor are not sent again
+        Vessel.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        Port.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        fix = VesselHistory.objects.create(vessel=self.vessel, latitude=1.5, longitude=2.5)
+        delta = self.sync(snapshot['cursor'])
+        self.assertFalse(delta['full'])
+        self.assertEqual((delta['changes']['vessels'], delta['changes']['ports']), ([], []))
+        self.assertEqual([row['id'] for row in delta['changes']['history']], [fix.id])
+        self.assertEqual(self.sync(delta['cursor'])['changes']['history'], [])
+
+    def test_deletions_arrive_as_tombstones(self):
+        cursor = self.sync()['cursor']
+        port_id = self.port.id
+        self.port.delete()
+        self.assertEqual(self.sync(cursor)['deleted']['ports'], [port_id])
+
+    def test_malformed_cursors_are_rejected(self):
+        for since in ('yesterday', '12-ab', '1000000000000000000000000000000-0', '-1-2'):
+            self.assertEqual(self.client.get('/api/sync/', {'since': since}).status_code, 400, since)
+
+
+# --- Track Replay: Douglas-Peucker simplification behind /api/vessels/{id}/track/ ---
+class TrackSimplificationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin_track', role='admin')
+        cls.vessel = Vessel.objects.create(name='Tracked', mmsi=700000001, vessel_type='Cargo', last_position_lat=0.0, last_position_lon=1.0)
+        start = timezone.now() - timedelta(hours=2)
+        # A straight run east with one 0.5 degree detour north in the middle
+        for i in range(11):
+            VesselHistory.objects.create(
+                vessel=cls.vessel, latitude=0.5 if i == 5 else 0.0, longitude=i / 10, timestamp=start + timedelta(minutes=i),
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def track(self, **params):
+        return self.client.get(f'/api/vessels/{self.vessel.id}/track/', params)
+
+    def test_simplifier_keeps_endpoints_and_the_detour(self):
+        lat = np.array([0.0, 0.001, 0.0, 0.5, 0.0, -0.001, 0.0])
+        lon = np.arange(7) / 10
+        self.assertEqual(douglas_peucker(lat, lon, 0.01).tolist(), [0, 2, 3, 4, 6])
+        self.assertEqual(douglas_peucker(lat, lon, 1.0).tolist(), [0, 6])
+        self.assertEqual(douglas_peucker(lat, lon, 0.0).tolist(), list(range(7)))
+        self.assertEqual(zoom_tolerance(0), 360.0 / 256.0)
+        self.assertEqual(zoom_tolerance(2000), zoom_tolerance(MAX_ZOOM))
+        self.assertEqual(zoom_tolerance(-5), zoom_tolerance(0))
+
+    def test_endpoint_simplifies_and_rejects_non_finite_input(self):
+        body = self.track(tolerance=0.1).json()
+        self.assertEqual(body['raw_points'], 11)
+        self.assertEqual([(p['latitude'], p['longitude']) for p in body['points']], [(0.0, 0.0), (0.0, 0.4), (0.5, 0.5), (0.0, 0.6), (0.0, 1.0)])
+        # Clamped to MAX_ZOOM; the exactly collinear fixes still go
+        self.assertEqual(len(self.track(zoom=2000).json()['points']), 5)
+        for params in ({'tolerance': 'nan'}, {'tolerance': 'inf'}, {'tolerance': -1}, {'zoom': 'inf'}, {'zoom': 'nan'}):
+            self.assertEqual(self.track(**params).status_code, 400, params)
+
+
+# --- Bulk Ingestion: AIS decoding, accepted/rejected counts, newest fix per vessel ---
+class PositionIngestionTests(TestCase):
+    # Real feed sentences: a Class A report (type 1) and a Class B report (type 18)
+    CLASS_A = '!AIVDM,1,1,,B,177KQJ5000G?tO`K>RA1wUbN0TKH,0*5C'
+    CLASS_B = '!AIVDM,1,1,,B,B5NJ;PP005l4ot5Isbl03wsUkP06,0*75'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin_ingest', role='admin')
+        cls.vessel = Vessel.objects.create(
+            name='Feed', mmsi=477553000, vessel_type='Cargo', last_position_lat=0.0, last_position_lon=0.0,
+        )
+
+    def setUp(self):
+        self.start = timezone.now().replace(microsecond=0) - timedelta(hours=1)
+
+    def fix(self, minutes, lat, lon, mmsi=477553000):
+        return {'mmsi': mmsi, 'lat': lat, 'lon': lon, 'timestamp': (self.start + timedelta(minutes=minutes)).isoformat()}
+
+    def test_decodes_real_aivdm_sentences(self):
+        self.assertEqual(decode_nmea(self.CLASS_A), {'mmsi': 477553000, 'latitude': 47.582833, 'longitude': -122.345833})
+        self.assertEqual(decode_nmea(self.CLASS_B), {'mmsi': 367430530, 'latitude': 37.785035, 'longitude': -122.26732})
+        tagged = decode_nmea('\\s:2573345,c:1241544035*7F\\' + self.CLASS_A)
+        self.assertEqual(tagged['timestamp'], datetime(2009, 5, 5, 17, 20, 35, tzinfo=dt_timezone.utc))
+        # Bad checksum, multi-part static data, other talkers
+        self.assertIsNone(decode_nmea(self.CLASS_A[:-1] + 'D'))
+        self.assertIsNone(decode_nmea('!AIVDM,2,1,4,A,55O0W7`00001L@gCWGA2uItLth@DqtL5@F22220j1h742t0Ht0000000,0*08'))
+        self.assertIsNone(decode_nmea('$GPGGA,123519,4807.038,N,01131.000,E,1,08,0.9,545.4,M,46.9,M,,*47'))
+        self.assertEqual(len(list(read_nmea([self.CLASS_A, '', self.CLASS_B]))), 2)
+        # A corrupt tag block loses the receive time, not the fix or the rest of the feed
+        for tag_block in ('\\c:abc*00\\', '\\c:99999999999999999999999*00\\'):
+            self.assertNotIn('timestamp', decode_nmea(tag_block + self.CLASS_A))
+
+    def test_counts_and_newest_fix_per_vessel(self):
+        report = ingest_fixes([
+            self.fix(2, 1.0, 1.0), self.fix(5, 2.0, 2.0), self.fix(3, 3.0, 3.0),
+            self.fix(1, 95.0, 0.0), {'mmsi': 'x', 'lat': 0, 'lon': 0}, self.fix(1, 0.0, 0.0, mmsi=999999999),
+        ], batch_size=4)
+        self.assertEqual((report['accepted'], report['rejected'], len(report['batches'])), (3, 3, 2))
+        self.assertEqual(report['batches'][1]['errors'], {'invalid mmsi': 1, 'unknown mmsi': 1})
+        self.vessel.refresh_from_db()
+        self.assertEqual((self.vessel.last_position_lat, self.vessel.last_position_time), (2.0, self.start + timedelta(minutes=5)))
+        self.assertEqual(VesselHistory.objects.filter(vessel=self.vessel).count(), 3)
+
+    def test_unusable_timestamps_are_rejected_fixes(self):
+        report = ingest_fixes([
+            {'mmsi': 477553000, 'lat': 1.0, 'lon': 1.0, 'timestamp': 1e20},
+            {'mmsi': 477553000, 'lat': 1.0, 'lon': 1.0, 'timestamp': True},
+            {'mmsi': 477553000, 'lat': 1.0, 'lon': 1.0, 'timestamp': 'yesterday'},
+            self.fix(0, 2.0, 2.0),
+        ])
+        self.assertEqual((report['accepted'], report['rejected']), (1, 3))
+        self.assertEqual(report['batches'][0]['errors'], {'invalid timestamp': 3})
+
+    def test_command_rejects_non_positive_batch_size(self):
+        with self.assertRaisesMessage(CommandError, '--batch-size'):
+            call_command('ingest_positions', '-', batch_size=-1, stdout=StringIO())
+
+    def test_late_batch_is_recorded_but_does_not_move_the_vessel(self):
+        ingest_fixes([self.fix(10, 1.0, 1.0)])
+        report = ingest_fixes([self.fix(4, 4.0, 4.0), self.fix(6, 6.0, 6.0)])
+        self.assertEqual((report['accepted'], report['batches'][0]['vessels_updated']), (2, 0))
+        self.vessel.refresh_from_db()
+        self.assertEqual((self.vessel.last_position_lat, self.vessel.last_position_lon), (1.0, 1.0))
+        self.assertEqual(VesselHistory.objects.filter(vessel=self.vessel).count(), 3)
+
+    def test_endpoint_rejects_non_positive_batch_size(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        for batch_size in ('0', '-1', 'two'):
+            response = client.post(f'/api/ingest/positions/?batch_size={batch_size}', [self.fix(0, 1.0, 1.0)], format='json')
+            self.assertEqual(response.status_code, 400, batch_size)
+        response = client.post('/api/ingest/positions/?batch_size=1', [self.fix(0, 1.0, 1.0)], format='json')
+        self.assertEqual((response.status_code, response.json()['accepted']), (201, 1))
+
+
+# --- Geofencing: entry/exit transitions, occupancy, and new zones catching vessels already inside ---
+class GeofenceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vessel = Vessel.objects.create(
+            name='Fenced', mmsi=500000001, vessel_type='Cargo', last_position_lat=10.0, last_position_lon=100.0,
+        )
+
+    def setUp(self):
+        geofence.invalidate_zones()
+
+    def run_jobs(self):
+        while jobs.run_next('test') is not None:
+            pass
+
+    def transitions(self):
+        return list(Event.objects.filter(vessel=self.vessel).order_by('id').values_list('event_type', flat=True))
+
+    def test_new_zone_records_vessels_already_inside(self):
+        storm = Event.objects.create(event_type='Storm', location='10.5,100.5', details='Typhoon')
+        Event.objects.create(event_type='Storm', location='40.0,-30.0', details='Gale')
+        # One full pass, however many zones changed before it ran
+        self.assertEqual(Job.objects.filter(task='geofence.evaluate', payload__refresh_zones=True).count(), 1)
+        self.run_jobs()
+        self.assertEqual(self.transitions(), ['Zone Entry'])
+        self.assertEqual(
+            list(ZoneOccupancy.objects.values_list('vessel_id', 'zone_kind', 'zone_id')), [(self.vessel.id, 'event', storm.id)],
+        )
+        self.assertIn('entered Storm zone', Notification.objects.get().message)
+
+        # Non-zone events do not trigger a pass; removing the zone records the exit
+        Event.objects.create(event_type='Inspection', location='10.5,100.5', details='Routine')
+        self.assertFalse(Job.objects.filter(task='geofence.evaluate', status=Job.QUEUED).exists())
+        storm.delete()
+        self.run_jobs()
+        self.assertEqual(self.transitions(), ['Zone Entry', 'Zone Exit'])
+        self.assertFalse(ZoneOccupancy.objects.exists())
+
+    def test_moves_enter_and_leave_ports(self):
+        Port.objects.create(name='Harbour', location='0,0')
+        self.run_jobs()
+        ingest_fixes([{'mmsi': self.vessel.mmsi, 'lat': 0.1, 'lon': 0.1}])
+        self.run_jobs()
+        self.assertEqual(ZoneOccupancy.objects.get().zone_kind, 'port')
+        ingest_fixes([{'mmsi': self.vessel.mmsi, 'lat': 5.0, 'lon': 5.0}])
+        self.run_jobs()
+        self.assertEqual(self.transitions(), ['Port Approach', 'Port Departure'])
+        self.assertFalse(ZoneOccupancy.objects.exists())
+
+
+# --- Synthetic Fleet: re-running a seed refuses before writing anything ---
+class GenerateFleetTests(TestCase):
+    def generate(self, **options):
+        call_command('generate_fleet', vessels=5, ports=3, days=1, fixes_per_day=4, users=2, stdout=StringIO(), **options)
+
+    def test_same_seed_twice_is_refused_without_partial_rows(self):
+        self.generate(seed=7)
+        counts = (User.objects.count(), Port.objects.count(), Vessel.objects.count())
+        with self.assertRaisesMessage(CommandError, '--flush'):
+            self.generate(seed=7)
+        self.assertEqual((User.objects.count(), Port.objects.count(), Vessel.objects.count()), counts)
+        self.generate(seed=7, flush=True)
+        self.assertEqual(Vessel.objects.count(), 5)
+
+
+# --- Spatial Filters: viewport boxes, the antimeridian and radius searches ---
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class SpatialFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin_geo', role='admin')
+        for name, lat, lon in [('East', 10.0, 179.5), ('West', 10.0, -179.5), ('Gulf', 10.0, 0.0), ('North', 50.0, 0.0)]:
+            Vessel.objects.create(name=name, vessel_type='Cargo', last_position_lat=lat, last_position_lon=lon)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def names(self, **params):
+        response = self.client.get('/api/vessels/', params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(vessel['name'] for vessel in response.json())
+
+    def test_boxes_split_at_the_antimeridian(self):
+        self.assertEqual(split_bbox((170.0, 0.0, -170.0, 20.0)), [(170.0, 0.0, 180.0, 20.0), (-180.0, 0.0, -170.0, 20.0)])
+        west, _, east, _ = radius_bbox(0.0, 179.9, 50.0)
+        self.assertGreater(west, east)
+        # Circles over a pole take every longitude
+        self.assertEqual(radius_bbox(89.9, 0.0, 50.0)[::2], (-180.0, 180.0))
+        self.assertIsNone(cells_for_bbox((-180.0, -90.0, 180.0, 90.0)))
+
+        self.assertEqual(self.names(bbox='179,5,-179,15'), ['East', 'West'])
+        self.assertEqual(self.names(bbox='-1,5,1,15'), ['Gulf'])
+        self.assertEqual(self.names(bbox='-180,-90,180,90'), ['East', 'Gulf', 'North', 'West'])
+
+    def test_radius_search_crosses_the_antimeridian(self):
+        # East is ~44 km from the point, West ~66 km across the dateline
+        self.assertEqual(self.names(near='10,179.9', radius_km=50), ['East'])
+        self.assertEqual(self.names(near='10,179.9', radius_km=100), ['East', 'West'])
+        self.assertEqual(self.names(near='10,179.9', radius_km=100, bbox='-180,0,0,20'), ['West'])
+
+    def test_invalid_filters_are_rejected(self):
+        for params in ({'bbox': '1,2'}, {'bbox': '0,20,10,10'}, {'near': '95,0'},
+                       {'near': '10,0', 'radius_km': -1}, {'near': '10,0', 'radius_km': 'nan'}, {'near': '10,0', 'radius_km': 'inf'}):
+            self.assertEqual(self.client.get('/api/vessels/', params).status_code, 400, params)
+
+
+# --- Keyset Pagination: page boundaries on ties and cursors that survive inserts ---
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin_kp', role='admin')
+        cls.vessel = Vessel.objects.create(name='Paged', vessel_type='Cargo', last_position_lat=0.0, last_position_lon=0.0)
+        cls.start = timezone.now().replace(microsecond=0) - timedelta(hours=1)
+        # Pairs of fixes share a timestamp, so page breaks fall inside ties
+        cls.rows = [
+            VesselHistory.objects.create(vessel=cls.vessel, latitude=0.0, longitude=i, timestamp=cls.start + timedelta(minutes=i // 2))
+            for i in range(7)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def page(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        return [row['id'] for row in body['results']], body['next'], body['previous']
+
+    def expected(self):
+        return list(VesselHistory.objects.order_by('-timestamp', '-id').values_list('id', flat=True))
+
+    def test_pages_walk_every_row_once_in_order(self):
+        seen, url, params = [], '/api/history/', {'page_size': 2}
+        while url:
+            ids, url, _ = self.page(url, **params)
+            self.assertLessEqual(len(ids), 2)
+            seen.extend(ids)
+            params = {}
+        self.assertEqual(seen, self.expected())
+
+    def test_cursors_stay_put_when_rows_arrive(self):
+        first, following, _ = self.page('/api/history/', page_size=3)
+        VesselHistory.objects.create(vessel=self.vessel, latitude=0.0, longitude=9.0, timestamp=timezone.now())
+        second, _, previous = self.page(following)
+        # The new fix sorts first, yet the next page carries on where the first one stopped
+        self.assertEqual(first + second, self.expected()[1:7])
+        back, _, _ = self.page(previous)
+        self.assertEqual(back, first)
+
+
+# --- Benchmark commands: tiny runs that keep the harness and report shape from rotting ---
+class BenchmarkSmokeTests(TestCase):
+    def bench(self, command, *args):
+        """Runs a bench_* command at toy scale, on the test DB instead of a throwaway one; returns the report."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'report.json')
+            with mock.patch(f'core.management.commands.{command}.benchmark_database',
+                            lambda keepdb=False: nullcontext(connection.settings_dict['NAME']), create=True):
+                call_command(command, *args, '--output', path, stdout=StringIO())
+            with open(path, encoding='utf-8') as handle:
+                return json.load(handle)
+
+    def assertTimed(self, row):
+        self.assertLessEqual(row['p50'], row['p95'])
+        self.assertLessEqual(row['p95'], row['p99'])
+
+    def test_percentiles_use_the_nearest_rank(self):
+        self.assertEqual(percentiles([5.0, 1.0, 3.0, 2.0, 4.0]), {'p50': 3.0, 'p95': 5.0, 'p99': 5.0})
+        self.assertEqual(percentiles([]), {'p50': None, 'p95': None, 'p99': None})
+
+    def test_kernel_benchmarks(self):
+        report = self.bench('bench_geofence', '--vessels', '200', '--zones', '10', '--repeat', '2')
+        self.assertEqual((report['vessels'], report['zones']), (200, 10))
+        self.assertTimed(report)
+        report = self.bench('bench_simplify', '--points', '500', '--zooms', '3,12', '--repeat', '2')
+        self.assertEqual(set(report['results']), {'zoom_3', 'zoom_12'})
+        self.assertLessEqual(report['results']['zoom_3']['points_out'], report['results']['zoom_12']['points_out'])
+        report = self.bench('bench_collisions', '--vessels', '200', '--densities', 'strait', '--repeat', '2')
+        self.assertEqual(set(report['densities']), {'strait'})
+        self.assertTimed(report['densities']['strait'])
+
+    def test_database_benchmarks(self):
+        report = self.bench('bench_search', '--vessels', '50', '--queries', '3')
+        self.assertEqual(report['vessels'], 50)
+        self.assertIn('name_prefix_indexed', report['results'])
+        Vessel.objects.all().delete()
+        report = self.bench('bench_spatial', '--vessels', '40', '--history', '100', '--queries', '3')
+        self.assertEqual((report['vessels'], report['history_rows']), (40, 100))
+        for row in report['results'].values():
+            self.assertTimed(row)
+
+    def test_api_benchmark_covers_every_route(self):
+        report = self.bench('bench_api', '--vessels', '5', '--ports', '3', '--days', '1', '--fixes-per-day', '2',
+                            '--requests', '1', '--roles', 'operator')
+        self.assertEqual(report['dataset']['Vessel'], 5)
+        results = report['results']['operator']
+        self.assertIn('GET /api/vessels/', results)
+        for row in results.values():
+            self.assertLessEqual({'status', 'p50', 'queries', 'response_bytes', 'peak_memory_kb'}, set(row))
+        self.assertIn('api/export/history/', ' '.join(report['skipped']))
@@ -0,0 +1,338 @@
+import math
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import analytics
+from .geo import EARTH_RADIUS_KM, haversine_km
+from .geofence import ZoneSet, parse_location
+from .models import Port, RouteStats, VesselHistory, VesselTrackState, Voyage
+
+# --- Voyage Detection & ETA (positions_ingested -> 'voyages.track' job) ---
+# Every vessel keeps one VesselTrackState row: last fix, smoothed speed, course and the port
+# it is berthed at. New fixes are folded into that state in time order, so history is never
+# re-read. Leaving the berth's radius opens a voyage whose destination is predicted from the
+# course (ports ahead, known routes from the origin first); slowing down inside a port's
+# radius, or reaching the destination's, closes it. While under way the ETA is the remaining
+# great-circle distance at the smoothed speed, and the voyage is "Delayed" once that runs
+# past the planned arrival (the route's average transit, else distance at service speed).
+# Port hits for a whole batch come from one vectorised lookup over cached port vectors.
+PORT_RADIUS_KM = getattr(settings, 'VOYAGE_PORT_RADIUS_KM', 10.0)
+ARRIVAL_KNOTS = getattr(settings, 'VOYAGE_ARRIVAL_KNOTS', 3.0)
+SERVICE_KNOTS = getattr(settings, 'VOYAGE_SERVICE_KNOTS', 12.0)
+DELAY_GRACE = timedelta(minutes=getattr(settings, 'VOYAGE_DELAY_GRACE_MINUTES', 60))
+KNOT_KMH = 1.852
+MAX_PLAUSIBLE_KNOTS = 60.0  # faster "moves" are position jumps, not sailing
+MIN_ETA_KNOTS = 0.5
+MIN_COURSE_KM = 0.05
+SPEED_SMOOTHING = 0.5
+DESTINATION_CONE_DEGREES = 30.0
+MIN_VOYAGE = timedelta(minutes=30)
+# ETA drift smaller than this is not worth a write
+ETA_STEP = timedelta(minutes=5)
+TRACKED_STATUSES = ('On Schedule', 'Delayed')
+PORT_CACHE_SECONDS = 60
+ID_CHUNK = 5000
+
+
+def _bearing(lat1, lon1, lat2, lon2):
+    phi1, phi2, dlon = math.radians(lat1), math.radians(lat2), math.radians(lon2 - lon1)
+    y = math.sin(dlon) * math.cos(phi2)
+    x = math.cos(phi1) * math.sin(phi2) - math.sin(phi1) * math.cos(phi2) * math.cos(dlon)
+    return math.degrees(math.atan2(y, x)) % 360.0
+
+
+def _distance_bearing(lat, lon, lats, lons):
+    """Great-circle km and initial bearing (degrees) from one point to arrays of points."""
+    phi1, phi2 = math.radians(lat), np.radians(lats)
+    dlon = np.radians(lons - lon)
+    a = np.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * np.cos(phi2) * np.sin(dlon / 2) ** 2
+    distance = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+    bearing = np.degrees(np.arctan2(
+        np.sin(dlon) * np.cos(phi2), math.cos(phi1) * np.sin(phi2) - math.sin(phi1) * np.cos(phi2) * np.cos(dlon),
+    )) % 360.0
+    return distance, bearing
+
+
+class PortIndex:
+    def __init__(self, rows):
+        # rows: (port_id, lat, lon)
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.lat = np.array([row[1] for row in rows], dtype=np.float64)
+        self.lon = np.array([row[2] for row in rows], dtype=np.float64)
+        self.positions = {row[0]: (row[1], row[2]) for row in rows}
+        self.zones = ZoneSet([('port', port_id, '', lat, lon, PORT_RADIUS_KM) for port_id, lat, lon in rows])
+        self.built_at = time.monotonic()
+
+    def berths(self, lat, lon):
+        """Per position, the id of the port whose radius it is inside (the nearest one), else None."""
+        found = [None] * len(lat)
+        best = [math.inf] * len(lat)
+        for fix, zone in self.zones.hits(lat, lon):
+            distance = haversine_km(lat[fix], lon[fix], self.lat[zone], self.lon[zone])
+            if distance < best[fix]:
+                best[fix], found[fix] = distance, int(self.ids[zone])
+        return found
+
+    def destination(self, lat, lon, course, origin, routes):
+        """Likeliest port ahead on ``course``: a known route from ``origin`` if any, else the nearest."""
+        candidates = self.ids != origin
+        if not candidates.any():
+            return None
+        distance, bearing = _distance_bearing(lat, lon, self.lat, self.lon)
+        if course is not None:
+            ahead = candidates & (np.abs((bearing - course + 180.0) % 360.0 - 180.0) <= DESTINATION_CONE_DEGREES)
+            if ahead.any():
+                candidates = ahead
+        indexes = np.flatnonzero(candidates).tolist()
+        known = [i for i in indexes if int(self.ids[i]) in routes]
+        if known:
+            return int(self.ids[max(known, key=lambda i: (routes[int(self.ids[i])][0], -distance[i]))])
+        return int(self.ids[min(indexes, key=lambda i: distance[i])])
+
+
+_ports = None
+
+
+def invalidate_ports():
+    global _ports
+    _ports = None
+
+
+def get_ports():
+    global _ports
+    if _ports is None or time.monotonic() - _ports.built_at > PORT_CACHE_SECONDS:
+        rows = []
+        for port_id, location in Port.objects.values_list('id', 'location'):
+            point = parse_location(location)
+            if point:
+                rows.append((port_id, *point))
+        _ports = PortIndex(rows)
+    return _ports
+
+
+def _chunks(values, size=ID_CHUNK):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class _Batch:
+    def __init__(self, ports, voyages):
+        self.ports = ports
+        self.voyages = voyages  # vessel id -> open Voyage
+        self.opened = []  # new voyages, inserted together at the end
+        self.touched = {}
+        self.routes = {}
+        self.counts = Counter()
+
+    def load_routes(self, origins):
+        # {origin: {port_to: (voyages, transit_seconds)}} out of the analytics rollups
+        origins = set(origins) - set(self.routes)
+        for origin in origins:
+            self.routes[origin] = {}
+        for chunk in _chunks(origins):
+            for origin, port_to, voyages, seconds in RouteStats.objects.filter(
+                port_from_id__in=chunk, voyages__gt=0,
+            ).values_list('port_from_id', 'port_to_id', 'voyages', 'transit_seconds'):
+                self.routes[origin][port_to] = (voyages, seconds)
+
+    def routes_from(self, origin):
+        if origin not in self.routes:
+            self.load_routes([origin])
+        return self.routes[origin]
+
+    def touch(self, voyage):
+        if voyage.pk is not None:
+            self.touched[voyage.pk] = voyage
+
+    def step(self, state, ts, lat, lon, berth):
+        moved = haversine_km(state.last_lat, state.last_lon, lat, lon)
+        hours = (ts - state.last_fix_at).total_seconds() / 3600.0
+        if hours > 0:
+            knots = moved / hours / KNOT_KMH
+            if knots > MAX_PLAUSIBLE_KNOTS:
+                self.counts['dropped'] += 1
+                return
+            state.speed_knots += SPEED_SMOOTHING * (knots - state.speed_knots)
+        if moved >= MIN_COURSE_KM:
+            state.course = _bearing(state.last_lat, state.last_lon, lat, lon)
+        state.last_fix_at, state.last_lat, state.last_lon = ts, lat, lon
+
+        if state.port_id is not None and berth != state.port_id:
+            self.depart(state, ts)
+        voyage = self.voyages.get(state.vessel_id)
+        if berth is not None and state.port_id is None and (
+            (voyage is not None and berth == voyage.port_to_id) or state.speed_knots <= ARRIVAL_KNOTS
+        ):
+            self.arrive(state, berth, ts)
+
+    def depart(self, state, ts):
+        origin, state.port_id = state.port_id, None
+        voyage = self.voyages.get(state.vessel_id)
+        if voyage is None:
+            destination = self.ports.destination(
+                state.last_lat, state.last_lon, state.course, origin, self.routes_from(origin),
+            )
+            if destination is None:
+                return
+            voyage = Voyage(
+                vessel_id=state.vessel_id, port_from_id=origin, port_to_id=destination, departure_time=ts, detected=True,
+            )
+            self.opened.append(voyage)
+            self.voyages[state.vessel_id] = voyage
+        # The voyage began with the first fix outside the port, whenever it was entered
+        voyage.departure_time = ts
+        self.touch(voyage)
+        self.counts['departed'] += 1
+
+    def arrive(self, state, berth, ts):
+        state.port_id = berth
+        voyage = self.voyages.pop(state.vessel_id, None)
+        if voyage is None:
+            return
+        if voyage.detected and berth == voyage.port_from_id and ts - voyage.departure_time < MIN_VOYAGE:
+            # Straight back in: drifting across the radius edge, not a voyage
+            if voyage.pk is None:
+                self.opened.remove(voyage)
+            else:
+                self.touched.pop(voyage.pk, None)
+                voyage.delete()
+            self.counts['discarded'] += 1
+            return
+        voyage.port_to_id, voyage.arrival_time, voyage.eta = berth, ts, ts
+        if voyage.status in TRACKED_STATUSES:
+            voyage.status = 'Completed'
+        self.touch(voyage)
+        self.counts['arrived'] += 1
+
+    def estimate(self, state):
+        voyage = self.voyages.get(state.vessel_id)
+        if voyage is None or state.port_id is not None:
+            return
+        before = (voyage.port_to_id, voyage.planned_arrival, voyage.status)
+        eta = voyage.eta
+        if voyage.detected:
+            destination = self.ports.destination(
+                state.last_lat, state.last_lon, state.course, voyage.port_from_id, self.routes_from(voyage.port_from_id),
+            )
+            if destination is not None and destination != voyage.port_to_id:
+                voyage.port_to_id, voyage.planned_arrival = destination, None
+        target = self.ports.positions.get(voyage.port_to_id)
+        if target is None:
+            return
+        if state.speed_knots >= MIN_ETA_KNOTS:
+            remaining = haversine_km(state.last_lat, state.last_lon, *target)
+            voyage.eta = state.last_fix_at + timedelta(hours=remaining / (state.speed_knots * KNOT_KMH))
+        if voyage.planned_arrival is None:
+            voyage.planned_arrival = self.plan(voyage, target)
+        if voyage.eta and voyage.planned_arrival and voyage.status in TRACKED_STATUSES:
+            voyage.status = 'Delayed' if voyage.eta > voyage.planned_arrival + DELAY_GRACE else 'On Schedule'
+        if (voyage.port_to_id, voyage.planned_arrival, voyage.status) != before or (
+            voyage.eta is not None and (eta is None or abs(voyage.eta - eta) >= ETA_STEP)
+        ):
+            self.touch(voyage)
+        else:
+            voyage.eta = eta
+
+    def plan(self, voyage, target):
+        voyages, seconds = self.routes_from(voyage.port_from_id).get(voyage.port_to_id, (0, 0))
+        if voyages:
+            return voyage.departure_time + timedelta(seconds=seconds / voyages)
+        origin = self.ports.positions.get(voyage.port_from_id)
+        if origin is None:
+            return None
+        return voyage.departure_time + timedelta(hours=haversine_km(*origin, *target) / (SERVICE_KNOTS * KNOT_KMH))
+
+
+def _open_voyages(vessel_ids):
+    voyages = {}
+    for chunk in _chunks(vessel_ids):
+        # Latest open voyage per vessel, whether an operator entered it or the tracker opened it
+        for voyage in Voyage.objects.filter(vessel_id__in=chunk, arrival_time__isnull=True).order_by('departure_time', 'id'):
+            voyages[voyage.vessel_id] = voyage
+    return voyages
+
+
+def track(history_ids):
+    """Folds the given VesselHistory fixes into each vessel's track, opening/closing voyages and updating ETAs."""
+    fixes = defaultdict(list)
+    for chunk in _chunks(history_ids):
+        for vessel_id, lat, lon, ts in VesselHistory.objects.filter(id__in=chunk).values_list(
+            'vessel_id', 'latitude', 'longitude', 'timestamp',
+        ):
+            fixes[vessel_id].append((ts, lat, lon))
+    if not fixes:
+        return {'fixes': 0, 'vessels': 0}
+
+    ports = get_ports()
+    with transaction.atomic():
+        states = VesselTrackState.objects.in_bulk(list(fixes))
+        batch = _Batch(ports, _open_voyages(list(fixes)))
+        batch.load_routes({voyage.port_from_id for voyage in batch.voyages.values()} | {
+            state.port_id for state in states.values() if state.port_id is not None
+        })
+        moved = set()
+        ordered = []
+        for vessel_id, vessel_fixes in fixes.items():
+            state = states.get(vessel_id)
+            vessel_fixes.sort()
+            if state is not None:
+                # Jobs run in ingest order, so these are only fixes reported late by the vessel
+                # itself (or a batch that failed for good): they cannot change what already happened
+                vessel_fixes = [fix for fix in vessel_fixes if fix[0] > state.last_fix_at]
+            ordered.extend((vessel_id, fix) for fix in vessel_fixes)
+        berths = ports.berths(
+            np.array([fix[1] for _, fix in ordered], dtype=np.float64),
+            np.array([fix[2] for _, fix in ordered], dtype=np.float64),
+        )
+
+        for (vessel_id, (ts, lat, lon)), berth in zip(ordered, berths):
+            state = states.get(vessel_id)
+            if state is None:
+                # First sight of this vessel: berthed if it is inside a port's radius
+                state = states[vessel_id] = VesselTrackState(
+                    vessel_id=vessel_id, last_fix_at=ts, last_lat=lat, last_lon=lon, port_id=berth,
+                )
+            else:
+                batch.step(state, ts, lat, lon, berth)
+            moved.add(vessel_id)
+        for vessel_id in moved:
+            batch.estimate(states[vessel_id])
+
+        # Upserts (INSERT ... ON CONFLICT DO UPDATE): one statement per chunk, where bulk_update
+        # would build a CASE expression per row and field
+        now = timezone.now()
+        advanced = [states[vessel_id] for vessel_id in moved]
+        for state in advanced:
+            state.updated_at = now
+        VesselTrackState.objects.bulk_create(
+            advanced, batch_size=ID_CHUNK, update_conflicts=True, unique_fields=['vessel'],
+            update_fields=['last_fix_at', 'last_lat', 'last_lon', 'speed_knots', 'course', 'port', 'updated_at'],
+        )
+        Voyage.objects.bulk_create(batch.opened, batch_size=ID_CHUNK)
+        voyages = list(batch.touched.values())
+        for voyage in voyages:
+            # Upserts bypass auto_now; delta-sync clients rely on updated_at moving
+            voyage.updated_at = now
+        Voyage.objects.bulk_create(
+            voyages, batch_size=ID_CHUNK, update_conflicts=True, unique_fields=['id'],
+            update_fields=['port_to', 'departure_time', 'arrival_time', 'status', 'eta', 'planned_arrival', 'updated_at'],
+        )
+        # ...and model signals, so the analytics rollups are moved here, in one pass
+        analytics.record_changes(
+            [(None, voyage.rollup_state()) for voyage in batch.opened]
+            + [(voyage._rollup_state, voyage.rollup_state()) for voyage in voyages]
+        )
+        for voyage in batch.opened + voyages:
+            voyage._rollup_state = voyage.rollup_state()
+
+    return {
+        'fixes': len(ordered), 'vessels': len(fixes), 'voyages_opened': len(batch.opened),
+        'voyages_updated': len(voyages), **batch.counts,
+    }
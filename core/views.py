@@ -1,18 +1,70 @@
-from rest_framework import viewsets, status
+from array import array
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from rest_framework import mixins, viewsets, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.views import APIView
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework.exceptions import NotAcceptable, ValidationError
+import asyncio
+import hmac
+import json
+import math
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.contrib.auth.hashers import make_password
 from django.db.models import Q
-from .models import User, Vessel, Port, VesselHistory, Voyage, Event, Notification
+from django.utils import timezone
+from .models import User, Vessel, Port, VesselHistory, Voyage, Event, NotificationDelivery, Job
 from .serializers import (
     UserSerializer, VesselSerializer, PortSerializer, 
     VesselHistorySerializer, VoyageSerializer, EventSerializer, 
-    NotificationSerializer
+    NotificationSerializer, NotificationDeliverySerializer, JobSerializer
 )
+from .ingestion import ingest_fixes, parse_timestamp
+from .simplify import douglas_peucker, zoom_tolerance
+from .sync import InvalidCursor, build_sync_payload
+from .realtime import HEARTBEAT_SECONDS, TICK_SECONDS, get_broker
+from .pagination import (
+    TimestampCursorPagination, VoyageCursorPagination, NotificationCursorPagination,
+    ColumnarHistoryPagination, JobCursorPagination,
+)
+from .geo import bbox_q, filter_within_radius, parse_bbox, parse_point
+from .asyncviews import AsyncListMixin
+from .caching import CachedResponseMixin
+from .export import HISTORY_COLUMNS, VOYAGE_COLUMNS, export_renderers, streaming_export
+from .permissions import IsAnalystOrAdmin
+from . import analytics, clusters, jobs, notifications
+from .authentication import RoleTokenAuthentication, revoke
+from .columnar import HISTORY_FIELDS, ColumnarListMixin, history_columns, vessel_columns
+from .metrics import TimedViewMixin, registry
+from .search import SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT, search_q, search_vessels
+
+
+# --- Spatial Filters (?bbox=west,south,east,north / ?near=lat,lon&radius_km=) ---
+def apply_spatial_filters(queryset, params, lat_field, lon_field):
+    try:
+        if params.get('bbox'):
+            queryset = queryset.filter(bbox_q(parse_bbox(params['bbox']), lat_field, lon_field))
+        if params.get('near'):
+            lat, lon = parse_point(params['near'])
+            radius_km = float(params.get('radius_km', 50))
+            if not math.isfinite(radius_km) or radius_km <= 0:
+                raise ValueError('radius_km must be a positive number')
+            queryset = filter_within_radius(queryset, lat, lon, radius_km, lat_field, lon_field)
+    except ValueError as exc:
+        raise ValidationError({'error': str(exc)})
+    return queryset
 
 # --- 1. User Registration (RBAC Handshake) ---
-class RegisterView(APIView):
+class RegisterView(TimedViewMixin, APIView):
     permission_classes = [AllowAny] 
 
     def post(self, request):
@@ -34,7 +86,7 @@ class RegisterView(APIView):
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 # --- 2. Password Reset Request ---
-class PasswordResetRequestView(APIView):
+class PasswordResetRequestView(TimedViewMixin, APIView):
     permission_classes = [AllowAny]
 
     def post(self, request):
@@ -44,10 +96,19 @@ class PasswordResetRequestView(APIView):
             return Response({'message': 'Security reset link dispatched.'}, status=status.HTTP_200_OK)
         return Response({'error': 'Email not recognized in fleet database.'}, status=status.HTTP_404_NOT_FOUND)
 
+# --- Sign out everywhere: refuse every access & refresh token issued to the caller so far ---
+class TokenRevokeView(TimedViewMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        revoke([request.user.id])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 # --- 3. Vessel Management (Search & Surveillance Logic) ---
-class VesselViewSet(viewsets.ModelViewSet):
+class VesselViewSet(TimedViewMixin, ColumnarListMixin, CachedResponseMixin, AsyncListMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     serializer_class = VesselSerializer
+    cache_models = (Vessel,)
 
     def get_queryset(self):
         user = self.request.user
@@ -59,31 +120,137 @@ class VesselViewSet(viewsets.ModelViewSet):
         else:
             queryset = Vessel.objects.filter(status='Active')
 
-        # Intelligence Filter: Name or MMSI Identifier
+        # Intelligence Filter: Name or MMSI Identifier (indexed prefixes, see core/search.py)
         if search_query:
-            queryset = queryset.filter(
-                Q(name__icontains=search_query) | Q(mmsi__icontains=search_query)
-            )
-        return queryset
+            queryset = queryset.filter(search_q(search_query))
+
+        # Map Viewport / Proximity Filters
+        return apply_spatial_filters(
+            queryset, self.request.query_params, 'last_position_lat', 'last_position_lon'
+        )
+
+    # Map Layer: Accept: application/vnd.maritime.columnar (see core/columnar.py)
+    def columnar_list(self, request):
+        return self.cached_response(request, lambda: Response(vessel_columns(self.filter_queryset(self.get_queryset()))))
+
+    # Search Box: /api/vessels/search/?q=<mmsi or name>&limit= (ranked, best match first)
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        try:
+            limit = int(request.query_params.get('limit', SEARCH_DEFAULT_LIMIT))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({'error': 'limit must be positive'}, status=status.HTTP_400_BAD_REQUEST)
+        vessels = search_vessels(self.get_queryset(), request.query_params.get('q', ''), min(limit, SEARCH_MAX_LIMIT))
+        return Response(self.get_serializer(vessels, many=True).data)
+
+    # Low-zoom Map Layer: /api/vessels/clusters/?zoom=&bbox=west,south,east,north (see core/clusters.py)
+    # Up to CLUSTER_MAX_ZOOM: counted clusters from the cell index; closer in: the vessels themselves
+    @action(detail=False, methods=['get'])
+    def clusters(self, request):
+        params = request.query_params
+        try:
+            zoom = float(params.get('zoom', ''))
+            if not math.isfinite(zoom) or zoom < 0:
+                raise ValueError
+            zoom = int(zoom)
+        except ValueError:
+            return Response({'error': 'zoom must be a non-negative number'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            bbox = parse_bbox(params['bbox']) if params.get('bbox') else None
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return self.cached_response(request, lambda: Response(self._clusters(request, zoom, bbox)))
+
+    def _clusters(self, request, zoom, bbox):
+        if zoom > clusters.MAX_ZOOM:
+            vessels = self.get_serializer(self.filter_queryset(self.get_queryset()), many=True).data
+            return {'zoom': zoom, 'clustered': False, 'total': len(vessels), 'vessels': vessels}
+        # Same visibility as the list: operators only see active vessels
+        statuses = None if getattr(request.user, 'role', '').lower() == 'admin' else ['Active']
+        found = clusters.clusters(bbox, zoom, statuses)
+        return {'zoom': zoom, 'clustered': True, 'total': sum(cluster['count'] for cluster in found), 'clusters': found}
+
+    # Historical Voyage Replay: /api/vessels/{id}/track/?from=&to=&tolerance= (or &zoom=)
+    @action(detail=True, methods=['get'])
+    def track(self, request, pk=None):
+        vessel = self.get_object()
+        params = request.query_params
+        try:
+            end = parse_timestamp(params.get('to'))
+            start = parse_timestamp(params['from']) if params.get('from') else end - timedelta(days=1)
+            if 'tolerance' in params:
+                tolerance = float(params['tolerance'])
+            elif 'zoom' in params:
+                zoom = float(params['zoom'])
+                # nan / inf would overflow here or silently collapse the track to its endpoints
+                if not math.isfinite(zoom):
+                    raise ValueError('zoom must be a finite number')
+                tolerance = zoom_tolerance(zoom)
+            else:
+                tolerance = 0.0
+            if not math.isfinite(tolerance):
+                raise ValueError('tolerance must be a finite number')
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if start > end or tolerance < 0:
+            return Response({'error': 'Invalid window or tolerance'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Stream the window off the (vessel, timestamp) index into flat arrays; no model objects
+        lats, lons, times = array('d'), array('d'), array('d')
+        rows = (
+            VesselHistory.objects.filter(vessel=vessel, timestamp__gte=start, timestamp__lte=end)
+            .order_by('timestamp', 'id').values_list('latitude', 'longitude', 'timestamp')
+        )
+        for lat, lon, moment in rows.iterator(chunk_size=10000):
+            lats.append(lat)
+            lons.append(lon)
+            times.append(moment.timestamp())
+
+        kept = douglas_peucker(np.frombuffer(lats), np.frombuffer(lons), tolerance)
+        return Response({
+            'vessel': vessel.id,
+            'from': start,
+            'to': end,
+            'tolerance': tolerance,
+            'raw_points': len(lats),
+            'points': [
+                {
+                    'latitude': lats[i],
+                    'longitude': lons[i],
+                    'timestamp': datetime.fromtimestamp(times[i], tz=dt_timezone.utc),
+                }
+                for i in kept.tolist()
+            ],
+        })
 
 # --- 4. Voyage & Analytics Logic ---
-class VoyageViewSet(viewsets.ModelViewSet):
+class VoyageViewSet(TimedViewMixin, AsyncListMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
-    queryset = Voyage.objects.all().order_by('-id')
+    queryset = Voyage.objects.select_related('vessel', 'port_from', 'port_to').order_by('-id')
     serializer_class = VoyageSerializer
+    pagination_class = VoyageCursorPagination
 
 # --- 5. Risk & Safety Intelligence ---
-class EventViewSet(viewsets.ModelViewSet):
+class EventViewSet(TimedViewMixin, AsyncListMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
-    queryset = Event.objects.all().order_by('-timestamp')
+    queryset = Event.objects.select_related('vessel').order_by('-timestamp')
     serializer_class = EventSerializer
+    pagination_class = TimestampCursorPagination
 
 # --- 6. Identity & Infrastructure Components ---
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(TimedViewMixin, CachedResponseMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
+    cache_models = (User,)
+
+    def cache_scope(self, request):
+        # Non-admins only ever see themselves, so their entries are per user
+        role = super().cache_scope(request)
+        return role if role == 'admin' else f'{role}:{request.user.id}'
 
     def get_queryset(self):
         # Prevent non-admins from browsing the full user list
@@ -91,17 +258,363 @@ class UserViewSet(viewsets.ModelViewSet):
             return User.objects.all()
         return User.objects.filter(id=self.request.user.id)
 
-class PortViewSet(viewsets.ModelViewSet):
+class PortViewSet(TimedViewMixin, CachedResponseMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     queryset = Port.objects.all()
     serializer_class = PortSerializer
+    cache_models = (Port,)
 
-class VesselHistoryViewSet(viewsets.ModelViewSet):
+class VesselHistoryViewSet(TimedViewMixin, ColumnarListMixin, AsyncListMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
-    queryset = VesselHistory.objects.all().order_by('-timestamp')
+    queryset = VesselHistory.objects.select_related('vessel').order_by('-timestamp')
     serializer_class = VesselHistorySerializer
+    pagination_class = TimestampCursorPagination
+
+    def get_queryset(self):
+        return apply_spatial_filters(super().get_queryset(), self.request.query_params, 'latitude', 'longitude')
+
+    def columnar_list(self, request):
+        paginator = ColumnarHistoryPagination()
+        rows = paginator.paginate_queryset(
+            self.filter_queryset(self.get_queryset()).values(*HISTORY_FIELDS), request, view=self
+        )
+        return Response(history_columns(rows, next=paginator.get_next_link(), previous=paginator.get_previous_link()))
+
+# --- Notifications: each user's own inbox; analysts & admins send targeted alerts ---
+class NotificationViewSet(TimedViewMixin, AsyncListMixin, mixins.CreateModelMixin, mixins.ListModelMixin,
+                          mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    permission_classes = [IsAuthenticated]
+    pagination_class = NotificationCursorPagination
+    # /api/notifications/{notification id}/
+    lookup_field = 'notification_id'
+    lookup_url_kwarg = 'pk'
+
+    def get_permissions(self):
+        if self.action == 'create':
+            return [IsAnalystOrAdmin()]
+        return super().get_permissions()
+
+    def get_serializer_class(self):
+        return NotificationSerializer if self.action == 'create' else NotificationDeliverySerializer
+
+    def get_queryset(self):
+        queryset = NotificationDelivery.objects.filter(user_id=self.request.user.id).select_related('notification')
+        if self.request.query_params.get('unread', '').lower() in ('1', 'true', 'yes'):
+            queryset = queryset.filter(read_at__isnull=True)
+        return queryset
+
+    # Badge poll: /api/notifications/unread-count/
+    @action(detail=False, methods=['get'], url_path='unread-count')
+    def unread_count(self, request):
+        return Response({'unread': notifications.unread_count(request.user)})
+
+    # POST /api/notifications/mark-read/ {"ids": [...]} | {"before": <timestamp>} | {} for everything
+    @action(detail=False, methods=['post'], url_path='mark-read')
+    def mark_read(self, request):
+        ids = request.data.get('ids')
+        try:
+            if ids is not None and not isinstance(ids, list):
+                raise ValueError('ids must be a list of notification ids')
+            ids = None if ids is None else [int(value) for value in ids]
+            before = parse_timestamp(request.data['before']) if request.data.get('before') else None
+        except (TypeError, ValueError) as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        marked = notifications.mark_read(request.user, ids, before)
+        return Response({'marked': marked})
+
+    @action(detail=True, methods=['post'])
+    def read(self, request, pk=None):
+        delivery = self.get_object()
+        notifications.mark_read(request.user, [delivery.notification_id])
+        delivery.refresh_from_db()
+        return Response(self.get_serializer(delivery).data)
+
+# --- Background Jobs: status for everyone's own jobs; admins see, queue and retry any ---
+class JobViewSet(TimedViewMixin, viewsets.ModelViewSet):
+    permission_classes = [IsAuthenticated]
+    serializer_class = JobSerializer
+    pagination_class = JobCursorPagination
+    http_method_names = ['get', 'post', 'head', 'options']
+
+    def is_admin(self):
+        return getattr(self.request.user, 'role', '').lower() == 'admin'
+
+    def get_queryset(self):
+        queryset = Job.objects.select_related('created_by')
+        if not self.is_admin():
+            queryset = queryset.filter(created_by_id=self.request.user.id)
+        for field in ('status', 'task'):
+            if self.request.query_params.get(field):
+                queryset = queryset.filter(**{field: self.request.query_params[field]})
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        if not self.is_admin():
+            return Response({'error': 'Only admins can queue jobs.'}, status=status.HTTP_403_FORBIDDEN)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        delay = max((data['run_at'] - timezone.now()).total_seconds(), 0) if data.get('run_at') else 0
+        try:
+            job = jobs.enqueue(
+                data['task'], data.get('payload') or {}, delay=delay, priority=data.get('priority', 0),
+                created_by=request.user,
+            )
+        except LookupError as exc:
+            return Response({'task': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(job).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'])
+    def retry(self, request, pk=None):
+        if not self.is_admin():
+            return Response({'error': 'Only admins can retry jobs.'}, status=status.HTTP_403_FORBIDDEN)
+        job = self.get_object()
+        if not jobs.retry(job):
+            return Response({'error': 'Only failed jobs can be retried.'}, status=status.HTTP_409_CONFLICT)
+        job.refresh_from_db()
+        return Response(self.get_serializer(job).data)
+
+# --- 7. Bulk AIS Ingestion (Feed Gateway) ---
+class PositionIngestView(TimedViewMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    max_fixes = getattr(settings, 'INGEST_MAX_FIXES', 50000)
+
+    def post(self, request):
+        fixes = request.data.get('fixes') if isinstance(request.data, dict) else request.data
+        if not isinstance(fixes, list):
+            return Response({'error': 'Expected a list of fixes or {"fixes": [...]}'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(fixes) > self.max_fixes:
+            return Response({'error': f'At most {self.max_fixes} fixes per request'}, status=status.HTTP_400_BAD_REQUEST)
+
+        batch_size = request.query_params.get('batch_size')
+        try:
+            batch_size = int(batch_size) if batch_size else None
+            if batch_size is not None and batch_size < 1:
+                raise ValueError
+        except ValueError:
+            return Response({'error': 'batch_size must be a positive integer'}, status=status.HTTP_400_BAD_REQUEST)
 
-class NotificationViewSet(viewsets.ModelViewSet):
+        report = ingest_fixes(fixes, batch_size=batch_size)
+        response_status = status.HTTP_201_CREATED if report['accepted'] else status.HTTP_200_OK
+        return Response(report, status=response_status)
+
+
+# --- 8. Delta Sync (Dashboard Polling) ---
+class SyncView(TimedViewMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            payload = build_sync_payload(
+                request.user, request.query_params.get('since'), context={'request': request}
+            )
+        except InvalidCursor as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(payload)
+
+
+# --- 9. Live Push Stream (Server-Sent Events, requires the ASGI server) ---
+async def live_stream(request):
+    # EventSource cannot set headers, so the access token may also come as ?token=
+    authenticator = RoleTokenAuthentication()
+    header = authenticator.get_header(request)
+    raw_token = authenticator.get_raw_token(header) if header else request.GET.get('token', '').encode()
+    try:
+        validated = authenticator.get_validated_token(raw_token)
+        user = await sync_to_async(authenticator.get_user)(validated)
+    except (InvalidToken, TokenError, AuthenticationFailed) as exc:
+        return JsonResponse({'error': str(exc)}, status=status.HTTP_401_UNAUTHORIZED)
+
+    bbox = None
+    if request.GET.get('bbox'):
+        try:
+            bbox = parse_bbox(request.GET['bbox'])
+        except ValueError as exc:
+            return JsonResponse({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    is_admin = getattr(user, 'role', '').lower() == 'admin'
+
+    async def events():
+        broker = get_broker()
+        subscription = broker.subscribe(bbox=bbox, active_only=not is_admin, user_id=user.id)
+        last_sent = time.monotonic()
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                await asyncio.sleep(TICK_SECONDS)
+                messages = subscription.drain()
+                for kind, payload in messages:
+                    yield f'event: {kind}\ndata: {json.dumps(payload, cls=JSONEncoder)}\n\n'
+                if messages:
+                    last_sent = time.monotonic()
+                elif time.monotonic() - last_sent >= HEARTBEAT_SECONDS:
+                    last_sent = time.monotonic()
+                    yield ': keep-alive\n\n'
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# --- 10. Prometheus Metrics (/metrics: scrapers send METRICS_TOKEN, or an admin's session / JWT) ---
+def _metrics_reader(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        try:
+            authenticated = RoleTokenAuthentication().authenticate(request)
+        except (InvalidToken, TokenError, AuthenticationFailed):
+            authenticated = None
+        user = authenticated[0] if authenticated else None
+    return user is not None and (user.is_staff or getattr(user, 'role', '').lower() == 'admin')
+
+
+def prometheus_metrics(request):
+    # Per-view traffic and timings are not public, so there is no anonymous access even without a token
+    if not _metrics_reader(request):
+        return HttpResponse('Unauthorized', status=status.HTTP_401_UNAUTHORIZED, content_type='text/plain')
+    return HttpResponse(registry.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# --- 11. Bulk Export (analysts & admins; CSV, NDJSON or Parquet via Accept / ?format=) ---
+def _id_list(value):
+    try:
+        return [int(part) for part in value.split(',') if part.strip()]
+    except ValueError:
+        raise ValueError('expected a comma-separated list of integers')
+
+
+class ExportView(TimedViewMixin, APIView):
+    """Base for streamed exports; subclasses set ``queryset`` (in stream order), ``columns`` and ``time_field``."""
+    permission_classes = [IsAnalystOrAdmin]
+    queryset = None
+    export_name = None
+    columns = None
+    time_field = None
+
+    def get_renderers(self):
+        return [renderer() for renderer in export_renderers()]
+
+    def perform_content_negotiation(self, request, force=False):
+        try:
+            return super().perform_content_negotiation(request, force)
+        except Http404:
+            # DRF answers an unknown ?format= with 404; say which formats this server can write
+            formats = ', '.join(renderer.format for renderer in self.get_renderers())
+            raise NotAcceptable(f'format must be one of: {formats} (parquet needs pyarrow installed)')
+
+    def get_queryset(self):
+        assert self.queryset is not None, f'{self.__class__.__name__} must set .queryset'
+        return self.queryset.all()
+
+    def filter_queryset(self, queryset, params):
+        if params.get('vessel'):
+            queryset = queryset.filter(vessel_id__in=_id_list(params['vessel']))
+        if params.get('mmsi'):
+            queryset = queryset.filter(vessel__mmsi__in=_id_list(params['mmsi']))
+        if params.get('from'):
+            queryset = queryset.filter(**{f'{self.time_field}__gte': parse_timestamp(params['from'])})
+        if params.get('to'):
+            queryset = queryset.filter(**{f'{self.time_field}__lte': parse_timestamp(params['to'])})
+        return queryset
+
+    def get(self, request):
+        try:
+            queryset = self.filter_queryset(self.get_queryset(), request.query_params)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return streaming_export(request, queryset, self.columns, self.export_name, request.accepted_renderer)
+
+
+# /api/export/history/?vessel=&mmsi=&from=&to=&bbox=&near=&radius_km=
+class HistoryExportView(ExportView):
+    export_name = 'history'
+    columns = HISTORY_COLUMNS
+    time_field = 'timestamp'
+    # Served in (timestamp, id) index order, so the cursor streams without a sort
+    queryset = VesselHistory.objects.order_by('timestamp', 'id')
+
+    def filter_queryset(self, queryset, params):
+        queryset = super().filter_queryset(queryset, params)
+        return apply_spatial_filters(queryset, params, 'latitude', 'longitude')
+
+
+# /api/export/voyages/?vessel=&mmsi=&port=&status=&from=&to= (window on departure_time)
+class VoyageExportView(ExportView):
+    export_name = 'voyages'
+    columns = VOYAGE_COLUMNS
+    time_field = 'departure_time'
+    queryset = Voyage.objects.order_by('departure_time', 'id')
+
+    def filter_queryset(self, queryset, params):
+        queryset = super().filter_queryset(queryset, params)
+        if params.get('port'):
+            ports = _id_list(params['port'])
+            queryset = queryset.filter(Q(port_from_id__in=ports) | Q(port_to_id__in=ports))
+        if params.get('status'):
+            queryset = queryset.filter(status__in=params['status'].split(','))
+        return queryset
+
+
+# --- 12. Analytics Dashboards (pre-aggregated rollups, see core/analytics.py) ---
+def _limit(params):
+    try:
+        limit = int(params.get('limit', analytics.DEFAULT_LIMIT))
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, analytics.MAX_LIMIT)
+
+
+# /api/analytics/port-traffic/?port=&from=&to=&bucket=hour|day (no port: busiest ports, &limit=)
+class PortTrafficView(TimedViewMixin, APIView):
     permission_classes = [IsAuthenticated]
-    queryset = Notification.objects.all().order_by('-created_at')
-    serializer_class = NotificationSerializer
\ No newline at end of file
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            end = parse_timestamp(params.get('to'))
+            start = parse_timestamp(params['from']) if params.get('from') else end - timedelta(hours=24)
+            if start >= end:
+                raise ValueError('from must be before to')
+            if end - start > timedelta(days=analytics.MAX_WINDOW_DAYS):
+                raise ValueError(f'window is limited to {analytics.MAX_WINDOW_DAYS} days')
+            bucket = params.get('bucket', 'hour')
+            if bucket not in ('hour', 'day'):
+                raise ValueError('bucket must be hour or day')
+            if params.get('port'):
+                return Response({
+                    'from': start, 'to': end, 'bucket': bucket,
+                    'series': analytics.port_traffic(_id_list(params['port']), start, end, bucket),
+                })
+            return Response({'from': start, 'to': end, 'ports': analytics.busiest_ports(start, end, _limit(params))})
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+# /api/analytics/routes/?port_from=&port_to=&limit= (busiest port pairs, average transit time)
+class RouteStatsView(TimedViewMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            routes = analytics.route_stats(
+                _id_list(params.get('port_from', '')), _id_list(params.get('port_to', '')), _limit(params),
+            )
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'routes': routes})
+
+
+# /api/analytics/voyage-status/ (voyages per status, share delayed)
+class VoyageStatusView(TimedViewMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(analytics.status_counts())
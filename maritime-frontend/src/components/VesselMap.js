@@ -1,5 +1,5 @@
-import React, { useEffect, useState } from 'react';
-import { MapContainer, TileLayer, Marker, Popup, Polyline, Circle } from 'react-leaflet';
+import React, { useEffect, useRef, useState } from 'react';
+import { MapContainer, TileLayer, Marker, Popup, Polyline, Circle, CircleMarker, Tooltip, useMap, useMapEvents } from 'react-leaflet';
 import axios from 'axios';
 import 'leaflet/dist/leaflet.css';
 import L from 'leaflet';
@@ -16,6 +16,69 @@ const calculateDistance = (lat1, lon1, lat2, lon2) => {
   return R * c;
 };
 
+// --- Helper: Apply a delta-sync page to a local table ---
+const HISTORY_CAP = 5000;
+const mergeRows = (rows, changed = [], deleted = [], reset = false) => {
+  const byId = new Map((reset ? [] : rows).map(row => [row.id, row]));
+  changed.forEach(row => byId.set(row.id, row));
+  deleted.forEach(id => byId.delete(id));
+  return Array.from(byId.values());
+};
+
+// --- Low-Zoom Clusters: counted server-side per viewport (/api/vessels/clusters/) ---
+// Tells the map whether it is clustered; once the server hands back individual vessels
+// instead, the live vessel markers take over
+const clusterRadius = (count) => Math.min(8 + 12 * Math.log10(count), 36);
+
+const ClusterLayer = ({ visible, onClustered }) => {
+  const map = useMap();
+  const [clusters, setClusters] = useState(null);
+
+  const load = async () => {
+    const token = localStorage.getItem('access_token');
+    if (!token) return;
+    const bounds = map.getBounds();
+    const params = { zoom: map.getZoom() };
+    // Leaflet bounds run past the antimeridian when the world repeats; the API wants plain degrees
+    if (bounds.getEast() - bounds.getWest() < 360) {
+      const wrap = lon => (lon < -180 || lon > 180 ? ((lon + 540) % 360) - 180 : lon);
+      params.bbox = [
+        wrap(bounds.getWest()), Math.max(bounds.getSouth(), -90),
+        wrap(bounds.getEast()), Math.min(bounds.getNorth(), 90)
+      ].join(',');
+    }
+    try {
+      const { data } = await axios.get('http://127.0.0.1:8000/api/vessels/clusters/', {
+        headers: { Authorization: `Bearer ${token}` }, params
+      });
+      setClusters(data.clustered ? data.clusters : null);
+      onClustered(data.clustered);
+    } catch (err) {
+      console.error("Cluster Layer Error:", err);
+    }
+  };
+
+  useMapEvents({ moveend: load });
+  useEffect(() => {
+    load();
+    const interval = setInterval(load, 15000);
+    return () => clearInterval(interval);
+  }, []);
+
+  if (!visible || !clusters) return null;
+  return clusters.map(c => (
+    <CircleMarker
+      key={`${c.bbox[0]},${c.bbox[3]}`}
+      center={[c.lat, c.lon]}
+      radius={clusterRadius(c.count)}
+      pathOptions={{ color: '#1d4ed8', fillColor: '#3b82f6', fillOpacity: 0.6, weight: 1 }}
+      eventHandlers={{ click: () => map.fitBounds([[c.bbox[1], c.bbox[0]], [c.bbox[3], c.bbox[2]]]) }}
+    >
+      <Tooltip direction="center" permanent>{c.count}</Tooltip>
+    </CircleMarker>
+  ));
+};
+
 // --- Leaflet Icon Fixes (Presentation Requirement: Stable Visuals) ---
 delete L.Icon.Default.prototype._getIconUrl;
 L.Icon.Default.mergeOptions({
@@ -48,40 +111,76 @@ const VesselMap = ({ search = "", activeModule = "vessels", showWeather = false
   const [events, setEvents] = useState([]);
   const [voyages, setVoyages] = useState([]);
   const [notifications, setNotifications] = useState([]);
+  const [clustered, setClustered] = useState(false);
   
   const [userRole] = useState((localStorage.getItem('user_role') || 'operator').toLowerCase());
 
+  // Delta-sync state survives re-renders without triggering them
+  const syncCursor = useRef(null);
+  const tables = useRef({ vessels: [], ports: [], history: [], events: [], voyages: [] });
+
   useEffect(() => {
     fetchData();
     const interval = setInterval(() => { fetchData(); }, 15000); // Faster refresh for demo
     return () => clearInterval(interval);
   }, []);
 
+  // Live Push: apply streamed position updates between sync polls (ASGI server only)
+  useEffect(() => {
+    const token = localStorage.getItem('access_token');
+    if (!token || !window.EventSource) return;
+
+    const source = new EventSource(`http://127.0.0.1:8000/api/stream/?token=${encodeURIComponent(token)}`);
+    source.addEventListener('position', (msg) => {
+      const update = JSON.parse(msg.data);
+      const local = tables.current;
+      const others = local.vessels.filter(v => v.id !== update.id);
+      if (update.in_view) {
+        const current = local.vessels.find(v => v.id === update.id) || {};
+        others.push({
+          ...current, id: update.id, mmsi: update.mmsi, name: update.name,
+          vessel_type: update.vessel_type, status: update.status,
+          last_position_lat: update.lat, last_position_lon: update.lon
+        });
+      }
+      local.vessels = others;
+      setVessels(others);
+    });
+    return () => source.close();
+  }, []);
+
   const fetchData = async () => {
     try {
       const token = localStorage.getItem('access_token');
       if (!token) return;
 
       const authConfig = { headers: { Authorization: `Bearer ${token}` } };
-      
-      // Robust API Fetching: Ensures map loads even if one endpoint fails
-      const results = await Promise.allSettled([
-        axios.get('http://127.0.0.1:8000/api/vessels/', authConfig),
-        axios.get('http://127.0.0.1:8000/api/ports/', authConfig),
-        axios.get('http://127.0.0.1:8000/api/history/', authConfig),
-        axios.get('http://127.0.0.1:8000/api/events/', authConfig),
-        axios.get('http://127.0.0.1:8000/api/voyages/', authConfig)
-      ]);
-
-      if (results[0].status === 'fulfilled') setVessels(results[0].value.data);
-      if (results[1].status === 'fulfilled') setPorts(results[1].value.data);
-      if (results[2].status === 'fulfilled') setHistory(results[2].value.data);
-      if (results[3].status === 'fulfilled') setEvents(results[3].value.data);
-      if (results[4].status === 'fulfilled') setVoyages(results[4].value.data);
-
-      if (results[0].status === 'fulfilled' && results[1].status === 'fulfilled') {
-          runSafetyAnalysis(results[0].value.data, results[1].value.data);
-      }
+
+      // Delta Sync: one request returning only rows changed since our last cursor
+      const cursor = syncCursor.current;
+      const { data } = await axios.get('http://127.0.0.1:8000/api/sync/', {
+        ...authConfig,
+        params: cursor ? { since: cursor } : {}
+      });
+      syncCursor.current = data.cursor;
+
+      const local = tables.current;
+      ['vessels', 'ports', 'events', 'voyages'].forEach(name => {
+        local[name] = mergeRows(local[name], data.changes[name], data.deleted[name], data.full);
+      });
+      local.events.sort((a, b) => (a.timestamp < b.timestamp ? 1 : -1));
+      local.voyages.sort((a, b) => b.id - a.id);
+      local.history = (data.full ? data.changes.history : [...local.history, ...data.changes.history]).slice(-HISTORY_CAP);
+
+      setVessels(local.vessels);
+      setPorts(local.ports);
+      setHistory(local.history);
+      setEvents(local.events);
+      setVoyages(local.voyages);
+      runSafetyAnalysis(local.vessels, local.ports);
+
+      // Catching up after being offline: keep pulling until the server is drained
+      if (data.has_more) fetchData();
     } catch (err) { 
       console.error("Satellite Sync Error:", err); 
     } finally { setLoading(false); }
@@ -105,6 +204,8 @@ const VesselMap = ({ search = "", activeModule = "vessels", showWeather = false
     (v.mmsi && v.mmsi.toString().includes(search))
   );
 
+  const showVessels = activeModule === 'vessels' || activeModule === 'analytics';
+
   if (loading) return <div style={loadingStyle}>Connecting to Global AIS Network...</div>;
 
   return (
@@ -116,8 +217,11 @@ const VesselMap = ({ search = "", activeModule = "vessels", showWeather = false
           {/* Historical Trail (Rendered during search) */}
           {search && <Polyline positions={history.map(h => [h.latitude, h.longitude])} color="#3b82f6" weight={2} dashArray="5, 5" />}
 
+          {/* VESSEL CLUSTERS (low zoom; a search shows its matches individually) */}
+          <ClusterLayer visible={showVessels && !search} onClustered={setClustered} />
+
           {/* VESSELS LAYER */}
-          {(activeModule === 'vessels' || activeModule === 'analytics') && filteredVessels.map(v => (
+          {showVessels && (search || !clustered) && filteredVessels.map(v => (
             <Marker key={v.id} position={[v.last_position_lat, v.last_position_lon]} icon={blueIcon}>
               <Popup>
                 <div style={{ minWidth: '150px' }}>
@@ -2,6 +2,8 @@
 ASGI config for maritime_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+This is the production entry point (see Procfile): besides the REST API it serves
+the long-lived /api/stream/ Server-Sent Events channel.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -1,8 +1,10 @@
 import os
 import environ
 import dj_database_url
+from importlib.util import find_spec
 from pathlib import Path
 from datetime import timedelta
+from django.core.exceptions import ImproperlyConfigured
 
 # --- 1. BASE DIRECTORY DEFINITION ---
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -18,13 +20,42 @@ DEBUG = env.bool('DEBUG', default=True)
 ALLOWED_HOSTS = ['127.0.0.1', 'localhost', '.onrender.com']
 
 # --- 4. DATABASE CONFIGURATION ---
+# Postgres only: take connections from a psycopg pool per process instead of keeping one open
+# per thread. Needs psycopg 3, which requirements.txt leaves out because Django prefers it to
+# psycopg2 once installed: pip install "psycopg[binary,pool]". Size it for the threads of a
+# worker, ASYNC_READ_THREADS included.
+DATABASE_POOL = env.bool('DATABASE_POOL', default=False)
+DATABASE_POOL_MIN_SIZE = env.int('DATABASE_POOL_MIN_SIZE', default=2)
+DATABASE_POOL_MAX_SIZE = env.int('DATABASE_POOL_MAX_SIZE', default=10)
+
+
+def database_config(url):
+    config = dj_database_url.parse(url, conn_max_age=600)
+    if DATABASE_POOL and config['ENGINE'] == 'django.db.backends.postgresql':
+        if find_spec('psycopg') is None or find_spec('psycopg_pool') is None:
+            raise ImproperlyConfigured('DATABASE_POOL needs psycopg 3 with its pool: pip install "psycopg[binary,pool]"')
+        config['CONN_MAX_AGE'] = 0  # The pool keeps the connections; Django refuses both
+        config.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': DATABASE_POOL_MIN_SIZE, 'max_size': DATABASE_POOL_MAX_SIZE, 'timeout': 10,
+        }
+    return config
+
+
 DATABASES = {
-    'default': dj_database_url.config(
-        default=env('DATABASE_URL', default=f'sqlite:///{BASE_DIR}/db.sqlite3'),
-        conn_max_age=600
-    )
+    'default': database_config(env('DATABASE_URL', default=f'sqlite:///{BASE_DIR}/db.sqlite3')),
 }
 
+# Read replicas, comma-separated URLs, become aliases replica_1, replica_2, ... (core/replicas.py).
+# GET requests read a random one; a client that just wrote reads the primary for
+# REPLICA_STICKY_SECONDS, which should exceed the replicas' usual lag. To try it locally, copy
+# the SQLite file and set DATABASE_REPLICA_URLS=sqlite:////absolute/path/to/the/copy.sqlite3
+DATABASE_REPLICAS = []
+for number, url in enumerate(env.list('DATABASE_REPLICA_URLS', default=[]), start=1):
+    DATABASES[f'replica_{number}'] = {**database_config(url), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica_{number}')
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+REPLICA_STICKY_SECONDS = env.int('REPLICA_STICKY_SECONDS', default=5)
+
 # --- 5. APPLICATION DEFINITION ---
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -41,9 +72,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware', # Outermost: times everything below it
+    'core.middleware.ReplicaRoutingMiddleware', # Only with DATABASE_REPLICA_URLS set
     'corsheaders.middleware.CorsMiddleware', 
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware', # MUST stay here
+    'core.middleware.StaticFilesMiddleware', # WhiteNoise, async-capable; MUST stay here
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -70,6 +103,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'maritime_backend.wsgi.application'
+ASGI_APPLICATION = 'maritime_backend.asgi.application'
 
 # --- 6. AUTHENTICATION & USER MODELS ---
 AUTH_USER_MODEL = 'core.User'
@@ -105,7 +139,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.RoleTokenAuthentication',
     ),
 }
 
@@ -113,4 +147,125 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=2),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'AUTH_HEADER_TYPES': ('Bearer',),
-}
\ No newline at end of file
+}
+
+# --- 10. AIS INGESTION ---
+INGEST_BATCH_SIZE = env.int('INGEST_BATCH_SIZE', default=5000)
+INGEST_MAX_FIXES = env.int('INGEST_MAX_FIXES', default=50000)
+
+# --- 11. DELTA SYNC ---
+SYNC_TOMBSTONE_TTL_DAYS = env.int('SYNC_TOMBSTONE_TTL_DAYS', default=7)
+SYNC_HISTORY_WINDOW_HOURS = env.int('SYNC_HISTORY_WINDOW_HOURS', default=24)
+SYNC_HISTORY_LIMIT = env.int('SYNC_HISTORY_LIMIT', default=5000)
+
+# --- 12. REAL-TIME PUSH (/api/stream/) ---
+# Swap the broker for a shared one (e.g. Redis-backed) when running several ASGI workers
+REALTIME_BROKER = env('REALTIME_BROKER', default='core.realtime.InMemoryBroker')
+REALTIME_TICK_SECONDS = env.float('REALTIME_TICK_SECONDS', default=1.0)
+REALTIME_HEARTBEAT_SECONDS = env.float('REALTIME_HEARTBEAT_SECONDS', default=15.0)
+
+# --- 13. HISTORY RETENTION (python manage.py prune_history) ---
+HISTORY_RETENTION_DAYS = env.int('HISTORY_RETENTION_DAYS', default=30)
+HISTORY_DOWNSAMPLE_MINUTES = env.int('HISTORY_DOWNSAMPLE_MINUTES', default=10)
+HISTORY_TURN_DEGREES = env.float('HISTORY_TURN_DEGREES', default=30.0)
+HISTORY_ARCHIVE_DIR = env('HISTORY_ARCHIVE_DIR', default=os.path.join(BASE_DIR, 'archive', 'history'))
+
+# --- 14. GEOFENCING (risk zones & port approach) ---
+RISK_ZONE_EVENT_TYPES = env.list('RISK_ZONE_EVENT_TYPES', default=['Storm', 'Piracy', 'Accident'])
+RISK_ZONE_RADIUS_KM = env.float('RISK_ZONE_RADIUS_KM', default=200.0)
+PORT_APPROACH_RADIUS_KM = env.float('PORT_APPROACH_RADIUS_KM', default=100.0)
+GEOFENCE_ON_INGEST = env.bool('GEOFENCE_ON_INGEST', default=True)
+
+# --- 15. API RESPONSE CACHE (ports, vessels, users) ---
+# Any Django cache URL. It also holds the version tokens that writes bump and the unread badge
+# counts, so every process that writes must share it: web workers and `manage.py worker` alike
+# (clusters, voyage tracking and geofence jobs write from the worker). The locmem default is
+# per process and only right for a single runserver: responses cached there live only
+# API_LOCAL_CACHE_SECONDS, and `manage.py worker` refuses it unless given --allow-local-cache.
+# Deploy with a shared cache, e.g. redis://host:6379/1, memcached, or dbcache://api_cache
+# after createcachetable.
+CACHES = {'default': env.cache('CACHE_URL', default='locmemcache://')}
+API_CACHE_SECONDS = env.int('API_CACHE_SECONDS', default=300)
+API_LOCAL_CACHE_SECONDS = env.int('API_LOCAL_CACHE_SECONDS', default=5)
+
+# --- 16. VESSEL SEARCH (/api/vessels/search/) ---
+VESSEL_SEARCH_DEFAULT_LIMIT = env.int('VESSEL_SEARCH_DEFAULT_LIMIT', default=20)
+VESSEL_SEARCH_MAX_LIMIT = env.int('VESSEL_SEARCH_MAX_LIMIT', default=100)
+
+# --- 17. PERFORMANCE INSTRUMENTATION (Server-Timing, /metrics, slow logs) ---
+SLOW_REQUEST_MS = env.float('SLOW_REQUEST_MS', default=500.0)
+SLOW_QUERY_MS = env.float('SLOW_QUERY_MS', default=100.0)
+# Scrapers send "Authorization: Bearer <METRICS_TOKEN>"; without a token only admins can read /metrics
+METRICS_TOKEN = env('METRICS_TOKEN', default='')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'console': {'class': 'logging.StreamHandler'}},
+    'loggers': {
+        'core.performance': {'handlers': ['console'], 'level': env('PERFORMANCE_LOG_LEVEL', default='WARNING'), 'propagate': False},
+        'core.jobs': {'handlers': ['console'], 'level': env('JOBS_LOG_LEVEL', default='INFO'), 'propagate': False},
+    },
+}
+
+# --- 18. COLUMNAR MAP LAYERS (Accept: application/vnd.maritime.columnar) ---
+COLUMNAR_PAGE_SIZE = env.int('COLUMNAR_PAGE_SIZE', default=10000)
+COLUMNAR_MAX_PAGE_SIZE = env.int('COLUMNAR_MAX_PAGE_SIZE', default=50000)
+
+# --- 19. BULK EXPORT (/api/export/history/, /api/export/voyages/) ---
+# Parquet is offered only when pyarrow is installed
+EXPORT_CHUNK_ROWS = env.int('EXPORT_CHUNK_ROWS', default=5000)
+
+# --- 20. BACKGROUND JOBS (python manage.py worker; the database is the queue) ---
+# Eager mode runs each job in-process right after the enqueuing transaction commits (no worker)
+JOBS_EAGER = env.bool('JOBS_EAGER', default=False)
+JOBS_POLL_SECONDS = env.float('JOBS_POLL_SECONDS', default=1.0)
+JOBS_LEASE_SECONDS = env.int('JOBS_LEASE_SECONDS', default=600)
+JOBS_RETRY_BACKOFF_SECONDS = env.int('JOBS_RETRY_BACKOFF_SECONDS', default=30)
+JOBS_KEEP_DAYS = env.int('JOBS_KEEP_DAYS', default=7)
+
+# --- 21. ANALYTICS ROLLUPS (/api/analytics/...; python manage.py rebuild_analytics) ---
+ANALYTICS_MAX_WINDOW_DAYS = env.int('ANALYTICS_MAX_WINDOW_DAYS', default=92)
+ANALYTICS_MAX_LIMIT = env.int('ANALYTICS_MAX_LIMIT', default=200)
+
+# --- 22. VOYAGE TRACKING (departures, arrivals & ETA from ingested fixes) ---
+VOYAGE_TRACKING = env.bool('VOYAGE_TRACKING', default=True)
+# A vessel inside this radius of a port and slower than VOYAGE_ARRIVAL_KNOTS is berthed there
+VOYAGE_PORT_RADIUS_KM = env.float('VOYAGE_PORT_RADIUS_KM', default=10.0)
+VOYAGE_ARRIVAL_KNOTS = env.float('VOYAGE_ARRIVAL_KNOTS', default=3.0)
+# Planned transit when a route has no history yet, and how late an ETA may run before "Delayed"
+VOYAGE_SERVICE_KNOTS = env.float('VOYAGE_SERVICE_KNOTS', default=12.0)
+VOYAGE_DELAY_GRACE_MINUTES = env.int('VOYAGE_DELAY_GRACE_MINUTES', default=60)
+
+# --- 23. NOTIFICATIONS (per-user deliveries; role/region-targeted fan-out) ---
+# Unread badge counts are cached per user and dropped whenever a delivery or mark-read commits
+NOTIFICATION_UNREAD_CACHE_SECONDS = env.int('NOTIFICATION_UNREAD_CACHE_SECONDS', default=300)
+
+# --- 24. STATELESS JWT AUTH (role claims in the token; see core/authentication.py) ---
+# token: authorize from claims, no User query; cached: User rows kept per process; database: a query per request
+JWT_USER_MODE = env('JWT_USER_MODE', default='token')
+JWT_USER_CACHE_SECONDS = env.int('JWT_USER_CACHE_SECONDS', default=60)
+# How stale another process's view of revoked tokens may be
+JWT_REVOCATION_REFRESH_SECONDS = env.int('JWT_REVOCATION_REFRESH_SECONDS', default=30)
+
+# --- 25. COLLISION SCREENING (vessel-to-vessel CPA / TCPA; python manage.py screen_collisions) ---
+COLLISION_SCREENING = env.bool('COLLISION_SCREENING', default=True)
+# Ingestion queues a fleet-wide pass at most this often
+COLLISION_INTERVAL_SECONDS = env.int('COLLISION_INTERVAL_SECONDS', default=30)
+# Alert when two vessels will pass closer than COLLISION_CPA_KM within the horizon
+COLLISION_CPA_KM = env.float('COLLISION_CPA_KM', default=1.0)
+COLLISION_HORIZON_MINUTES = env.float('COLLISION_HORIZON_MINUTES', default=15.0)
+# Slower vessels count as stopped; faster SOG readings are clipped as AIS glitches
+COLLISION_MIN_SPEED_KNOTS = env.float('COLLISION_MIN_SPEED_KNOTS', default=2.0)
+COLLISION_MAX_SPEED_KNOTS = env.float('COLLISION_MAX_SPEED_KNOTS', default=30.0)
+COLLISION_MAX_FIX_AGE_MINUTES = env.int('COLLISION_MAX_FIX_AGE_MINUTES', default=30)
+
+# --- 26. ASYNC READ PATH (ASGI; see core/asyncviews.py and python manage.py bench_concurrency) ---
+# JSON list GETs for vessels, history, events, voyages and notifications run as async views
+ASYNC_READ_VIEWS = env.bool('ASYNC_READ_VIEWS', default=True)
+# Threads per process the async views wait on for auth, cache and queries; each holds a DB connection
+ASYNC_READ_THREADS = env.int('ASYNC_READ_THREADS', default=4)
+
+# --- 27. MAP CLUSTERS (/api/vessels/clusters/; python manage.py rebuild_clusters) ---
+# Zoom levels up to this get clusters, closer ones individual vessels; run rebuild_clusters after changing it
+CLUSTER_MAX_ZOOM = env.int('CLUSTER_MAX_ZOOM', default=7)
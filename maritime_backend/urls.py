@@ -3,7 +3,9 @@ from django.urls import path, include, re_path
 from django.views.generic import TemplateView
 from rest_framework.routers import DefaultRouter
 from core import views
-from core.serializers import CustomTokenObtainPairSerializer
+from core.asyncviews import ASYNC_READ_VIEWS, async_list_routes
+from core.metrics import TimedViewMixin
+from core.serializers import CustomTokenObtainPairSerializer, CustomTokenRefreshSerializer
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 # --- 1. Router Setup ---
@@ -15,25 +17,45 @@ router.register(r'history', views.VesselHistoryViewSet, basename='history')
 router.register(r'voyages', views.VoyageViewSet, basename='voyage')
 router.register(r'events', views.EventViewSet, basename='event')
 router.register(r'notifications', views.NotificationViewSet, basename='notification')
+router.register(r'jobs', views.JobViewSet, basename='job')
+api_routes = router.urls
+if ASYNC_READ_VIEWS:
+    # JSON list polls for vessels, history, events, voyages & notifications (see core/asyncviews.py)
+    async_list_routes(api_routes)
 
 # --- 2. Custom JWT View ---
-class MyTokenObtainPairView(TokenObtainPairView):
+class MyTokenObtainPairView(TimedViewMixin, TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
+class MyTokenRefreshView(TimedViewMixin, TokenRefreshView):
+    serializer_class = CustomTokenRefreshSerializer
+
 urlpatterns = [
     # --- Django Admin Interface ---
     path('admin/', admin.site.urls),
     
     # --- API Endpoints ---
     path('api/token/', MyTokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/token/refresh/', MyTokenRefreshView.as_view(), name='token_refresh'),
+    path('api/token/revoke/', views.TokenRevokeView.as_view(), name='token_revoke'),
     path('api/register/', views.RegisterView.as_view(), name='register'),
     path('api/password-reset/', views.PasswordResetRequestView.as_view(), name='password_reset'),
+    path('api/ingest/positions/', views.PositionIngestView.as_view(), name='ingest_positions'),
+    path('api/sync/', views.SyncView.as_view(), name='sync'),
+    path('api/stream/', views.live_stream, name='live_stream'),
+    path('api/export/history/', views.HistoryExportView.as_view(), name='export_history'),
+    path('api/export/voyages/', views.VoyageExportView.as_view(), name='export_voyages'),
+    path('api/analytics/port-traffic/', views.PortTrafficView.as_view(), name='analytics_port_traffic'),
+    path('api/analytics/routes/', views.RouteStatsView.as_view(), name='analytics_routes'),
+    path('api/analytics/voyage-status/', views.VoyageStatusView.as_view(), name='analytics_voyage_status'),
     
     # Core API routes from router
-    path('api/', include(router.urls)), 
+    path('api/', include(api_routes)), 
     path('api-auth/', include('rest_framework.urls')),
 
+    # --- Prometheus Scrape Target ---
+    path('metrics', views.prometheus_metrics, name='metrics'),
+
     # --- Frontend Serving ---
     # We explicitly tell TemplateView which index.html to serve 
     # to match the settings.py TEMPLATES 'DIRS' configuration.